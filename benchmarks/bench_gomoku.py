@@ -0,0 +1,202 @@
+'''
+Benchmarks of gym_gomoku: env step throughput, opponent latency, gomoku_util primitives and memory per step.
+
+Usage, from the repository root, gym_gomoku is imported from the checkout if it is not installed:
+    python benchmarks/bench_gomoku.py --output results.json
+    python benchmarks/bench_gomoku.py --output results.json --compare baseline.json --threshold 0.2
+
+Results are written as json {"meta": {...}, "results": {name: {"value", "unit", "higher_is_better"}}}.
+With --compare, every result also found in the baseline is checked, and the exit code is 1 if one of them
+is worse than the baseline by more than threshold (relative).
+'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # repository root
+
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku.envs.gomoku import Board
+from gym_gomoku.envs.util import gomoku_util
+
+BOARD_SIZES = [9, 15, 19]
+OPPONENTS = ['random', 'beginner', 'medium', 'expert']
+SLOW_OPPONENTS = ['medium', 'expert'] # search based, time budget per move
+
+def timed(func, min_time, min_runs=1):
+    '''Call func until min_time seconds and min_runs calls, Return: list of the seconds of each call
+    '''
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_runs or time.perf_counter() - start < min_time:
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return times
+
+def play_steps(env, num_steps, on_step=None):
+    '''Play num_steps agent steps with random valid actions, resetting finished games
+    '''
+    for _ in range(num_steps):
+        _, _, done, _ = env.step(env.action_space.sample())
+        if on_step is not None:
+            on_step()
+        if done:
+            env.reset()
+
+def make_env(opponent, size, seed=0):
+    env = GomokuEnv('black', opponent, size)
+    env.seed(seed)
+    env.reset()
+    return env
+
+def fixed_position(size, num_stones, seed=0):
+    '''Board of num_stones random moves without a winner, the same on every run
+    '''
+    np_random = np.random.RandomState(seed)
+    while True:
+        b, color = Board(size), 'black'
+        for _ in range(num_stones):
+            b = b.play(np_random.choice(b.legal_actions()), color)
+            color = gomoku_util.other_color(color)
+        if not b.is_terminal():
+            return b
+
+def bench_step_throughput(results, quick):
+    for size in BOARD_SIZES:
+        for opponent in OPPONENTS:
+            num_steps = 5 if opponent in SLOW_OPPONENTS else 200
+            env = make_env(opponent, size)
+            times = timed(lambda: play_steps(env, num_steps), 0.2 if quick else 1.0)
+            add(results, 'step_throughput/{}/{}x{}'.format(opponent, size, size),
+                num_steps * len(times) / sum(times), 'steps/s', True)
+
+def bench_opponent_latency(results, quick):
+    for size in BOARD_SIZES:
+        for opponent in OPPONENTS:
+            env = make_env(opponent, size)
+            latencies = []
+            def wrap(policy):
+                def timed_policy(curr_state, prev_state, prev_action):
+                    t = time.perf_counter()
+                    action = policy(curr_state, prev_state, prev_action)
+                    latencies.append(time.perf_counter() - t)
+                    return action
+                return timed_policy
+            env.opponent_policy = wrap(env.opponent_policy)
+            start = time.perf_counter()
+            while time.perf_counter() - start < (0.3 if quick else 2.0) or len(latencies) < 5:
+                _, _, done, _ = env.step(env.action_space.sample())
+                if done:
+                    env.reset()
+                    env.opponent_policy = wrap(env.opponent_policy)
+            latencies = np.array(latencies) * 1e3
+            name = 'opponent_latency/{}/{}x{}'.format(opponent, size, size)
+            for q in [50, 90, 99]:
+                add(results, '{}/p{}'.format(name, q), float(np.percentile(latencies, q)), 'ms', False)
+            add(results, '{}/max'.format(name), float(latencies.max()), 'ms', False)
+
+def bench_primitives(results, quick):
+    min_time = 0.1 if quick else 0.5
+    for size in BOARD_SIZES:
+        b = fixed_position(size, size * size // 4)
+        board_state = b.board_state
+        board_list = board_state.tolist()
+        pattern = [0, 1, 1, 1, 0]
+        def get_legal_move():
+            b._legal_actions = None # cached once per board, time the generation and not the cache hit
+            return Board.get_legal_move(b)
+        cases = [
+            ('check_five_in_row', lambda: gomoku_util.check_five_in_row(board_state)),
+            ('check_pattern_index', lambda: gomoku_util.check_pattern_index(board_list, pattern)),
+            ('get_legal_move', get_legal_move),
+        ]
+        for name, func in cases:
+            times = timed(func, min_time, min_runs=10)
+            add(results, 'primitive/{}/{}x{}'.format(name, size, size), float(np.median(times)) * 1e6, 'us', False)
+
+def bench_memory(results, quick):
+    for size in BOARD_SIZES:
+        for opponent in ['random', 'beginner']:
+            env = make_env(opponent, size)
+            play_steps(env, 20) # warm up the caches
+            num_steps = 100 if quick else 500
+            tracemalloc.start()
+            play_steps(env, num_steps)
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            allocated = sum(stat.size for stat in snapshot.statistics('filename'))
+            name = 'memory/{}/{}x{}'.format(opponent, size, size)
+            add(results, name + '/peak_bytes', float(peak), 'bytes', False) # high-water mark of the run
+            add(results, name + '/retained_per_step', float(allocated) / num_steps, 'bytes', False)
+
+def add(results, name, value, unit, higher_is_better):
+    results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+    print('{:<55s} {:>14.3f} {}'.format(name, value, unit))
+
+def compare(results, baseline, threshold):
+    '''
+    Args:
+        results, baseline: dict name -> {'value', 'unit', 'higher_is_better'}
+        threshold: relative change above which a result is a regression, e.g. 0.2
+    Return:
+        list of (name, baseline value, value, relative change) of the regressions
+    '''
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        if name not in results or base['value'] == 0:
+            continue
+        value = results[name]['value']
+        change = (value - base['value']) / abs(base['value'])
+        worse = -change if base['higher_is_better'] else change
+        if worse > threshold:
+            regressions.append((name, base['value'], value, change))
+    return regressions
+
+SUITES = {
+    'step': bench_step_throughput,
+    'latency': bench_opponent_latency,
+    'primitives': bench_primitives,
+    'memory': bench_memory,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gym_gomoku benchmarks')
+    parser.add_argument('--output', help='json file to write the results to')
+    parser.add_argument('--compare', help='baseline json file to flag the regressions against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative regression threshold')
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES), help='suites to run, default all')
+    parser.add_argument('--quick', action='store_true', help='shorter runs, noisier results')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for suite in args.suite or sorted(SUITES):
+        SUITES[suite](results, args.quick)
+
+    if args.output:
+        meta = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, base, value, change in regressions:
+            print('REGRESSION {}: {:.3f} -> {:.3f} ({:+.1%})'.format(name, base, value, change))
+        if regressions:
+            return 1
+        print('No regression against {}'.format(args.compare))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
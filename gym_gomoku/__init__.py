@@ -22,3 +22,40 @@ register(
     nondeterministic=True,
 )
 
+
+# large boards on the sparse backend, the opponent plays on the window of the board around the stones
+register(
+    id='Gomoku50x50-v0',
+    entry_point='gym_gomoku.envs:GomokuEnv',
+    kwargs={
+        'player_color': 'black',
+        'opponent': 'beginner',
+        'board_size': 50,
+        'backend': 'sparse',
+    },
+    nondeterministic=True,
+)
+
+register(
+    id='Gomoku100x100-v0',
+    entry_point='gym_gomoku.envs:GomokuEnv',
+    kwargs={
+        'player_color': 'black',
+        'opponent': 'beginner',
+        'board_size': 100,
+        'backend': 'sparse',
+    },
+    nondeterministic=True,
+)
+
+register(
+    id='GomokuFreestyle-v0',
+    entry_point='gym_gomoku.envs:GomokuEnv',
+    kwargs={
+        'player_color': 'black',
+        'opponent': 'beginner',
+        'board_size': 1000, # effectively unbounded, games stay far from the edges
+        'backend': 'sparse',
+    },
+    nondeterministic=True,
+)
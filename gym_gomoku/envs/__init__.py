@@ -1 +1,3 @@
 from gym_gomoku.envs.gomoku import GomokuEnv
+from gym_gomoku.envs.vector import GomokuVectorEnv
+from gym_gomoku.envs.subproc import SubprocGomokuEnv
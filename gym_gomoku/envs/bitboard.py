@@ -0,0 +1,142 @@
+'''Bitboard representation of the Gomoku board, used by GomokuUtil for line and pattern detection
+'''
+
+import numpy as np
+
+class BitGeometry(object):
+    '''
+    Bit layout of a board_size x board_size board, shared by all the bitboards of that size.
+    Cell (i, j) is bit i * width + j, with width = board_size + 1: the extra guard column is never set,
+    so a shifted pattern can not wrap from the end of a row to the start of the next one.
+    '''
+    _cache = {}
+
+    def __init__(self, size):
+        self.size = size
+        self.width = size + 1
+        self.mask = 0 # all the cells on the board
+        for i in range(size):
+            self.mask |= ((1 << size) - 1) << (i * self.width)
+        # bit offset of one step along row, column, diagonal from lower left to upper right, diagonal from upper left to lower right
+        self.offsets = [1, self.width, 1 - self.width, self.width + 1]
+
+    @classmethod
+    def get(cls, size):
+        geometry = cls._cache.get(size)
+        if geometry is None:
+            geometry = cls._cache[size] = BitGeometry(size)
+        return geometry
+
+    def bit(self, i, j):
+        return i * self.width + j
+
+    def coord(self, bit):
+        return (bit // self.width, bit % self.width)
+
+def shift(bits, offset):
+    '''Return bits moved by -offset: bit s of the result is bit (s + offset) of the input
+    '''
+    return bits >> offset if offset >= 0 else bits << (-offset)
+
+def iter_bits(bits):
+    '''Yield the index of every set bit, lowest first
+    '''
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+class BitBoard(object):
+    '''
+    One big integer per color, black and white, plus the empty cells derived from them.
+    Pattern values follow gomoku_util.color_dict: 0 empty, 1 black, 2 white
+    '''
+    def __init__(self, size, black=0, white=0):
+        self.geometry = BitGeometry.get(size)
+        self.size = size
+        self.black = black
+        self.white = white
+
+    @classmethod
+    def from_state(cls, board_state):
+        '''Build the bitboard from a 2D list or np.array board_state
+        '''
+        state = np.asarray(board_state)
+        size = state.shape[0]
+        padded = np.zeros((size, size + 1), dtype=bool) # guard column left empty
+        planes = []
+        for val in (1, 2):
+            padded[:, :size] = (state == val)
+            packed = np.packbits(padded.ravel(), bitorder='little')
+            planes.append(int.from_bytes(packed.tobytes(), 'little'))
+        return cls(size, planes[0], planes[1])
+
+    def copy(self):
+        return BitBoard(self.size, self.black, self.white)
+
+    def empty(self):
+        return self.geometry.mask & ~(self.black | self.white)
+
+    def plane(self, val):
+        if val == 1:
+            return self.black
+        if val == 2:
+            return self.white
+        return self.empty()
+
+    def place(self, i, j, val):
+        '''Set stone val (1 black, 2 white) on cell (i, j), in place
+        '''
+        bit = 1 << self.geometry.bit(i, j)
+        if val == 1:
+            self.black |= bit
+        else:
+            self.white |= bit
+
+    def remove(self, i, j):
+        '''Empty the cell (i, j), in place
+        '''
+        bit = ~(1 << self.geometry.bit(i, j))
+        self.black &= bit
+        self.white &= bit
+
+    def match(self, pattern, offset):
+        '''Return bits of the start cells where pattern is found, stepping offset bits along the line
+        '''
+        planes = {}
+        match = self.geometry.mask
+        for k, val in enumerate(pattern):
+            if val not in planes:
+                planes[val] = self.plane(val)
+            match &= shift(planes[val], k * offset)
+            if not match:
+                break
+        return match
+
+    def match_all(self, pattern):
+        '''Return list of start cell bits where pattern is found, one for each direction
+        '''
+        return [self.match(pattern, offset) for offset in self.geometry.offsets]
+
+    def pattern_moves(self, pattern):
+        '''Return bits of the empty cells of pattern on every line where the pattern is found
+        '''
+        moves = 0
+        empty_idx = [k for k, val in enumerate(pattern) if val == 0]
+        for offset in self.geometry.offsets:
+            match = self.match(pattern, offset)
+            for k in empty_idx:
+                moves |= shift(match, -k * offset)
+        return moves
+
+    def five_in_row(self, val):
+        '''Return True if color val (1 black, 2 white) has 5 or more stones in a row
+        '''
+        stones = self.plane(val)
+        for offset in self.geometry.offsets:
+            # fold the line: each step doubles the length of the run ending on every bit
+            run = stones & shift(stones, offset)           # 2 in a row
+            run = run & shift(run, 2 * offset)             # 4 in a row
+            if run & shift(stones, 4 * offset):            # 5 in a row
+                return True
+        return False
@@ -0,0 +1,147 @@
+'''Multi-plane feature observations of the board, updated incrementally on the lines through each new stone
+'''
+
+import numpy as np
+
+from gym_gomoku.envs.util import gomoku_util
+
+RADIUS = 5 # features of a cell in one direction only depend on the cells up to 5 steps away on that line
+_threat_table = None
+
+def threat_table():
+    '''
+    Threat bits of the center cell of every line segment of 11 cells, 1 black open three, 2 black four,
+    4 white open three, 8 white four, indexed by the base 4 code of the 10 other cells: 0 empty, 1 black, 2 white,
+    3 outside of the board, cell k of the segment (k != 5) in digit k, or k - 1 after the center. Built once, 4**10 bytes.
+    '''
+    global _threat_table
+    if _threat_table is None:
+        codes = np.arange(4**10, dtype=np.int32)
+        digits = ((codes[:, None] >> (2 * np.arange(2 * RADIUS))) & 3).astype(np.int8)
+        segments = np.insert(digits, RADIUS, 0, axis=1)
+        table = np.zeros(4**10, dtype=np.uint8)
+        for bit, val in [(0, 1), (2, 2)]:
+            s = segments.copy()
+            s[:, RADIUS] = val
+            mine = np.zeros((len(s), s.shape[1] + 1), dtype=np.int8)
+            free = np.zeros_like(mine)
+            np.cumsum(s == val, axis=1, out=mine[:, 1:])
+            np.cumsum(s == 0, axis=1, out=free[:, 1:])
+            # 5 cells windows through the center, starting at 1..5
+            count = mine[:, 6:11] - mine[:, 1:6]
+            blank = free[:, 6:11] - free[:, 1:6]
+            four = ((count >= 4) & (count + blank == 5)).any(axis=1)
+            # 6 cells windows with the center in the 4 inner cells, starting at 1..4
+            inner = mine[:, 6:10] - mine[:, 2:6]
+            inner_blank = free[:, 6:10] - free[:, 2:6]
+            ends = (s[:, 1:5] == 0) & (s[:, 6:10] == 0)
+            three = (ends & (inner == 3) & (inner_blank == 1)).any(axis=1)
+            table |= (three.astype(np.uint8) << bit) | (four.astype(np.uint8) << (bit + 1))
+        _threat_table = table
+    return _threat_table
+
+class FeaturePlanes(object):
+    '''
+    Feature planes float32 [NUM_PLANES, board_size, board_size] seen by color:
+        0 stones of color, 1 stones of the other color, 2 ones if black is to move, 3 last move,
+        4, 5 number of directions in which a stone of color on the empty cell makes an open three, a four,
+        6, 7 the same for the other color.
+    A four is a 5 cells window with 4 stones and an empty cell (or a five), an open three is a 6 cells window
+    with empty ends and 3 stones in the 4 inner cells.
+    '''
+    NUM_PLANES = 8
+    _index_cache = {}
+
+    def __init__(self, board_size, color):
+        '''
+        Args:
+            board_size: board_size of the board
+            color: color the planes are seen by, e.g. the player_color of the env
+        '''
+        self.size = board_size
+        self.color = color
+        self.vals = (gomoku_util.color_dict[color], gomoku_util.color_dict[gomoku_util.other_color(color)])
+        self.planes = np.zeros((self.NUM_PLANES, board_size, board_size), dtype=np.float32)
+        self._flat = self.planes.reshape(self.NUM_PLANES, -1)
+        # board cells padded with a blocked cell (3) at index board_size**2, for the line segments
+        self._cells = np.zeros(board_size**2 + 1, dtype=np.int8)
+        self._cells[-1] = 3
+        # per direction threat features [direction, 4, cells]: own three, own four, other three, other four
+        self._threats = np.zeros((len(gomoku_util.directions), 4, board_size**2), dtype=np.int8)
+        # per direction code of the line segment through each cell, see threat_table()
+        self._codes = np.zeros((len(gomoku_util.directions), board_size**2), dtype=np.int32)
+        self._table = threat_table()
+        self._shifts = np.array([0, 1, 2, 3] if self.vals[0] == 1 else [2, 3, 0, 1], dtype=np.uint8)
+        self._segments, self._lines = self._segment_index(board_size)
+        self.last_action = None
+
+    @classmethod
+    def _segment_index(cls, size):
+        '''
+        Return:
+            np.array [4, size**2, 2 * RADIUS + 1], flat index of the cells on the line through each cell,
+                size**2 outside of the board
+            list of (directions, cells, weights) for each action: the other cells on the 4 lines through it,
+                and the code weight of the action in their segment
+        '''
+        if size not in cls._index_cache:
+            index = gomoku_util.line_index(size).segments(RADIUS)
+            # the cell at step m of the line through action sees action at step 2 * RADIUS - m of its own line
+            position = 2 * RADIUS - np.arange(2 * RADIUS + 1)
+            weight = 4 ** np.where(position > RADIUS, position - 1, position)
+            lines = []
+            for action in range(size**2):
+                dirs, steps = np.nonzero((index[:, action] < size**2) & (np.arange(2 * RADIUS + 1) != RADIUS))
+                lines.append((dirs, index[dirs, action, steps], weight[steps].astype(np.int32)))
+            cls._index_cache[size] = (index, lines)
+        return cls._index_cache[size]
+
+    def reset(self, board_state=None, last_action=None, to_move='black'):
+        '''Recompute all the planes from board_state, an empty board if None'''
+        self._cells[:-1] = 0 if board_state is None else np.asarray(board_state).ravel()
+        self._flat[:] = 0.
+        cells = self._cells[:-1]
+        self._flat[0] = cells == self.vals[0]
+        self._flat[1] = cells == self.vals[1]
+        segments = np.delete(self._cells[self._segments], RADIUS, axis=2).astype(np.int32)
+        self._codes[:] = (segments << (2 * np.arange(2 * RADIUS))).sum(axis=2)
+        self._threats[:] = self._threat_bits(self._codes.ravel()).reshape(len(self._codes), -1, 4).transpose(0, 2, 1)
+        self._threats[:, :, cells != 0] = 0
+        self._flat[4:] = self._threats.sum(axis=0)
+        self.last_action = None
+        self._set_last(last_action)
+        self.set_to_move(to_move)
+
+    def _threat_bits(self, codes):
+        '''Return: np.array int8 [len(codes), 4], own three, own four, other three, other four'''
+        return ((self._table[codes][:, None] >> self._shifts) & 1).astype(np.int8)
+
+    def set_to_move(self, color):
+        self._flat[2] = 1. if color == gomoku_util.BLACK else 0.
+
+    def _set_last(self, action):
+        if self.last_action is not None:
+            self._flat[3, self.last_action] = 0.
+        if action is not None:
+            self._flat[3, action] = 1.
+        self.last_action = action
+
+    def place(self, action, color):
+        '''Update the planes for a stone of color played on action, only the 4 lines through it change'''
+        val = gomoku_util.color_dict[color]
+        self._cells[action] = val
+        self._flat[0 if val == self.vals[0] else 1, action] = 1.
+        self._set_last(action)
+        self.set_to_move(gomoku_util.other_color(color))
+        # the action cell is not empty anymore
+        self._threats[:, :, action] = 0
+        self._flat[4:, action] = 0.
+        # the other cells of its lines see the new stone in their code, each cell is on one line only
+        dirs, cells, weights = self._lines[action]
+        codes = self._codes[dirs, cells] + val * weights
+        self._codes[dirs, cells] = codes
+        new = self._threat_bits(codes)
+        new[self._cells[cells] != 0] = 0
+        delta = new - self._threats[dirs, :, cells]
+        self._threats[dirs, :, cells] = new
+        self._flat[4:, cells] += delta.T
@@ -12,6 +12,11 @@ from gym_gomoku.envs.util import make_random_policy
 from gym_gomoku.envs.util import make_beginner_policy
 from gym_gomoku.envs.util import make_medium_policy
 from gym_gomoku.envs.util import make_expert_policy
+from gym_gomoku.envs.profiling import StepProfiler
+from gym_gomoku.envs.features import FeaturePlanes
+from gym_gomoku.envs.sparse import SparseBoard
+from gym_gomoku.envs.sparse import SparseDiscrete
+from gym_gomoku.envs import renju
 
 # Rules from Wikipedia: Gomoku is an abstract strategy board game, Gobang or Five in a Row, it is traditionally played with Go pieces (black and white stones) on a go board with 19x19 or (15x15) 
 # The winner is the first player to get an unbroken row of five stones horizontally, vertically, or diagonally. (so-calle five-in-a row)
@@ -30,6 +35,7 @@ class GomokuState(object):
         '''
         assert color in ['black', 'white'], 'Invalid player color'
         self.board, self.color = board, color
+        self._undo = [] # undo records of push(), most recent last
     
     def act(self, action):
         '''
@@ -40,6 +46,44 @@ class GomokuState(object):
         '''
         return GomokuState(self.board.play(action, self.color), gomoku_util.other_color(self.color))
     
+    def copy(self):
+        '''
+        Returns:
+            a new GomokuState with its own copy of the board, safe to push() and pop() on
+        '''
+        return GomokuState(self.board._clone(), self.color)
+    
+    def push(self, action):
+        '''
+        Executes an action for the current player in place, for tree search: make/unmake without allocating boards.
+        The board is shared with the states it was played from, so push() on a copy() of the env state.
+        '''
+        self._undo.append(self.board.place(action, self.color))
+        self.color = gomoku_util.other_color(self.color)
+    
+    def pop(self):
+        '''
+        Takes back the last push(), restoring board, hash, legal moves and win state exactly
+        
+        Returns:
+            the action taken back
+        '''
+        if not self._undo:
+            raise error.Error('No move to pop, push() was not called on this state')
+        record = self._undo.pop()
+        self.board.unplace(record)
+        self.color = gomoku_util.other_color(self.color)
+        return record[0]
+    
+    def __eq__(self, other):
+        return isinstance(other, GomokuState) and self.color == other.color and self.board == other.board
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __hash__(self):
+        return self.board.hash
+    
     def __repr__(self):
         '''stream of board shape output'''
         # To Do: Output shape * * * o o
@@ -48,30 +92,104 @@ class GomokuState(object):
 # Sampling without replacement Wrapper 
 # sample() method will only sample from valid spaces
 class DiscreteWrapper(spaces.Discrete):
-    def __init__(self, n):
+    def __init__(self, n, np_random=None):
+        '''
+        Args:
+            n: number of actions
+            np_random: random state used by sample(), e.g. the env np_random, a new one is seeded if None
+        '''
         self.n = n
-        self.valid_spaces = list(range(n))
+        self.np_random = np_random if np_random is not None else seeding.np_random()[0]
+        # valid actions are the first num_valid items of _actions, _position[a] is the index of action a in _actions
+        self._actions = list(range(n))
+        self._position = list(range(n))
+        self.num_valid = n
+        self._mask = np.ones(n, dtype=bool)
+        self._mask_view = self._mask.view()
+        self._mask_view.flags.writeable = False
+        self._forbidden = [] # actions made invalid by set_forbidden()
+    
+    @property
+    def valid_spaces(self):
+        return self._actions[:self.num_valid]
+    
+    @property
+    def mask(self):
+        '''Read-only boolean mask of the valid actions, updated in place by remove()
+        '''
+        return self._mask_view
     
     def sample(self):
         '''Only sample from the remaining valid spaces
         '''
-        if len(self.valid_spaces) == 0:
+        if self.num_valid == 0:
             print ("Space is empty")
             return None
-        np_random, _ = seeding.np_random()
-        randint = np_random.randint(len(self.valid_spaces))
-        return self.valid_spaces[randint]
+        randint = self.np_random.randint(self.num_valid)
+        return self._actions[randint]
     
     def remove(self, s):
-        '''Remove space s from the valid spaces
+        '''Remove space s from the valid spaces, swap with the last valid space
         '''
         if s is None:
             return
-        if s in self.valid_spaces:
-            self.valid_spaces.remove(s)
+        if s in self._forbidden: # played by the other color, stays invalid
+            self._forbidden.remove(s)
+        elif 0 <= s < self.n and self._mask[s]:
+            self._swap_out(s)
         else:
             print ("space %d is not in valid spaces" % s)
+    
+    def set_forbidden(self, actions):
+        '''Make actions invalid until the next call, e.g. the forbidden moves of black under the renju rule,
+        the actions forbidden by the previous call become valid again
+        '''
+        for s in self._forbidden:
+            self._swap_in(s)
+        self._forbidden = [s for s in actions if self._mask[s]]
+        for s in self._forbidden:
+            self._swap_out(s)
+    
+    def _swap_out(self, s):
+        pos, last = self._position[s], self._actions[self.num_valid - 1]
+        self._actions[pos], self._position[last] = last, pos
+        self._actions[self.num_valid - 1], self._position[s] = s, self.num_valid - 1
+        self.num_valid -= 1
+        self._mask[s] = False
+    
+    def _swap_in(self, s):
+        pos, first = self._position[s], self._actions[self.num_valid]
+        self._actions[pos], self._position[first] = first, pos
+        self._actions[self.num_valid], self._position[s] = s, self.num_valid
+        self.num_valid += 1
+        self._mask[s] = True
+    
+    def get_state(self):
+        '''Return: copy of the valid spaces, in sampling order
+        '''
+        return (self._actions[:], self._position[:], self.num_valid, self._mask.copy(), self._forbidden[:])
+    
+    def set_state(self, state):
+        '''Restore the valid spaces saved by get_state(), the mask is updated in place
+        '''
+        actions, position, self.num_valid, mask, forbidden = state
+        self._actions, self._position, self._forbidden = actions[:], position[:], forbidden[:]
+        np.copyto(self._mask, mask)
+
 
+class GomokuSnapshot(object):
+    '''
+    Snapshot of a GomokuEnv taken by clone_state(), restored by restore_state().
+    The state is kept by reference, boards are never modified by the env once played.
+    '''
+    __slots__ = ('state', 'moves', 'done', 'action_space', 'rng_state')
+    
+    def __init__(self, state, moves, done, action_space, rng_state):
+        self.state = state
+        self.moves = moves
+        self.done = done
+        self.action_space = action_space
+        self.rng_state = rng_state
 
 ### Environment
 class GomokuEnv(gym.Env):
@@ -80,15 +198,36 @@ class GomokuEnv(gym.Env):
     '''
     metadata = {"render.modes": ["human", "ansi"]}
     
-    def __init__(self, player_color, opponent, board_size):
+    def __init__(self, player_color, opponent, board_size, observation='board', backend='dense', rule='freestyle'):
         """
         Args:
             player_color: Stone color for the agent. Either 'black' or 'white'
-            opponent: Name of the opponent policy, e.g. random, beginner, medium, expert
+            opponent: Name of the opponent policy, e.g. random, beginner, medium, expert,
+                or a callable opponent(np_random) returning a policy(curr_state, prev_state, prev_action)
             board_size: board_size of the board to use
+            observation: 'board' for the board encoding, 'features' for the FeaturePlanes seen by the agent,
+                updated incrementally and returned in the same float32 buffer at every step
+            backend: 'dense' Board, or 'sparse' SparseBoard for large boards: the observation is a buffer updated
+                in place and the opponent plays on the dense window of the board around the stones
+            rule: 'freestyle' five or more in a row wins, 'standard' exactly five, 'renju' exactly five for black
+                with overlines, double-threes and double-fours forbidden for black, they are not in the legal mask
         """
         self.board_size = board_size
         self.player_color = player_color
+        if observation not in ('board', 'features'):
+            raise error.Error('Unrecognized observation {}'.format(observation))
+        if backend not in ('dense', 'sparse'):
+            raise error.Error('Unrecognized backend {}'.format(backend))
+        if backend == 'sparse' and observation == 'features':
+            raise error.Error('The features observation needs the dense backend')
+        if rule not in renju.RULES:
+            raise error.Error('Unrecognized rule {}'.format(rule))
+        if backend == 'sparse' and rule != 'freestyle':
+            raise error.Error('The {} rule needs the dense backend'.format(rule))
+        self.backend = backend
+        self.rule = rule
+        self.features = FeaturePlanes(board_size, player_color) if observation == 'features' else None
+        self._board_obs = np.zeros((board_size, board_size), dtype=np.int8) if backend == 'sparse' else None
         
         self._seed()
         
@@ -99,9 +238,12 @@ class GomokuEnv(gym.Env):
         # Observation space on board
         shape = (self.board_size, self.board_size) # board_size * board_size
         self.observation_space = spaces.Box(np.zeros(shape), np.ones(shape))
+        if self.features is not None:
+            shape = (FeaturePlanes.NUM_PLANES,) + shape
+            self.observation_space = spaces.Box(np.zeros(shape), 4 * np.ones(shape))
         
         # One action for each board position
-        self.action_space = DiscreteWrapper(self.board_size**2)
+        self.action_space = self._new_action_space()
         
         # Keep track of the moves
         self.moves = []
@@ -109,6 +251,9 @@ class GomokuEnv(gym.Env):
         # Empty State
         self.state = None
         
+        # Timing of the phases of _step and _reset, off by default, see enable_profiling()
+        self.profiler = None
+        
         # reset the board during initialization
         self._reset()
     
@@ -119,24 +264,42 @@ class GomokuEnv(gym.Env):
         return [seed1, seed2]
     
     def _reset(self):
-        self.state = GomokuState(Board(self.board_size), gomoku_util.BLACK) # Black Plays First
+        prof = self.profiler
+        if prof:
+            prof.clear() # new episode
+            t = prof.start()
+        board = SparseBoard(self.board_size) if self.backend == 'sparse' else Board(self.board_size, self.rule)
+        self.state = GomokuState(board, gomoku_util.BLACK) # Black Plays First
         self._reset_opponent(self.state.board) # (re-initialize) the opponent,
         self.moves = []
         
+        # reset action_space, the legal action mask is exposed as action_space.mask
+        self.action_space = self._new_action_space()
+        if self.features is not None:
+            self.features.reset()
+        if self._board_obs is not None:
+            self._board_obs.fill(0)
+        if prof: t = prof.lap('reset', t)
+        
         # Let the opponent play if it's not the agent's turn, there is no resign in Gomoku
         if self.state.color != self.player_color:
-            self.state, _ = self._exec_opponent_play(self.state, None, None)
+            self.state, opponent_action = self._exec_opponent_play(self.state, None, None)
+            if prof: t = prof.lap('opponent_play', t)
+            self._observe(opponent_action, gomoku_util.other_color(self.player_color))
             opponent_action_coord = self.state.board.last_coord
             self.moves.append(opponent_action_coord)
+            self.action_space.remove(opponent_action)
+            self._update_forbidden()
+            if prof: t = prof.lap('action_space', t)
         
         # We should be back to the agent color
         assert self.state.color == self.player_color
         
-        # reset action_space
-        self.action_space = DiscreteWrapper(self.board_size**2)
-        
         self.done = self.state.board.is_terminal()
-        return self.state.board.encode()
+        if prof: t = prof.lap('is_terminal', t)
+        observation = self._observation()
+        if prof: prof.lap('encode', t)
+        return observation
     
     def _close(self):
         self.opponent_policy = None
@@ -149,15 +312,17 @@ class GomokuEnv(gym.Env):
         outfile.write(repr(self.state) + '\n')
         return outfile
     
-    def _step(self, action):
+    def _step(self, action, opponent_policy=None):
         '''
         Args: 
             action: int
+            opponent_policy: policy playing the opponent move of this step instead of the env opponent,
+                e.g. returning a move chosen for many games at once by a batched policy
         Return: 
             observation: board encoding, 
             reward: reward of the game, 
             done: boolean, 
-            info: state dict
+            info: dict, 'state' of the game and 'legal_mask', a copy of action_space.mask not changed by the next steps
         Raise:
             Illegal Move action, basically the position on board is not empty
         '''
@@ -165,47 +330,161 @@ class GomokuEnv(gym.Env):
         
         # If already terminal, then don't do anything
         if self.done:
-            return self.state.board.encode(), 0., True, {'state': self.state}
+            return self._observation(), 0., True, self._info()
+        
+        prof = self.profiler
+        if prof: t = prof.start()
         
         # Player play
         prev_state = self.state
         self.state = self.state.act(action)
+        self._observe(action, self.player_color)
+        if prof: t = prof.lap('agent_move', t)
         self.moves.append(self.state.board.last_coord)
         self.action_space.remove(action) # remove current action from action_space
+        if prof: t = prof.lap('action_space', t)
         
         # Opponent play
-        if not self.state.board.is_terminal():
-            self.state, opponent_action = self._exec_opponent_play(self.state, prev_state, action)
+        terminal = self.state.board.is_terminal()
+        if prof: t = prof.lap('is_terminal', t)
+        if not terminal:
+            self.state, opponent_action = self._exec_opponent_play(self.state, prev_state, action, opponent_policy)
+            self._observe(opponent_action, gomoku_util.other_color(self.player_color))
+            if prof: t = prof.lap('opponent_play', t)
             self.moves.append(self.state.board.last_coord)
             self.action_space.remove(opponent_action)   # remove opponent action from action_space
+            self._update_forbidden()
+            if prof: t = prof.lap('action_space', t)
             # After opponent play, we should be back to the original color
             assert self.state.color == self.player_color
+            terminal = self.state.board.is_terminal()
+            if prof: t = prof.lap('is_terminal', t)
         
         # Reward: if nonterminal, there is no 5 in a row, then the reward is 0
-        if not self.state.board.is_terminal():
-            self.done = False
-            return self.state.board.encode(), 0., False, {'state': self.state}
-        
         # We're in a terminal state. Reward is 1 if won, -1 if lost
-        assert self.state.board.is_terminal(), 'The game is terminal'
-        self.done = True
-        
-        # Check Fianl wins
-        exist, win_color = gomoku_util.check_five_in_row(self.state.board.board_state) # 'empty', 'black', 'white'
+        self.done = terminal
         reward = 0.
-        if win_color == "empty": # draw
-            reward = 0.
-        else:
-            player_wins = (self.player_color == win_color) # check if player_color is the win_color
-            reward = 1. if player_wins else -1.
-        return self.state.board.encode(), reward, True, {'state': self.state}
+        if terminal:
+            # Check Fianl wins
+            win_color = self.state.board.winner # 'empty', 'black', 'white'
+            if win_color != "empty": # not a draw
+                player_wins = (self.player_color == win_color) # check if player_color is the win_color
+                reward = 1. if player_wins else -1.
+        
+        observation = self._observation()
+        if prof: prof.lap('encode', t)
+        return observation, reward, terminal, self._info()
+    
+    def _update_forbidden(self):
+        '''Fold the forbidden moves of black into the action space, when the agent plays black under the renju rule'''
+        if self.rule == 'renju' and self.player_color == gomoku_util.BLACK:
+            self.action_space.set_forbidden(self.state.board.forbidden_actions().tolist())
+    
+    def _new_action_space(self):
+        if self.backend == 'sparse':
+            return SparseDiscrete(self.board_size**2, self.np_random)
+        return DiscreteWrapper(self.board_size**2, self.np_random)
+    
+    def _observe(self, action, color):
+        '''Update the incremental observation with a stone of color played on action'''
+        if self.features is not None:
+            self.features.place(action, color)
+        elif self._board_obs is not None:
+            self._board_obs.flat[action] = gomoku_util.color_dict[color]
+    
+    def _observation(self):
+        '''Board encoding, or the feature planes buffer in the features observation mode'''
+        if self.features is not None:
+            return self.features.planes
+        if self._board_obs is not None: # sparse backend, read-only view of the buffer
+            img = self._board_obs.view()
+            img.flags.writeable = False
+            return img
+        return self.state.board.encode()
+    
+    def _info(self):
+        '''info dict of _step, with the 'profile' of the episode when it is done and profiling is enabled
+        '''
+        info = {'state': self.state, 'legal_mask': self.action_space.mask.copy()} # the mask is updated in place by remove()
+        if self.profiler and self.done:
+            info['profile'] = self.profiler.stats()
+        return info
+    
+    def enable_profiling(self, hooks=None):
+        '''
+        Time and count each phase of _step and _reset: reset, agent_move, opponent_play, is_terminal, encode, action_space.
+        Args:
+            hooks: list of callables hook(phase, seconds), called for every measure
+        Return:
+            the StepProfiler, its stats() are cleared at each reset
+        '''
+        self.profiler = StepProfiler(hooks)
+        return self.profiler
     
-    def _exec_opponent_play(self, curr_state, prev_state, prev_action):
+    def disable_profiling(self):
+        self.profiler = None
+    
+    def profile_stats(self):
+        '''Return: dict phase -> {'count', 'total' seconds, 'mean' seconds} of the current episode, None if profiling is off
+        '''
+        return self.profiler.stats() if self.profiler else None
+    
+    def _exec_opponent_play(self, curr_state, prev_state, prev_action, opponent_policy=None):
         '''There is no resign in gomoku'''
         assert curr_state.color != self.player_color
-        opponent_action = self.opponent_policy(curr_state, prev_state, prev_action)
+        if opponent_policy is not None: # plays on the whole board
+            opponent_action = opponent_policy(curr_state, prev_state, prev_action)
+        elif self.backend == 'sparse':
+            opponent_action = self._window_opponent_play(curr_state, prev_state, prev_action)
+        else:
+            opponent_action = self.opponent_policy(curr_state, prev_state, prev_action)
+        if self.rule == 'renju' and not curr_state.board.is_legal(opponent_action):
+            # the built-in policies do not know the forbidden moves of black, play a random legal move instead
+            legal_actions = curr_state.board.legal_actions()
+            opponent_action = int(legal_actions[self.np_random.choice(len(legal_actions))])
         return curr_state.act(opponent_action), opponent_action
     
+    def _window_opponent_play(self, curr_state, prev_state, prev_action, margin=4):
+        '''
+        Opponent move on a SparseBoard: the policy plays on the dense Board of the square window around the stones,
+        its cost depends on the area covered by the stones, not on board_size
+        '''
+        board = curr_state.board
+        x0, y0, side = box = board.window_box(margin)
+        local = GomokuState(board.window(box), curr_state.color)
+        local_prev, local_prev_action = None, None
+        if prev_state is not None:
+            local_prev = GomokuState(prev_state.board.window(box), prev_state.color)
+            i, j = board.action_to_coord(prev_action)
+            local_prev_action = (i - x0) * side + (j - y0)
+        action = self.opponent_policy(local, local_prev, local_prev_action)
+        return board.coord_to_action(action // side + x0, action % side + y0)
+    
+    def clone_state(self):
+        '''
+        Snapshot of the game, for lookahead against the env and its opponent without deepcopy
+        Return:
+            GomokuSnapshot of the board and side to move, moves, done flag, valid actions and random state
+        '''
+        return GomokuSnapshot(self.state, tuple(self.moves), self.done, self.action_space.get_state(), self.np_random.get_state())
+    
+    def restore_state(self, snapshot):
+        '''
+        Restore the game saved by clone_state(), the following steps replay the same as after the snapshot.
+        The opponent policy is not part of the snapshot: random and beginner only depend on the random state,
+        medium and expert search under a time budget and keep their own tree between moves.
+        '''
+        self.state = snapshot.state
+        self.moves = list(snapshot.moves)
+        self.done = snapshot.done
+        self.action_space.set_state(snapshot.action_space)
+        self.np_random.set_state(snapshot.rng_state)
+        if self.features is not None: # full recompute, the planes are not part of the snapshot
+            board = self.state.board
+            self.features.reset(board.board_state, board.last_action, self.state.color)
+        if self._board_obs is not None:
+            self.state.board.encode(self._board_obs)
+    
     @property
     def _state(self):
         return self.state
@@ -223,20 +502,36 @@ class GomokuEnv(gym.Env):
             self.opponent_policy = make_medium_policy(self.np_random)
         elif self.opponent == 'expert':
             self.opponent_policy = make_expert_policy(self.np_random)
+        elif callable(self.opponent):
+            self.opponent_policy = self.opponent(self.np_random)
         else:
             raise error.Error('Unrecognized opponent policy {}'.format(self.opponent))
 
 class Board(object):
     '''
     Basic Implementation of a Go Board, natural action are int [0,board_size**2)
+    board_state is a contiguous int8 np.ndarray of shape [board_size, board_size], 0 empty, 1 black, 2 white
+    rule: 'freestyle', 'standard' or 'renju', see gym_gomoku.envs.renju, black is to move when the number of stones is even
     '''
     
-    def __init__(self, board_size):
+    def __init__(self, board_size, rule='freestyle'):
+        if rule not in renju.RULES:
+            raise error.Error('Unrecognized rule {}'.format(rule))
         self.size = board_size
-        self.board_state = [[gomoku_util.color_dict['empty']] * board_size for i in range(board_size)] # initialize board states to empty
+        self.rule = rule
+        self.board_state = np.zeros((board_size, board_size), dtype=np.int8) # initialize board states to empty
         self.move = 0                 # how many move has been made
         self.last_coord = (-1,-1)     # last action coord
         self.last_action = None       # last action made
+        self.num_stones = 0           # stones on the board, full when equal to board_size**2
+        self.winner = "empty"         # color having 5-in-row: 'empty', 'black', 'white'
+        self.terminal = False         # game is finished, either 5-in-row or board full
+        self._empty = np.ones(board_size**2, dtype=bool) # legal action mask, updated in play()
+        self._legal_actions = None    # cached np.array of legal actions
+        self._legal_mask = None       # cached legal mask without the forbidden moves, renju rule with black to move
+        self._forbidden = None        # cached np.array of the forbidden moves of black, renju rule
+        self._candidates = {}         # radius -> mask of empty cells within radius of a stone, updated in play()
+        self.hash = 0                 # 64 bits Zobrist hash of the stones and the side to move, updated in play()
     
     def coord_to_action(self, i, j):
         ''' convert coordinate i, j to action a in [0, board_size**2)
@@ -252,98 +547,223 @@ class Board(object):
         ''' Get all the next legal move, namely empty space that you can place your 'color' stone
             Return: Coordinate of all the empty space, [(x1, y1), (x2, y2), ...]
         '''
-        legal_move = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if (self.board_state[i][j] == 0):
-                    legal_move.append((i, j))
+        actions = self.legal_actions() # row-major order
+        legal_move = list(zip((actions // self.size).tolist(), (actions % self.size).tolist()))
         return legal_move
     
     def get_legal_action(self):
         ''' Get all the next legal action, namely empty space that you can place your 'color' stone
-            Return: Coordinate of all the empty space, [(x1, y1), (x2, y2), ...]
+            Return: Action ID of all the empty space, [a1, a2, ...]
         '''
-        legal_action = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if (self.board_state[i][j] == 0):
-                    legal_action.append(self.coord_to_action(i, j))
+        legal_action = self.legal_actions().tolist()
         return legal_action
     
+    def legal_mask(self):
+        ''' Return: read-only np.array bool [board_size**2], True for the empty space,
+            except the forbidden moves when black is to move under the renju rule
+        '''
+        if self.rule == 'renju' and self.num_stones % 2 == 0:
+            if self._legal_mask is None:
+                self._legal_mask = self._empty.copy()
+                self._legal_mask[self.forbidden_actions()] = False
+                self._legal_mask.flags.writeable = False
+            return self._legal_mask
+        mask = self._empty.view()
+        mask.flags.writeable = False
+        return mask
+    
+    def legal_actions(self):
+        ''' Return: read-only np.array of the legal actions in increasing order, computed once per board
+        '''
+        if self._legal_actions is None:
+            self._legal_actions = np.flatnonzero(self.legal_mask())
+            self._legal_actions.flags.writeable = False
+        return self._legal_actions
+    
+    def is_legal(self, action):
+        if self.rule == 'renju':
+            return bool(self.legal_mask()[action])
+        return bool(self._empty[action])
+    
+    def forbidden_actions(self):
+        ''' Forbidden moves of black under the renju rule: overlines, double-threes and double-fours,
+            checked on the lines through the candidate cells only, computed once per board and cached per position
+            Return: read-only np.array of actions in increasing order, empty for the other rules
+        '''
+        if self._forbidden is None:
+            if self.rule == 'renju':
+                self._forbidden = renju.forbidden_actions(self.board_state, self.hash)
+            else:
+                self._forbidden = np.zeros(0, dtype=np.intp)
+        return self._forbidden
+    
+    def candidate_mask(self, radius=2):
+        ''' Empty space within radius (in both axis) of any stone, all False on an empty board.
+            Computed on the first query of a radius, then updated in play() for the following boards
+            Return: read-only np.array bool [board_size**2]
+        '''
+        if radius not in self._candidates:
+            stones = ~self._empty.reshape(self.size, self.size)
+            near = np.zeros((self.size + 2 * radius, self.size + 2 * radius), dtype=bool)
+            for dx in range(2 * radius + 1):
+                for dy in range(2 * radius + 1):
+                    near[dx:dx + self.size, dy:dy + self.size] |= stones
+            self._candidates[radius] = near[radius:radius + self.size, radius:radius + self.size].ravel() & self._empty
+        mask = self._candidates[radius].view()
+        mask.flags.writeable = False
+        return mask
+    
+    def get_candidate_action(self, radius=2):
+        ''' Return: Action ID of the empty space within radius of any stone, [a1, a2, ...]
+        '''
+        return np.flatnonzero(self.candidate_mask(radius)).tolist()
+    
     def copy(self, board_state):
-        '''update board_state of current board values from input 2D list
+        '''update board_state of current board values from input 2D list or np.array
         '''
         input_size_x = len(board_state)
         input_size_y = len(board_state[0])
         assert input_size_x == input_size_y, 'input board_state two axises size mismatch'
         assert len(self.board_state) == input_size_x, 'input board_state size mismatch'
-        for i in range(self.size):
-            for j in range(self.size):
-                self.board_state[i][j] = board_state[i][j]
+        self.board_state[...] = board_state # single buffer copy
+        self._empty = (self.board_state.ravel() == 0)
+        self._legal_actions = None
+        self._legal_mask = None
+        self._forbidden = None
+        self._candidates = {}
+        # arbitrary input position, recompute the win state on the whole board
+        exist, color = gomoku_util.check_five_in_row(self.board_state, self.rule)
+        num_stones = int(np.count_nonzero(self.board_state))
+        self.num_stones = num_stones
+        self.winner = color
+        self.terminal = exist or (num_stones == self.size ** 2)
+        self.hash = gomoku_util.zobrist_hash(self.board_state)
+    
+    def _clone(self):
+        '''Shallow copy of all the attributes, with its own copy of the board_state buffer and of the cached masks
+        '''
+        b = Board.__new__(Board)
+        b.__dict__.update(self.__dict__)
+        b.board_state = self.board_state.copy()
+        b._empty = self._empty.copy()
+        b._legal_actions = None
+        b._candidates = dict((radius, candidates.copy()) for radius, candidates in self._candidates.items())
+        return b
     
     def play(self, action, color):
         '''
             Args: input action, current player color
             Return: new copy of board object
         '''
-        b = Board(self.size)
-        b.copy(self.board_state) # create a board copy of current board_state
-        b.move = self.move
-        
+        self._check_legal(action, color)
+        b = self._clone() # create a board copy of current board_state, one buffer copy
+        b._place(action, color)
+        return b
+    
+    def place(self, action, color):
+        '''
+            Play the action in place, without copying the board. Use unplace() to take it back
+            Args: input action, current player color
+            Return: undo record to pass to unplace()
+        '''
+        self._check_legal(action, color)
+        return self._place(action, color)
+    
+    def unplace(self, record):
+        '''
+            Take back the last placed stone, restoring exactly the board before place()
+            Args: undo record returned by the matching place()
+        '''
+        action, coord, last_coord, last_action, hash, winner, terminal, legal_actions, boxes, legal_mask, forbidden = record
+        self.board_state[coord[0], coord[1]] = 0
+        self.move -= 1
+        self.num_stones -= 1
+        self.last_coord, self.last_action = last_coord, last_action
+        self.hash = hash
+        self.winner, self.terminal = winner, terminal
+        self._empty[action] = True
+        self._legal_actions = legal_actions
+        self._legal_mask, self._forbidden = legal_mask, forbidden
+        for radius, x0, y0, near in boxes:
+            candidates = self._candidates.get(radius)
+            if candidates is not None:
+                candidates.reshape(self.size, self.size)[x0:x0 + near.shape[0], y0:y0 + near.shape[1]] = near
+    
+    def _check_legal(self, action, color=None):
         coord = self.action_to_coord(action)
-        # check if it's legal move
-        if (b.board_state[coord[0]][coord[1]] != 0): # the action coordinate is not empty
+        if (self.board_state[coord[0], coord[1]] != 0): # the action coordinate is not empty
             raise error.Error("Action is illegal, position [%d, %d] on board is not empty" % ((coord[0]+1),(coord[1]+1)))
+        if self.rule == 'renju' and color == gomoku_util.BLACK and action in self.forbidden_actions():
+            raise error.Error("Action is illegal, position [%d, %d] is forbidden for black by the renju rule" % ((coord[0]+1),(coord[1]+1)))
+    
+    def _place(self, action, color):
+        '''Set the stone and update the cached state in place, Return: undo record
+        '''
+        coord = self.action_to_coord(action)
+        boxes = []
+        record = (action, coord, self.last_coord, self.last_action, self.hash, self.winner, self.terminal, self._legal_actions, boxes,
+                  self._legal_mask, self._forbidden)
+        self.board_state[coord[0], coord[1]] = gomoku_util.color_dict[color]
+        self.move += 1 # move counter add 1
+        self.num_stones += 1
+        self.last_coord = coord # save last coordinate
+        self.last_action = action
+        keys, side = gomoku_util.zobrist_keys(self.size)
+        self.hash ^= keys[gomoku_util.color_dict[color]][action] ^ side
+        self._empty[action] = False
+        self._legal_actions = None
+        self._legal_mask = None
+        self._forbidden = None
         
-        b.board_state[coord[0]][coord[1]] = gomoku_util.color_dict[color]
-        b.move += 1 # move counter add 1
-        b.last_coord = coord # save last coordinate
-        b.last_action = action
-        return b
+        # the new stone adds its empty neighbours to the candidates
+        for radius, candidates in self._candidates.items():
+            x0, y0 = max(coord[0] - radius, 0), max(coord[1] - radius, 0)
+            near = candidates.reshape(self.size, self.size)[x0:coord[0] + radius + 1, y0:coord[1] + radius + 1]
+            boxes.append((radius, x0, y0, near.copy()))
+            near |= self._empty.reshape(self.size, self.size)[x0:coord[0] + radius + 1, y0:coord[1] + radius + 1]
+            candidates[action] = False
+        
+        # only the four lines through the new stone can form a new 5-in-row
+        if not self.terminal:
+            exist, win_color = gomoku_util.check_five_at(self.board_state, coord, self.rule)
+            self.winner = win_color
+            self.terminal = exist or (self.num_stones == self.size ** 2)
+        return record
     
     def is_terminal(self):
-        exist, color = gomoku_util.check_five_in_row(self.board_state)
-        is_full = gomoku_util.check_board_full(self.board_state)
-        if (is_full): # if the board if full of stones and no extra empty spaces, game is finished
-            return True
-        else:
-            return exist
+        '''Win state is updated incrementally in play(), 5-in-row or board full
+        '''
+        return self.terminal
+    
+    def __eq__(self, other):
+        ''' Boards of the same size are equal if their Zobrist hashes are equal
+        '''
+        return isinstance(other, Board) and self.size == other.size and self.hash == other.hash
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __hash__(self):
+        return self.hash
     
     def __repr__(self):
         ''' representation of the board class
             print out board_state
         '''
-        out = ""
         size = len(self.board_state)
-        
-        letters = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ')[:size]
-        numbers = list(range(1, 100))[:size]
-        
-        label_move = "Move: " + str(self.move) + "\n"
-        label_letters = "     " + " ".join(letters) + "\n"
-        label_boundry = "   " + "+-" + "".join(["-"] * (2 * size)) + "+" + "\n"
-        
-        # construct the board output
-        out += (label_move + label_letters + label_boundry)
-        
-        for i in range(size-1,-1,-1):
-            line = ""
-            line += (str("%2d" % (i+1)) + " |" + " ")
-            for j in range(size):
-                # check if it's the last move
-                line += gomoku_util.color_shape[self.board_state[i][j]]
-                if (i,j) == self.last_coord:
-                    line += ")"
-                else:
-                    line += " "
-            line += ("|" + "\n")
-            out += line
-        out += (label_boundry + label_letters)
-        return out
-    
-    def encode(self):
-        '''Return: np array
-            np.array(board_size, board_size): state observation of the board
-        '''
-        img = np.array(self.board_state) # shape [board_size, board_size]
+        state = self.board_state
+        return gomoku_util.format_board(lambda i, j: state[i, j], self.move, self.last_coord, range(size), range(size))
+    
+    def encode(self, out=None):
+        '''Args:
+            out: optional np array of shape [board_size, board_size], the board is written into it
+        Return: np array
+            np.array(board_size, board_size): state observation of the board,
+            a read-only view of board_state without copy if out is None
+        '''
+        if out is not None:
+            np.copyto(out, self.board_state)
+            return out
+        img = self.board_state.view() # shape [board_size, board_size]
+        img.flags.writeable = False
         return img
@@ -0,0 +1,42 @@
+'''Timing of the phases of GomokuEnv._step and _reset, see GomokuEnv.enable_profiling()
+'''
+
+import time
+
+class StepProfiler(object):
+    '''
+    Time and count of each phase of the current episode, e.g. agent_move, opponent_play, is_terminal, encode, action_space.
+    Every measure is also passed to the hooks, hook(phase, seconds), to forward it to a metrics sink.
+    '''
+    def __init__(self, hooks=None, clock=time.perf_counter):
+        self.hooks = list(hooks or [])
+        self.clock = clock
+        self.totals = {}
+        self.counts = {}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def start(self):
+        return self.clock()
+
+    def lap(self, phase, t):
+        '''Record the time since t for phase, Return: the current time, start of the next phase
+        '''
+        now = self.clock()
+        seconds = now - t
+        self.totals[phase] = self.totals.get(phase, 0.) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+        for hook in self.hooks:
+            hook(phase, seconds)
+        return now
+
+    def clear(self):
+        self.totals = {}
+        self.counts = {}
+
+    def stats(self):
+        '''Return: dict phase -> {'count', 'total' seconds, 'mean' seconds} of the current episode
+        '''
+        return dict((phase, {'count': count, 'total': self.totals[phase], 'mean': self.totals[phase] / count})
+                    for phase, count in self.counts.items())
@@ -0,0 +1,164 @@
+'''Rule variants: 'freestyle' five or more in a row wins, 'standard' exactly five wins,
+'renju' black wins with exactly five and may not play overlines, double-threes and double-fours, white wins with five or more.
+Forbidden moves of black are found on the 4 lines through each candidate cell only, and cached per position.
+'''
+
+import numpy as np
+
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.util import PositionCache
+
+RULES = ('freestyle', 'standard', 'renju')
+RADIUS = 5          # fives, overlines, fours and threes of a cell only depend on the cells up to 5 steps away on a line
+BLACK = 1
+_line_cache = {}    # board size -> line_index() list
+_pattern_cache = {} # line code -> (five, overline, fours, three cells), see line_pattern()
+_forbidden_cache = PositionCache(2**14)
+WEIGHTS = 4 ** np.arange(2 * RADIUS + 1, dtype=np.int64) # base 4 code of a line, cell k in digit k
+
+def line_index(size):
+    '''Return: [direction][action] list of 2 * RADIUS + 1 flat cell index of the line through action, centered on it,
+        size**2 off the board, the python list of LineIndex.segments() for the recursive checks'''
+    if size not in _line_cache:
+        _line_cache[size] = gomoku_util.line_index(size).segments(RADIUS).tolist()
+    return _line_cache[size]
+
+def _run(line, k):
+    '''Return: (lo, hi) inclusive bounds of the black stones contiguous to line[k]'''
+    lo, hi = k, k
+    while lo > 0 and line[lo - 1] == BLACK:
+        lo -= 1
+    while hi < len(line) - 1 and line[hi + 1] == BLACK:
+        hi += 1
+    return lo, hi
+
+def _five_points(line):
+    '''Return: cells of line where black makes exactly five with the center stone'''
+    points = []
+    for e in range(RADIUS - 4, RADIUS + 5):
+        if line[e] == 0:
+            line[e] = BLACK
+            lo, hi = _run(line, e)
+            if hi - lo == 4 and lo <= RADIUS <= hi:
+                points.append(e)
+            line[e] = 0
+    return points
+
+def _is_straight_four(points):
+    return len(points) == 2 and points[1] - points[0] == 5
+
+def line_pattern(code):
+    '''
+    Args:
+        code: base 4 code of the 2 * RADIUS + 1 cells of a line, 0 empty, 1 black, 2 white, 3 off the board,
+            black stone in the center
+    Return: (five: exactly five through the center, overline: six or more, number of fours of the center stone,
+        a straight four .XXXX. counts once, tuple of the cells where black makes a straight four: the three is real
+        if one of them is not forbidden), memoized per code
+    '''
+    pattern = _pattern_cache.get(code)
+    if pattern is None:
+        cells = [(code >> (2 * k)) & 3 for k in range(2 * RADIUS + 1)]
+        lo, hi = _run(cells, RADIUS)
+        points = _five_points(cells)
+        fours = 1 if _is_straight_four(points) else len(points)
+        threes = []
+        if fours == 0:
+            for e in range(RADIUS - 4, RADIUS + 5):
+                if cells[e] == 0:
+                    cells[e] = BLACK
+                    if _is_straight_four(_five_points(cells)):
+                        threes.append(e)
+                    cells[e] = 0
+        pattern = _pattern_cache[code] = (hi - lo == 4, hi - lo >= 5, fours, tuple(threes))
+    return pattern
+
+def _forbidden_by_patterns(patterns, cells, index, action, depth):
+    '''Decide on the line_pattern() of the 4 directions of action, see is_forbidden()'''
+    if any(p[0] for p in patterns):
+        return False # five wins
+    if any(p[1] for p in patterns):
+        return True  # overline
+    if sum(p[2] for p in patterns) >= 2:
+        return True
+    threes = [(d, p[3]) for d, p in enumerate(patterns) if p[3]]
+    if len(threes) < 2 or depth == 0:
+        return len(threes) >= 2
+    cells[action] = BLACK
+    try:
+        real = sum(1 for d, three in threes if any(not is_forbidden(cells, index, index[d][action][e], depth - 1) for e in three))
+    finally:
+        cells[action] = 0
+    return real >= 2
+
+def is_forbidden(cells, index, action, depth=2):
+    '''
+    Args:
+        cells: list of the flat board cells, with one more cell 3 (off the board) at the end, restored on return
+        index: line_index() of the board size
+        action: empty cell to check for black
+        depth: recursion depth of the check that the straight four of a three is not itself forbidden
+    Return: True if black may not play action: overline, double four or double three, unless it makes exactly five
+    '''
+    if cells[action] != 0:
+        return False
+    patterns = []
+    for line in (index[d][action] for d in range(len(index))):
+        code = 0
+        for k, cell in enumerate(line):
+            code |= (BLACK if k == RADIUS else cells[cell]) << (2 * k)
+        patterns.append(line_pattern(code))
+    return _forbidden_by_patterns(patterns, cells, index, action, depth)
+
+def _candidates(state, lines):
+    '''candidate_cells() on the line segments lines [4, size**2, 2 * RADIUS + 1] of every cell'''
+    inner = lines[:, :, 1:-1] # 4 steps on both sides
+    black = np.zeros(inner.shape[:2] + (10,), dtype=np.int8)
+    blocked = np.zeros_like(black)
+    np.cumsum(inner == BLACK, axis=2, out=black[:, :, 1:])
+    np.cumsum(inner > BLACK, axis=2, out=blocked[:, :, 1:]) # white or off the board
+    # the 5 windows of 5 cells through the cell start at 0..4
+    count = black[:, :, 5:] - black[:, :, :5]
+    clean = (blocked[:, :, 5:] - blocked[:, :, :5]) == 0
+    best = np.where(clean, count, 0).max(axis=2)
+    return np.flatnonzero((state.ravel() == 0) & (((best >= 2).sum(axis=0) >= 2) | (best >= 3).any(axis=0)))
+
+def candidate_cells(board_state):
+    '''
+    Empty cells which may be forbidden for black, vectorized over the board: in 2 directions, or in one with 3
+    (fours, overline), a window of 5 cells through the cell holds 2 other black stones and no white stone or edge
+    Return: np.array of flat index
+    '''
+    state = np.asarray(board_state)
+    return _candidates(state, np.append(state.ravel(), 3)[gomoku_util.line_index(state.shape[0]).segments(RADIUS)])
+
+def forbidden_actions(board_state, hash=None):
+    '''
+    Args:
+        board_state: np.array of the position
+        hash: optional position hash, e.g. Board.hash, the result is cached under it
+    Return: read-only np.array of the forbidden actions of black in increasing order
+    '''
+    state = np.asarray(board_state)
+    key = None if hash is None else (state.shape[0], hash)
+    if key is not None:
+        forbidden = _forbidden_cache.get(key)
+        if forbidden is not None:
+            return forbidden
+    lines = np.append(state.ravel(), 3)[gomoku_util.line_index(state.shape[0]).segments(RADIUS)]
+    candidates = _candidates(state, lines)
+    forbidden = []
+    if len(candidates) > 0:
+        segments = lines[:, candidates].astype(np.int64)
+        segments[:, :, RADIUS] = BLACK
+        codes = segments.dot(WEIGHTS).T.tolist() # [candidate][direction]
+        cells = state.ravel().tolist() + [3]
+        index = line_index(state.shape[0])
+        for action, line_codes in zip(candidates.tolist(), codes):
+            if _forbidden_by_patterns([line_pattern(c) for c in line_codes], cells, index, action, 2):
+                forbidden.append(action)
+    forbidden = np.array(forbidden, dtype=np.intp)
+    forbidden.flags.writeable = False
+    if key is not None:
+        _forbidden_cache.put(key, forbidden)
+    return forbidden
@@ -0,0 +1,703 @@
+'''Search based opponents: iterative deepening alpha-beta for the medium policy, MCTS for the expert policy,
+and a threat-space solver of forced wins (VCF/VCT) both consult before their search
+'''
+
+import time
+import numpy as np
+
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.util import PositionCache
+
+class WindowIndex(object):
+    '''
+    All the windows of 5 cells on the board of one size, and for each cell the windows containing it.
+    Shared by the searchers of the same board size.
+    '''
+    _cache = {}
+
+    def __init__(self, size, radius):
+        self.size = size
+        windows = [] # list of tuple of 5 flat cell index
+        for (dx, dy) in gomoku_util.directions:
+            for i in range(size):
+                for j in range(size):
+                    if 0 <= i + 4 * dx < size and 0 <= j + 4 * dy < size:
+                        windows.append(tuple((i + k * dx) * size + (j + k * dy) for k in range(5)))
+        self.num_windows = len(windows)
+        self.windows = np.array(windows, dtype=np.intp) # [num_windows, 5] cells of each window
+        cell_windows = [[] for _ in range(size * size)]
+        for w, cells in enumerate(windows):
+            for c in cells:
+                cell_windows[c].append(w)
+        self.cell_windows = [np.array(ws, dtype=np.intp) for ws in cell_windows]
+        # windows of each cell in one matrix [size**2, 20], padded with the extra window num_windows
+        self.cell_window_matrix = np.full((size * size, 20), self.num_windows, dtype=np.intp)
+        for c, ws in enumerate(cell_windows):
+            self.cell_window_matrix[c, :len(ws)] = ws
+        # cells within radius of each cell, used to generate the candidate moves
+        self.neighbours = []
+        for i in range(size):
+            for j in range(size):
+                self.neighbours.append(np.array([x * size + y for x in range(max(i - radius, 0), min(i + radius + 1, size))
+                    for y in range(max(j - radius, 0), min(j + radius + 1, size)) if (x, y) != (i, j)], dtype=np.intp))
+
+    @classmethod
+    def get(cls, size, radius=2):
+        index = cls._cache.get((size, radius))
+        if index is None:
+            index = cls._cache[(size, radius)] = WindowIndex(size, radius)
+        return index
+
+class SearchTimeout(Exception):
+    pass
+
+class SearchPosition(object):
+    '''
+    Position of a search, updated in place by make() and unmake().
+    The evaluation sums a weight for every window of 5 cells holding stones of only one color,
+    it is updated incrementally when a stone is placed or removed, with the Zobrist hash and
+    the count of stones near each cell used to generate the candidate moves.
+    '''
+    WEIGHT = [0, 1, 10, 100, 1000, 100000]  # value of a window with k stones of one color only
+    ATTACK = [1, 10, 100, 1000, 100000, 0]  # move ordering, extend a window with k own stones
+    DEFEND = [0, 5, 50, 500, 50000, 0]      # move ordering, block a window with k opponent stones
+
+    def __init__(self, size, width=10, radius=2):
+        '''
+        Args:
+            size: board size
+            width: number of best ordered moves returned by ordered_moves()
+            radius: candidate moves are empty cells within radius of a stone
+        '''
+        self.size = size
+        self.width = width
+        self.index = WindowIndex.get(size, radius)
+        # gain[k, o]: change of the value of a window with k own and o opponent stones when one own stone is added
+        value = [[(self.WEIGHT[k] if o == 0 else (-self.WEIGHT[o] if k == 0 else 0)) for o in range(6)] for k in range(6)]
+        self.gain = np.array([[value[min(k + 1, 5)][o] - value[k][o] for o in range(6)] for k in range(6)], dtype=np.int64)
+        self.sign = [0, 1, -1] # the evaluation is from black's view
+        # order[k, o]: move ordering value of a window with k own and o opponent stones
+        self.order = np.array([[(self.ATTACK[k] if o == 0 else 0) + (self.DEFEND[o] if k == 0 else 0) for o in range(6)] for k in range(6)], dtype=np.int64)
+        # same keys as Board.hash, the position key of val to move is hash ^ side[val]
+        self.zobrist, side = gomoku_util.zobrist_keys(size)
+        self.side = [0, 0, side]
+
+    def set_position(self, board_state):
+        '''Load the position of board_state, 2D list or np.array
+        '''
+        state = np.asarray(board_state).ravel()
+        n = self.index.num_windows
+        self.cells = np.zeros(len(state), dtype=np.int8)
+        # stones of black (row 1) and white (row 2) in each window, the extra padding window is blocked by both colors
+        self.count = np.zeros((3, n + 1), dtype=np.int64)
+        self.count[1:, n] = 1
+        self.near = np.zeros(len(state), dtype=np.int64) # stones within radius of each cell
+        self.score = 0                                   # evaluation from black's view
+        self.hash = 0
+        for c in np.flatnonzero(state).tolist():
+            self.make(c, int(state[c]))
+
+    def make(self, cell, val):
+        '''Place stone val on cell, Return: True if it makes 5-in-row
+        '''
+        ws = self.index.cell_windows[cell]
+        own, other = self.count[val, ws], self.count[3 - val, ws]
+        self.score += self.sign[val] * int(self.gain[own, other].sum())
+        self.count[val, ws] = own + 1
+        self.cells[cell] = val
+        self.hash ^= self.zobrist[val][cell]
+        self.near[self.index.neighbours[cell]] += 1
+        return bool(own.max() == 4)
+
+    def unmake(self, cell, val):
+        '''Remove stone val from cell, exact undo of make()
+        '''
+        ws = self.index.cell_windows[cell]
+        own, other = self.count[val, ws] - 1, self.count[3 - val, ws]
+        self.score -= self.sign[val] * int(self.gain[own, other].sum())
+        self.count[val, ws] = own
+        self.cells[cell] = 0
+        self.hash ^= self.zobrist[val][cell]
+        self.near[self.index.neighbours[cell]] -= 1
+
+    def ordered_moves(self, val, first=None):
+        '''Candidate moves near the stones, best first by their attack and defend value
+        '''
+        candidates = np.flatnonzero((self.cells == 0) & (self.near > 0))
+        if len(candidates) == 0:
+            return []
+        window_order = self.order[self.count[val], self.count[3 - val]]
+        scores = window_order[self.index.cell_window_matrix[candidates]].sum(axis=1)
+        best = np.argsort(-scores, kind='stable')[:self.width]
+        moves = candidates[best].tolist()
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def forced_move(self, val):
+        '''Return: the move making 5-in-row for val, else the move blocking 5-in-row of the opponent, else None
+        '''
+        for v in [val, 3 - val]:
+            for m in self.ordered_moves(v)[:2]: # a move completing a five is always ordered first
+                five = self.make(m, v)
+                self.unmake(m, v)
+                if five:
+                    return m
+        return None
+
+class AlphaBetaSearch(SearchPosition):
+    '''
+    Iterative deepening negamax alpha-beta search over the moves near existing stones,
+    with a transposition table and a budget of time or nodes per move.
+    '''
+    WIN = 10 ** 8
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, size, max_depth=4, time_limit=0.005, max_nodes=None, width=10, radius=2, np_random=None, table=None):
+        '''
+        Args:
+            size: board size
+            max_depth: maximum depth of the iterative deepening
+            time_limit: wall-clock budget per move in seconds, None for no limit
+            max_nodes: node budget per move, None for no limit
+            width: number of best ordered moves searched at each node
+            radius: candidate moves are empty cells within radius of a stone
+            np_random: random state to break ties between the best root moves
+            table: PositionCache used as transposition table, a new one of 2**18 entries if None
+        '''
+        SearchPosition.__init__(self, size, width, radius)
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.np_random = np_random if np_random is not None else np.random.RandomState()
+        # transposition table: hash -> (depth, value, flag, best move), depth-preferred replacement
+        self.table = table if table is not None else PositionCache(2 ** 18, 'depth')
+        self.nodes = 0
+        self.depth_reached = 0
+
+    def check_budget(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout()
+        if (self.nodes & 15) == 0 and self.time_limit is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+
+    def negamax(self, depth, alpha, beta, val, ply):
+        '''Return: value of the position for val, the side to move
+        '''
+        self.check_budget()
+        alpha_orig = alpha
+        key = self.hash ^ self.side[val]
+        entry = self.table.get(key)
+        best_move = None
+        if entry is not None:
+            best_move = entry[3]
+            if entry[0] >= depth:
+                if entry[2] == self.EXACT:
+                    return entry[1]
+                elif entry[2] == self.LOWER:
+                    alpha = max(alpha, entry[1])
+                else:
+                    beta = min(beta, entry[1])
+                if alpha >= beta:
+                    return entry[1]
+        if depth == 0:
+            return self.score if val == 1 else -self.score
+
+        moves = self.ordered_moves(val, best_move)
+        if len(moves) == 0: # board full, draw
+            return 0
+        best = -self.WIN * 2
+        for m in moves:
+            try:
+                if self.make(m, val):
+                    v = self.WIN - ply
+                else:
+                    v = -self.negamax(depth - 1, -beta, -alpha, 3 - val, ply + 1)
+            finally: # also undo the move when the budget runs out
+                self.unmake(m, val)
+            if v > best:
+                best, best_move = v, m
+            alpha = max(alpha, v)
+            if alpha >= beta:
+                break
+
+        flag = self.EXACT
+        if best <= alpha_orig:
+            flag = self.UPPER
+        elif best >= beta:
+            flag = self.LOWER
+        self.table.put(key, (depth, best, flag, best_move), depth)
+        return best
+
+    def search_root(self, depth, val, moves):
+        '''Return: list of (value, move) of all root moves searched to depth
+        '''
+        results = []
+        alpha = -self.WIN * 2
+        for m in moves:
+            try:
+                if self.make(m, val):
+                    v = self.WIN
+                else:
+                    # moves worse than the best so far only get an upper bound, the ties are searched exactly
+                    v = -self.negamax(depth - 1, -self.WIN * 2, -alpha + 1, 3 - val, 1)
+            finally:
+                self.unmake(m, val)
+            results.append((v, m))
+            alpha = max(alpha, v)
+        return results
+
+    def search(self, board_state, color, deadline=None):
+        '''
+        Args:
+            board_state: 2D list or np.array of the position
+            color: color to play, 'black' or 'white'
+            deadline: time.time() at which the search stops, time_limit from now if None,
+                e.g. to count the time already spent on the move by the threat solver
+        Return: action of the best move, -1 if the board is full
+        '''
+        self.deadline = deadline if deadline is not None else time.time() + (self.time_limit or 0.)
+        self.set_position(board_state)
+        self.nodes = 0
+        self.depth_reached = 0
+        val = gomoku_util.color_dict[color]
+
+        if not self.near.any(): # empty board, play the center
+            center = (self.size // 2) * self.size + self.size // 2
+            return center
+
+        moves = self.ordered_moves(val)
+        if len(moves) == 0:
+            return -1
+        best_results = [(0, moves[0])]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                results = self.search_root(depth, val, moves)
+            except SearchTimeout:
+                if depth > 1:
+                    break
+                # the first depth always completes, without budget
+                self.time_limit, time_limit = None, self.time_limit
+                self.max_nodes, max_nodes = None, self.max_nodes
+                try:
+                    results = self.search_root(depth, val, moves)
+                finally:
+                    self.time_limit, self.max_nodes = time_limit, max_nodes
+            best_results = results
+            self.depth_reached = depth
+            top = max(v for v, _ in results)
+            if abs(top) >= self.WIN - self.max_depth: # forced win or loss found
+                break
+            # search the best moves first at the next depth
+            moves = [m for _, m in sorted(results, key=lambda r: -r[0])]
+        top = max(v for v, _ in best_results)
+        best_moves = [m for v, m in best_results if v == top]
+        return best_moves[self.np_random.choice(len(best_moves))]
+
+class ThreatSolver(SearchPosition):
+    '''
+    Threat-space search for forced wins of one color, the attacker.
+    VCF (victory by continuous fours): the attacker only plays fours, the defender must block each one,
+    the attacker wins with a double four or a five. VCT (victory by continuous threats) also plays threes:
+    moves after which the attacker would win by VCF if the defender passed. The defender answers a three on the
+    cells of that VCF, on the empty cells of the windows the attacker can make a four in, or with a counter four:
+    VCF wins are proven, VCT wins rely on this usual threat-space approximation of the defenses.
+    Proven and disproven positions are kept in a PositionCache, each solve has a node budget and an optional deadline.
+    Positions without a window where the attacker can make a four are quiet and return at once.
+    '''
+    VCF, VCT = 1, 2
+
+    def __init__(self, size, max_nodes=2000, vcf_depth=12, vct_depth=3, width=8, table=None):
+        '''
+        Args:
+            size: board size
+            max_nodes: node budget of one solve, the result is unknown (None) when it runs out
+            vcf_depth: maximum number of fours of a VCF
+            vct_depth: maximum number of threes of a VCT
+            width: number of three moves tried at each VCT node
+            table: PositionCache of the proven and disproven positions, a new one of 2**16 entries if None
+        '''
+        SearchPosition.__init__(self, size, width)
+        self.max_nodes = max_nodes
+        self.vcf_depth = vcf_depth
+        self.vct_depth = vct_depth
+        # hash -> (proven, depth, winning move), a disproven position is only known up to depth
+        self.table = table if table is not None else PositionCache(2 ** 16, 'depth')
+        self.salt = [0, 0x9e3779b97f4a7c15, 0xc2b2ae3d27d4eb4f] # VCF and VCT keys differ
+        self.nodes = 0
+        self.deadline = None
+
+    def check_budget(self):
+        self.nodes += 1
+        if self.nodes >= self.max_nodes:
+            raise SearchTimeout()
+        if (self.nodes & 15) == 0 and self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+
+    def window_cells(self, val, own):
+        '''Return: list of the empty cells of the windows with own stones of val and none of the opponent'''
+        n = self.index.num_windows
+        ws = np.flatnonzero((self.count[val, :n] == own) & (self.count[3 - val, :n] == 0))
+        if len(ws) == 0:
+            return []
+        cells = self.index.windows[ws].ravel()
+        return cells[self.cells[cells] == 0].tolist()
+
+    def five_points(self, val):
+        '''Return: sorted distinct cells where val makes 5-in-row'''
+        return sorted(set(self.window_cells(val, 4)))
+
+    def four_moves(self, val):
+        '''Return: cells where val makes a four, most fours first'''
+        counts = {}
+        for c in self.window_cells(val, 3):
+            counts[c] = counts.get(c, 0) + 1
+        return sorted(counts, key=lambda c: (-counts[c], c))
+
+    def three_moves(self, val):
+        '''Return: up to width cells where val makes 3 stones in a window, most windows first'''
+        counts = {}
+        for c in self.window_cells(val, 2):
+            counts[c] = counts.get(c, 0) + 1
+        return sorted(counts, key=lambda c: (-counts[c], c))[:self.width]
+
+    def lookup(self, mode, val, depth):
+        entry = self.table.get(self.hash ^ self.side[val] ^ self.salt[mode])
+        if entry is None or (not entry[0] and entry[1] < depth):
+            return None
+        return entry
+
+    def store(self, mode, val, depth, proven, move=None):
+        self.table.put(self.hash ^ self.side[val] ^ self.salt[mode], (proven, depth, move), depth)
+
+    def vcf(self, val, depth):
+        '''Return: winning move of val, the attacker to move, by continuous fours, else None'''
+        self.check_budget()
+        five = self.five_points(val)
+        if len(five) > 0:
+            return five[0]
+        block = self.five_points(3 - val)
+        if len(block) > 1 or depth == 0:
+            return None
+        entry = self.lookup(self.VCF, val, depth)
+        if entry is not None:
+            return entry[2]
+        moves = self.four_moves(val)
+        if len(block) == 1: # the attacker must block the five of the defender, with a four
+            moves = [m for m in moves if m == block[0]]
+        win = None
+        for m in moves:
+            self.make(m, val)
+            try:
+                fives = self.five_points(val)
+                if len(fives) > 1:   # double four, the defender can not block both
+                    win = m
+                elif len(fives) == 1:
+                    d = fives[0]
+                    if not self.make(d, 3 - val):
+                        try:
+                            if self.vcf(val, depth - 1) is not None:
+                                win = m
+                        finally:
+                            self.unmake(d, 3 - val)
+                    else:
+                        self.unmake(d, 3 - val)
+            finally:
+                self.unmake(m, val)
+            if win is not None:
+                break
+        self.store(self.VCF, val, depth, win is not None, win)
+        return win
+
+    def vcf_line(self, val):
+        '''Return: list of the cells of the winning VCF of val, the fours, the blocks and the final five points, else None'''
+        line, played = [], []
+        try:
+            while True:
+                m = self.vcf(val, self.vcf_depth - len(played) // 2)
+                if m is None:
+                    return None
+                line.append(m)
+                if self.make(m, val):
+                    played.append((m, val))
+                    return line
+                played.append((m, val))
+                fives = self.five_points(val)
+                line.extend(fives)
+                if len(fives) > 1:
+                    return line
+                self.make(fives[0], 3 - val)
+                played.append((fives[0], 3 - val))
+        finally:
+            for cell, v in reversed(played):
+                self.unmake(cell, v)
+
+    def vct(self, val, depth):
+        '''Return: winning move of val, the attacker to move, by continuous fours and threes, else None'''
+        win = self.vcf(val, self.vcf_depth)
+        if win is not None or depth == 0 or len(self.five_points(3 - val)) > 0:
+            return win
+        entry = self.lookup(self.VCT, val, depth)
+        if entry is not None:
+            return entry[2]
+        for m in self.three_moves(val):
+            self.make(m, val)
+            try:
+                line = self.vcf_line(val)
+                if line is None: # not a threat
+                    continue
+                # defenses: the cells of the VCF, the empty cells of the windows the attacker can make a four in,
+                # and the counter fours
+                defenses = set(line) | set(self.window_cells(val, 3)) | set(self.four_moves(3 - val))
+                refuted = len(defenses) == 0
+                for d in sorted(defenses):
+                    five = self.make(d, 3 - val)
+                    try:
+                        refuted = five or self.vct(val, depth - 1) is None
+                    finally:
+                        self.unmake(d, 3 - val)
+                    if refuted:
+                        break
+                if not refuted:
+                    win = m
+            finally:
+                self.unmake(m, val)
+            if win is not None:
+                break
+        self.store(self.VCT, val, depth, win is not None, win)
+        return win
+
+    def is_quiet(self, board_state, val):
+        '''
+        Return: True if val has no window of 5 cells with 3 or more of its stones and none of the opponent:
+            no four can be made and there is no open or broken three, so there is neither a VCF nor a VCT
+            starting from a three, checked on the windows without loading the position
+        '''
+        stones = np.asarray(board_state).ravel()[self.index.windows]
+        return not (((stones == val).sum(axis=1) >= 3) & ~(stones == 3 - val).any(axis=1)).any()
+
+    def solve(self, board_state, color, vct=True, deadline=None):
+        '''
+        Args:
+            board_state: 2D list or np.array of the position, color to move
+            color: attacker, 'black' or 'white'
+            vct: also search threes, else only fours
+            deadline: time.time() at which the solve gives up, None for the node budget only
+        Return: first move of a forced win of color, None if there is none or the node or time budget runs out
+        '''
+        self.nodes = 0
+        self.deadline = deadline
+        val = gomoku_util.color_dict[color]
+        if self.is_quiet(board_state, val):
+            return None
+        self.set_position(board_state)
+        try:
+            return self.vct(val, self.vct_depth if vct else 0)
+        except SearchTimeout:
+            return None
+
+_solvers = {}
+
+def solve(board, color, vct=True, max_nodes=2000):
+    '''
+    Forced win search, see ThreatSolver. The solvers and their caches are kept per board size.
+    Args:
+        board: Board or 2D list or np.array board_state
+        color: attacker, 'black' or 'white', to move
+    Return: first move (action) of a forced win of color, None if none was found within max_nodes
+    '''
+    board_state = getattr(board, 'board_state', board)
+    size = len(board_state)
+    if size not in _solvers:
+        _solvers[size] = ThreatSolver(size)
+    solver = _solvers[size]
+    solver.max_nodes = max_nodes
+    return solver.solve(board_state, color, vct)
+
+class MCTSNode(object):
+    '''
+    Node of the MCTS tree, the position after player val played move
+    '''
+    __slots__ = ['move', 'val', 'parent', 'children', 'untried', 'visits', 'wins', 'winner', 'hash']
+
+    def __init__(self, move, val, parent, hash):
+        self.move = move        # move leading to this node, None at the root of a new game
+        self.val = val          # player who played move, 1 black or 2 white
+        self.parent = parent
+        self.children = []
+        self.untried = None     # moves not expanded yet, best first, computed on the first expansion
+        self.visits = 0
+        self.wins = 0.          # sum of the results for player val
+        self.winner = 0         # val if move made 5-in-row, the node is terminal
+        self.hash = hash        # Zobrist hash of the position
+
+    def select(self, c):
+        '''Return the child with the best UCT value
+        '''
+        log_visits = np.log(self.visits)
+        best, best_value = None, -1.
+        for child in self.children:
+            value = child.wins / child.visits + c * np.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+class MCTSSearch(SearchPosition):
+    '''
+    Monte Carlo tree search with UCT selection, expansion of the best ordered candidate moves and
+    short random rollouts among the cells near the stones, scored by the window evaluation at the end.
+    The tree is kept between moves: the next search starts from the subtree of the position reached.
+    '''
+    def __init__(self, size, max_simulations=None, time_limit=0.1, rollout_depth=4, width=12, radius=2, c=0.5, np_random=None):
+        '''
+        Args:
+            size: board size
+            max_simulations: simulation budget per move, None for no limit
+            time_limit: wall-clock budget per move in seconds, None for no limit
+            rollout_depth: number of random moves of a rollout before it is scored by the evaluation
+            width: number of best ordered moves expanded at each node
+            radius: candidate moves are empty cells within radius of a stone
+            c: exploration constant of UCT
+            np_random: random state of the rollouts
+        '''
+        assert (max_simulations is not None) or (time_limit is not None), 'MCTS needs a simulation or time budget'
+        SearchPosition.__init__(self, size, width, radius)
+        self.max_simulations = max_simulations
+        self.time_limit = time_limit
+        self.rollout_depth = rollout_depth
+        self.c = c
+        self.np_random = np_random if np_random is not None else np.random.RandomState()
+        self.root = None
+        self.simulations = 0
+        self.reused_visits = 0 # visits of the root kept from the previous search
+
+    def find_root(self, val):
+        '''Reuse the subtree of the current position from the previous search, or start a new tree.
+           The position after our last move is the previous root, the opponent move leads to one of its children
+        '''
+        node = self.root
+        if node is not None and node.hash != self.hash:
+            matched = None
+            for child in node.children:
+                if child.hash == self.hash:
+                    matched = child
+                    break
+            node = matched
+        if node is None or node.hash != self.hash:
+            node = MCTSNode(None, 3 - val, None, self.hash)
+        node.parent = None
+        self.root = node
+        self.reused_visits = node.visits
+        return node
+
+    def expand(self, node):
+        move = node.untried.pop()
+        val = 3 - node.val
+        five = self.make(move, val)
+        child = MCTSNode(move, val, node, self.hash)
+        if five:
+            child.winner = val
+        node.children.append(child)
+        return child
+
+    def rollout(self, val):
+        '''Random moves near the stones from the current position, val to play
+           Return: result for black in [0, 1]
+        '''
+        played = []
+        result = None
+        for _ in range(self.rollout_depth):
+            candidates = np.flatnonzero((self.cells == 0) & (self.near > 0))
+            if len(candidates) == 0:
+                result = 0.5 # board full, draw
+                break
+            move = int(candidates[self.np_random.randint(len(candidates))])
+            played.append((move, val))
+            if self.make(move, val):
+                result = 1. if val == 1 else 0.
+                break
+            val = 3 - val
+        if result is None:
+            result = 1. / (1. + np.exp(-self.score / 1000.))
+        for move, v in reversed(played):
+            self.unmake(move, v)
+        return result
+
+    def simulate(self, root):
+        node = root
+        path = []
+        # selection, expansion
+        while node.winner == 0:
+            if node.untried is None or len(node.untried) > 0:
+                if node.untried is None:
+                    node.untried = self.ordered_moves(3 - node.val)
+                    node.untried.reverse() # pop() the best move first
+                if len(node.untried) > 0:
+                    node = self.expand(node)
+                    path.append(node)
+                break
+            if len(node.children) == 0: # no candidate move, board full
+                break
+            node = node.select(self.c)
+            self.make(node.move, node.val)
+            path.append(node)
+        # rollout from the leaf
+        if node.winner != 0:
+            result = 1. if node.winner == 1 else 0.
+        else:
+            result = self.rollout(3 - node.val)
+        # backpropagation, the result of each node is for the player who moved into it
+        node = path[-1] if path else root
+        while node is not None:
+            node.visits += 1
+            node.wins += result if node.val == 1 else 1. - result
+            node = node.parent
+        for node in reversed(path):
+            self.unmake(node.move, node.val)
+
+    def search(self, board_state, color, deadline=None):
+        '''
+        Args:
+            board_state: 2D list or np.array of the position
+            color: color to play, 'black' or 'white'
+            deadline: time.time() at which the simulations stop, time_limit from now if None
+        Return: action of the move most visited, -1 if the board is full
+        '''
+        self.set_position(board_state)
+        val = gomoku_util.color_dict[color]
+        if not self.near.any(): # empty board, play the center
+            self.root = None
+            return (self.size // 2) * self.size + self.size // 2
+        root = self.find_root(val)
+        forced = self.forced_move(val)
+        if forced is not None:
+            return self.choose(root, forced)
+
+        if deadline is None and self.time_limit is not None:
+            deadline = time.time() + self.time_limit
+        self.simulations = 0
+        while True:
+            self.simulate(root)
+            self.simulations += 1
+            if self.max_simulations is not None and self.simulations >= self.max_simulations:
+                break
+            if deadline is not None and time.time() > deadline:
+                break
+        if len(root.children) == 0:
+            return -1
+        best = max(root.children, key=lambda child: child.visits)
+        return self.choose(root, best.move)
+
+    def choose(self, root, move):
+        '''Keep the subtree of move as the root of the next search
+        '''
+        for child in root.children:
+            if child.move == move:
+                self.root = child
+                return move
+        self.make(move, 3 - root.val)
+        self.root = MCTSNode(move, 3 - root.val, None, self.hash)
+        self.unmake(move, 3 - root.val)
+        return move
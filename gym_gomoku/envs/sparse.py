@@ -0,0 +1,348 @@
+'''Sparse board backend for large boards (50x50 and more, freestyle gomoku on an effectively unbounded board):
+only the occupied cells are stored, the win is checked on the lines through the last move and the candidate
+moves come from the neighbourhood of the stones, the cost of a move depends on the number of stones, not on the area
+'''
+
+import numpy as np
+from gym import spaces
+from gym import error
+from gym.utils import seeding
+
+from gym_gomoku.envs.util import gomoku_util
+
+MASK64 = 2**64 - 1
+SIDE_KEY = 0x6a09e667f3bcc909 # xor-ed in the hash when white is to move
+
+def zobrist_key(val, action):
+    '''64 bits Zobrist key of stone val on action, computed on demand (splitmix64) instead of a table per board size'''
+    z = (action * 3 + val + 0x9e3779b97f4a7c15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & MASK64
+    return z ^ (z >> 31)
+
+class SparseDiscrete(spaces.Discrete):
+    '''
+    Valid actions of a large board: the removed actions are kept in a set and cleared in a boolean mask, sample()
+    draws by rejection, O(1) while the board is mostly empty, instead of the lists of n actions of DiscreteWrapper.
+    get_state() and set_state() only copy the removed actions, O(stones) and not O(n)
+    '''
+    def __init__(self, n, np_random=None):
+        self.n = n
+        self.np_random = np_random if np_random is not None else seeding.np_random()[0]
+        self.num_valid = n
+        self._removed = set()
+        self._mask = np.ones(n, dtype=bool)
+        self._mask_view = self._mask.view()
+        self._mask_view.flags.writeable = False
+
+    @property
+    def valid_spaces(self):
+        return np.flatnonzero(self._mask).tolist()
+
+    @property
+    def mask(self):
+        '''Read-only boolean mask of the valid actions, updated in place by remove()
+        '''
+        return self._mask_view
+
+    def sample(self):
+        '''Uniform among the valid spaces, by rejection while at least a quarter of the spaces are valid
+        '''
+        if self.num_valid == 0:
+            print ("Space is empty")
+            return None
+        if 4 * self.num_valid >= self.n:
+            while True:
+                s = self.np_random.randint(self.n)
+                if self._mask[s]:
+                    return s
+        valid = np.flatnonzero(self._mask)
+        return int(valid[self.np_random.randint(self.num_valid)])
+
+    def remove(self, s):
+        if s is None:
+            return
+        if 0 <= s < self.n and self._mask[s]:
+            self._removed.add(s)
+            self._mask[s] = False
+            self.num_valid -= 1
+        else:
+            print ("space %d is not in valid spaces" % s)
+
+    def get_state(self):
+        '''Return: frozenset of the removed actions
+        '''
+        return frozenset(self._removed)
+
+    def set_state(self, state):
+        '''Restore the valid spaces saved by get_state(), only the actions removed in one of the two states
+        are updated in the mask
+        '''
+        for s in self._removed.difference(state):
+            self._mask[s] = True
+        for s in state.difference(self._removed):
+            self._mask[s] = False
+        self._removed = set(state)
+        self.num_valid = self.n - len(self._removed)
+
+class SparseBoard(object):
+    '''
+    Board storing only the stones, dict action -> 1 black, 2 white, same interface as Board.
+    board_state, legal_mask(), legal_actions() and candidate_mask() build dense arrays of the whole board
+    for compatibility, the incremental methods (place, is_legal, get_candidate_action, window) do not.
+    '''
+
+    def __init__(self, board_size):
+        self.size = board_size
+        self.stones = {}              # action -> color value
+        self.move = 0                 # how many move has been made
+        self.last_coord = (-1,-1)     # last action coord
+        self.last_action = None       # last action made
+        self.num_stones = 0           # stones on the board, full when equal to board_size**2
+        self.winner = "empty"         # color having 5-in-row: 'empty', 'black', 'white'
+        self.terminal = False         # game is finished, either 5-in-row or board full
+        self._candidates = {}         # radius -> set of the empty cells within radius of a stone, updated in play()
+        self.hash = 0                 # 64 bits Zobrist hash of the stones and the side to move, see zobrist_key()
+
+    def coord_to_action(self, i, j):
+        return i * self.size + j
+
+    def action_to_coord(self, a):
+        return (a // self.size, a % self.size)
+
+    @property
+    def board_state(self):
+        '''Dense np.array int8 [board_size, board_size] of the stones, built on each access'''
+        state = np.zeros((self.size, self.size), dtype=np.int8)
+        if self.stones:
+            actions = np.fromiter(self.stones.keys(), dtype=np.int64, count=len(self.stones))
+            state.ravel()[actions] = np.fromiter(self.stones.values(), dtype=np.int8, count=len(self.stones))
+        return state
+
+    def get_legal_move(self):
+        actions = self.legal_actions()
+        return list(zip((actions // self.size).tolist(), (actions % self.size).tolist()))
+
+    def get_legal_action(self):
+        return self.legal_actions().tolist()
+
+    def legal_mask(self):
+        return self.board_state.ravel() == 0
+
+    def legal_actions(self):
+        return np.flatnonzero(self.legal_mask())
+
+    def is_legal(self, action):
+        return 0 <= action < self.size**2 and action not in self.stones
+
+    def _neighbours(self, action, radius):
+        i, j = self.action_to_coord(action)
+        return [x * self.size + y for x in range(max(i - radius, 0), min(i + radius + 1, self.size))
+                for y in range(max(j - radius, 0), min(j + radius + 1, self.size))]
+
+    def _candidate_set(self, radius):
+        if radius not in self._candidates:
+            candidates = set()
+            for action in self.stones:
+                candidates.update(self._neighbours(action, radius))
+            self._candidates[radius] = candidates.difference(self.stones)
+        return self._candidates[radius]
+
+    def get_candidate_action(self, radius=2):
+        ''' Return: Action ID of the empty space within radius of any stone, [a1, a2, ...] in increasing order
+        '''
+        return sorted(self._candidate_set(radius))
+
+    def candidate_mask(self, radius=2):
+        mask = np.zeros(self.size**2, dtype=bool)
+        mask[self.get_candidate_action(radius)] = True
+        return mask
+
+    def copy(self, board_state):
+        '''update the stones of current board from input 2D list or np.array
+        '''
+        state = np.asarray(board_state)
+        assert state.shape == (self.size, self.size), 'input board_state size mismatch'
+        flat = state.ravel()
+        actions = np.flatnonzero(flat)
+        self.stones = dict(zip(actions.tolist(), flat[actions].tolist()))
+        self._candidates = {}
+        exist, color = gomoku_util.check_five_in_row(state)
+        self.num_stones = len(self.stones)
+        self.winner = color
+        self.terminal = exist or (self.num_stones == self.size ** 2)
+        self.hash = 0
+        for action, val in self.stones.items():
+            self.hash ^= zobrist_key(val, action)
+        if self.num_stones % 2 == 1:
+            self.hash ^= SIDE_KEY
+
+    def _clone(self):
+        b = SparseBoard.__new__(SparseBoard)
+        b.__dict__.update(self.__dict__)
+        b.stones = dict(self.stones)
+        b._candidates = dict((radius, set(candidates)) for radius, candidates in self._candidates.items())
+        return b
+
+    def play(self, action, color):
+        '''
+            Args: input action, current player color
+            Return: new copy of board object
+        '''
+        self._check_legal(action)
+        b = self._clone()
+        b._place(action, color)
+        return b
+
+    def place(self, action, color):
+        '''
+            Play the action in place, without copying the board. Use unplace() to take it back
+            Return: undo record to pass to unplace()
+        '''
+        self._check_legal(action)
+        return self._place(action, color)
+
+    def unplace(self, record):
+        action, coord, last_coord, last_action, hash, winner, terminal, added = record
+        del self.stones[action]
+        self.move -= 1
+        self.num_stones -= 1
+        self.last_coord, self.last_action = last_coord, last_action
+        self.hash = hash
+        self.winner, self.terminal = winner, terminal
+        for radius, cells, was_candidate in added:
+            candidates = self._candidates.get(radius)
+            if candidates is not None:
+                candidates.difference_update(cells)
+                if was_candidate:
+                    candidates.add(action)
+
+    def _check_legal(self, action):
+        if not 0 <= action < self.size**2:
+            raise error.Error("Action is illegal, %d is not on the board" % action)
+        if action in self.stones:
+            coord = self.action_to_coord(action)
+            raise error.Error("Action is illegal, position [%d, %d] on board is not empty" % ((coord[0]+1),(coord[1]+1)))
+
+    def _place(self, action, color):
+        '''Set the stone and update the cached state in place, Return: undo record
+        '''
+        val = gomoku_util.color_dict[color]
+        coord = self.action_to_coord(action)
+        added = []
+        record = (action, coord, self.last_coord, self.last_action, self.hash, self.winner, self.terminal, added)
+        self.stones[action] = val
+        self.move += 1
+        self.num_stones += 1
+        self.last_coord = coord
+        self.last_action = action
+        self.hash ^= zobrist_key(val, action) ^ SIDE_KEY
+
+        # the new stone adds its empty neighbours to the candidates
+        for radius, candidates in self._candidates.items():
+            cells = [c for c in self._neighbours(action, radius) if c not in self.stones and c not in candidates]
+            added.append((radius, cells, action in candidates))
+            candidates.update(cells)
+            candidates.discard(action)
+
+        # only the four lines through the new stone can form a new 5-in-row
+        if not self.terminal:
+            five = self._five_at(coord, val)
+            if five:
+                self.winner = color
+            self.terminal = five or (self.num_stones == self.size ** 2)
+        return record
+
+    def _five_at(self, coord, val):
+        '''Return: True if the stone val on coord is in a line of 5 or more, only the four lines through coord'''
+        (x, y), size, stones = coord, self.size, self.stones
+        for (dx, dy) in gomoku_util.directions:
+            count = 1
+            for sign in (1, -1):
+                i, j = x + sign * dx, y + sign * dy
+                while 0 <= i < size and 0 <= j < size and stones.get(i * size + j) == val:
+                    count += 1
+                    i, j = i + sign * dx, j + sign * dy
+            if count >= 5:
+                return True
+        return False
+
+    def is_terminal(self):
+        return self.terminal
+
+    def bounds(self, margin=0):
+        '''Return: (x0, y0, x1, y1) inclusive bounding box of the stones grown by margin and clipped to the board,
+            the center cell with margin on an empty board'''
+        if not self.stones:
+            x0 = y0 = x1 = y1 = self.size // 2
+        else:
+            rows, cols = zip(*(self.action_to_coord(a) for a in self.stones))
+            x0, y0, x1, y1 = min(rows), min(cols), max(rows), max(cols)
+        return (max(x0 - margin, 0), max(y0 - margin, 0), min(x1 + margin, self.size - 1), min(y1 + margin, self.size - 1))
+
+    def window_box(self, margin=4, max_side=32):
+        '''
+        Return: (x0, y0, side) of the smallest square inside the board holding bounds(margin), or if its side is
+            more than max_side, the square of max_side centered on the last move: the cost of the policies played
+            on the window does not grow with the spread of the stones
+        '''
+        x0, y0, x1, y1 = self.bounds(margin)
+        side = max(x1 - x0, y1 - y0) + 1
+        if side > max_side:
+            side = min(max_side, self.size)
+            x, y = self.last_coord if self.last_action is not None else (self.size // 2, self.size // 2)
+            x0, y0 = max(x - side // 2, 0), max(y - side // 2, 0)
+        return min(x0, self.size - side), min(y0, self.size - side), side
+
+    def window(self, box):
+        '''
+            Dense Board of the square box (x0, y0, side) of this board, for the policies working on a Board.
+            Action a of the window is action (a // side + x0) * board_size + a % side + y0 of this board.
+            Built from the stones in the box, the win state is the one of this board
+        '''
+        from gym_gomoku.envs.gomoku import Board
+        x0, y0, side = box
+        b = Board(side)
+        keys, side_key = gomoku_util.zobrist_keys(side)
+        for action, val in self.stones.items():
+            i, j = self.action_to_coord(action)
+            if x0 <= i < x0 + side and y0 <= j < y0 + side:
+                a = (i - x0) * side + (j - y0)
+                b.board_state[i - x0, j - y0] = val
+                b._empty[a] = False
+                b.hash ^= keys[val][a]
+                b.num_stones += 1
+        if b.num_stones % 2 == 1:
+            b.hash ^= side_key
+        b.move = self.move
+        b.winner, b.terminal = self.winner, self.terminal
+        if self.last_action is not None and x0 <= self.last_coord[0] < x0 + side and y0 <= self.last_coord[1] < y0 + side:
+            b.last_coord = (self.last_coord[0] - x0, self.last_coord[1] - y0)
+            b.last_action = b.coord_to_action(*b.last_coord)
+        return b
+
+    def __eq__(self, other):
+        return isinstance(other, SparseBoard) and self.size == other.size and self.hash == other.hash
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.hash
+
+    def __repr__(self):
+        ''' representation of the board class, only the area around the stones
+        '''
+        x0, y0, x1, y1 = self.bounds(2)
+        stones = self.stones
+        value = lambda i, j: stones.get(i * self.size + j, 0)
+        return gomoku_util.format_board(value, self.move, self.last_coord, range(x0, x1 + 1), range(y0, y1 + 1))
+
+    def encode(self, out=None):
+        '''Return: np.array(board_size, board_size) of the stones, written into out if given'''
+        if out is None:
+            return self.board_state
+        out[...] = 0
+        for action, val in self.stones.items():
+            out.flat[action] = val
+        return out
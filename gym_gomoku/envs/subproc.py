@@ -0,0 +1,225 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import gym
+from gym import spaces
+from gym import error
+from gym.utils import seeding
+from six import StringIO
+import sys
+
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.gomoku import GomokuEnv, Board
+
+def _layout(num_envs, board_size):
+    '''Return: list of (name, dtype, shape, offset) of the shared arrays, and the total number of bytes
+    '''
+    shapes = [
+        ('actions', np.int64, (num_envs,)),
+        ('rewards', np.float32, (num_envs,)),
+        ('observations', np.int8, (num_envs, board_size, board_size)),
+        ('final_observations', np.int8, (num_envs, board_size, board_size)),
+        ('legal_mask', np.bool_, (num_envs, board_size**2)),
+        ('dones', np.bool_, (num_envs,)),
+    ]
+    layout, offset = [], 0
+    for name, dtype, shape in shapes:
+        layout.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset = (offset + 7) // 8 * 8 # keep every array 8 bytes aligned
+    return layout, offset
+
+def _views(buf, layout):
+    '''Return: dict of np.array views into the shared memory buffer
+    '''
+    return dict((name, np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)) for name, dtype, shape, offset in layout)
+
+def _worker(remote, parent_remote, shm_name, layout, idx, env_args, info_state):
+    '''Step the games idx and write their results into the shared memory, only small messages go through the pipe
+    '''
+    parent_remote.close()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = _views(shm.buf, layout)
+    envs = [GomokuEnv(*env_args) for _ in idx]
+
+    def write(k, env, observation):
+        arrays['observations'][k] = observation
+        arrays['legal_mask'][k] = env.action_space.mask
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == 'close':
+                break
+            try:
+                if cmd == 'step':
+                    for k, env in zip(idx, envs):
+                        observation, reward, done, _ = env._step(int(arrays['actions'][k]))
+                        arrays['rewards'][k], arrays['dones'][k] = reward, done
+                        if done: # auto-reset, keep the final board
+                            arrays['final_observations'][k] = observation
+                            observation = env._reset()
+                        else:
+                            arrays['final_observations'][k] = 0
+                        write(k, env, observation)
+                elif cmd == 'reset':
+                    for k, env in zip(idx, envs):
+                        write(k, env, env._reset())
+                elif cmd == 'seed':
+                    for seed, env in zip(data, envs):
+                        env._seed(seed)
+                else:
+                    raise error.Error('Unrecognized command {}'.format(cmd))
+            except Exception as e:
+                remote.send(('error', '{}: {}'.format(type(e).__name__, e)))
+                continue
+            remote.send(('ok', [env.state for env in envs] if info_state else None))
+    finally:
+        for env in envs:
+            env._close()
+        del arrays
+        shm.close()
+
+### Subprocess Vectorized Environment
+class SubprocGomokuEnv(gym.Env):
+    '''
+    N GomokuEnv games stepped in worker processes, for agents and opponents that can not be vectorized.
+    Observations, rewards, dones and legal masks are written by the workers into one multiprocessing.shared_memory block,
+    the pipes only carry the commands. Finished games are reset automatically, the final board is returned in
+    info['final_observation'], zero for the games not finished.
+    '''
+    metadata = {"render.modes": ["human", "ansi"]}
+
+    def __init__(self, num_envs, player_color, opponent, board_size, num_workers=None, info_state=False):
+        """
+        Args:
+            num_envs: number of games N stepped together
+            player_color: Stone color for the agent. Either 'black' or 'white'
+            opponent: Name of the opponent policy, e.g. random, beginner, medium, expert
+            board_size: board_size of the board to use
+            num_workers: number of worker processes, the games are split between them, None for one per cpu
+            info_state: also return the GomokuState of every game in info['state'], pickled through the pipes
+        """
+        assert player_color in gomoku_util.color, 'Invalid player color'
+        self.num_envs = num_envs
+        self.board_size = board_size
+        self.player_color = player_color
+        self.opponent = opponent
+        self.info_state = info_state
+        self.waiting = False
+        self.closed = False
+
+        # Observation and action space of a single game
+        shape = (self.board_size, self.board_size) # board_size * board_size
+        self.observation_space = spaces.Box(np.zeros(shape), np.ones(shape))
+        self.action_space = spaces.Discrete(self.board_size**2)
+
+        layout, nbytes = _layout(num_envs, board_size)
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._arrays = _views(self._shm.buf, layout)
+
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        self.remotes, self.processes = [], []
+        for idx in np.array_split(np.arange(num_envs), num_workers):
+            remote, work_remote = multiprocessing.Pipe()
+            args = (work_remote, remote, self._shm.name, layout, idx.tolist(),
+                    (player_color, opponent, board_size), info_state)
+            process = multiprocessing.Process(target=_worker, args=args)
+            process.daemon = True # if the main process crashes, we should not cause things to hang
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        self._seed()
+        self._reset()
+
+    def _seed(self, seed=None):
+        np_random, seed1 = seeding.np_random(seed)
+        # Derive one seed per game
+        seeds = [seeding.hash_seed(seed1 + 1 + k) % 2**32 for k in range(self.num_envs)]
+        self._call('seed', np.array_split(seeds, len(self.remotes)))
+        return [seed1] + seeds
+
+    def _call(self, cmd, data=None):
+        '''Send cmd to every worker, data is a list with one item per worker, Return: list of results
+        '''
+        for k, remote in enumerate(self.remotes):
+            remote.send((cmd, None if data is None else [int(d) for d in data[k]]))
+        return self._wait()
+
+    def _wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        errors = [message for status, message in results if status == 'error']
+        if errors:
+            raise error.Error(errors[0])
+        return [message for _, message in results]
+
+    def _reset(self):
+        self._call('reset')
+        return self._arrays['observations'].copy()
+
+    def step_async(self, actions):
+        '''
+        Args:
+            actions: np.array int [N], one action per game, written into the shared memory
+        '''
+        actions = np.asarray(actions, dtype=np.int64)
+        assert actions.shape == (self.num_envs,), 'One action is needed for each game'
+        assert not self.waiting, 'step_wait() has not been called for the previous step'
+        self._arrays['actions'][:] = actions
+        for remote in self.remotes:
+            remote.send(('step', None))
+        self.waiting = True
+
+    def step_wait(self):
+        '''
+        Return:
+            observation: np.array [N, board_size, board_size], boards after the automatic reset of finished games
+            reward: np.array float [N]
+            done: np.array bool [N]
+            info: dict, 'legal_mask' np.array bool [N, board_size**2], 'final_observation' boards before the reset,
+                'state' list of GomokuState if info_state
+        Raise:
+            Illegal Move action, basically the position on board is not empty
+        '''
+        self.waiting = False
+        results = self._wait()
+        arrays = self._arrays
+        info = {'final_observation': arrays['final_observations'].copy(), 'legal_mask': arrays['legal_mask'].copy()}
+        if self.info_state:
+            info['state'] = [state for states in results for state in states]
+        return arrays['observations'].copy(), arrays['rewards'].copy(), arrays['dones'].copy(), info
+
+    def _step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def legal_mask(self):
+        '''Return: np.array bool [N, board_size**2], True for the valid actions of each game
+        '''
+        return self._arrays['legal_mask'].copy()
+
+    def _close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            [remote.recv() for remote in self.remotes]
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for process in self.processes:
+            process.join()
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+        self.closed = True
+
+    def _render(self, mode="human", close=False):
+        if close:
+            return
+        outfile = StringIO() if mode == 'ansi' else sys.stdout
+        for k in range(self.num_envs):
+            b = Board(self.board_size)
+            b.copy(self._arrays['observations'][k])
+            outfile.write('Game: {}\n{}\n'.format(k, repr(b)))
+        return outfile
@@ -10,11 +10,65 @@ from gym import error
 from gym.utils import seeding
 from six import StringIO
 import sys
+import time
 import six
+from collections import OrderedDict
+
+from gym_gomoku.envs.bitboard import BitBoard
+from gym_gomoku.envs.bitboard import BitGeometry
+from gym_gomoku.envs.bitboard import iter_bits
+
+class LineIndex(object):
+    '''
+    Line topology of one board size: rows, columns and diagonals of GomokuUtil.iterator(), computed once and shared
+    '''
+    def __init__(self, size, lines, directions):
+        '''
+        Args:
+            size: board size
+            lines: list of lines, list of coordinate tuples [(x1, y1), (x2, y2), ...]
+            directions: list of line directions (dx, dy)
+        '''
+        geometry = BitGeometry.get(size)
+        self.size = size
+        self.lines = lines
+        self.directions = directions
+        self._segments = {} # radius -> segments(radius)
+        self.flat = [np.array([i * size + j for (i, j) in line], dtype=np.intp) for line in lines] # flat index of cells
+        # all the lines in one matrix [num_lines, size] of flat index, short lines padded with the index size**2
+        self.matrix = np.full((len(lines), size), size * size, dtype=np.intp)
+        for line_id, flat in enumerate(self.flat):
+            self.matrix[line_id, :len(flat)] = flat
+        self.direction = [] # direction id of each line
+        self.bit_lookup = [{} for _ in directions] # direction id -> {bit of the cell: (line id, position in the line)}
+        for line_id, line in enumerate(lines):
+            d = directions.index((line[1][0] - line[0][0], line[1][1] - line[0][1]))
+            self.direction.append(d)
+            for pos, (i, j) in enumerate(line):
+                self.bit_lookup[d][geometry.bit(i, j)] = (line_id, pos)
+    
+    def segments(self, radius):
+        ''' Return: read-only np.array [num directions, size**2, 2 * radius + 1], flat index of the cells up to radius
+            steps away on the line through each cell in each direction, centered on it, size**2 off the board.
+            Built once per radius
+        '''
+        if radius not in self._segments:
+            size = self.size
+            steps = np.arange(-radius, radius + 1)
+            i, j = np.divmod(np.arange(size * size), size)
+            index = []
+            for (dx, dy) in self.directions:
+                ii, jj = i[:, None] + dx * steps, j[:, None] + dy * steps
+                inside = (ii >= 0) & (ii < size) & (jj >= 0) & (jj < size)
+                index.append(np.where(inside, ii * size + jj, size * size))
+            index = np.array(index, dtype=np.intp)
+            index.flags.writeable = False
+            self._segments[radius] = index
+        return self._segments[radius]
 
 class GomokuUtil(object):
     
-    def __init__(self):
+    def __init__(self, engine='bitboard'):
         # default setting
         self.BLACK = 'black'
         self.WHITE = 'white'
@@ -22,6 +76,14 @@ class GomokuUtil(object):
         self.color_dict = {'empty': 0, 'black': 1, 'white': 2}
         self.color_dict_rev = {v: k for k, v in self.color_dict.items()}
         self.color_shape = {0: '.', 1: 'X', 2: 'O'}
+        # pattern matching engine: 'bitboard' shifts and ANDs on bitboards, 'list' slices every line as a python list
+        self.set_engine(engine)
+        self._line_index = {} # board_size -> LineIndex
+        self._zobrist = {} # board_size -> (keys, side key)
+    
+    def set_engine(self, engine):
+        assert engine in ['bitboard', 'list'], 'Invalid pattern matching engine'
+        self.engine = engine
     
     def other_color(self, color):
         '''Return the opositive color of the current player's color
@@ -30,12 +92,52 @@ class GomokuUtil(object):
         opposite_color = self.color[0] if color == self.color[1] else self.color[1]
         return opposite_color
     
+    def line_index(self, size):
+        ''' Return the LineIndex of board size, built on first use and cached
+        '''
+        index = self._line_index.get(size)
+        if index is None:
+            index = self._line_index[size] = LineIndex(size, self.build_lines(size), self.directions)
+        return index
+    
+    def zobrist_keys(self, size):
+        ''' Zobrist keys of board size, the same in every process for a given size
+            Return: keys: list, keys[color_value][action] 64 bits int, keys[0] unused
+                    side: 64 bits int, xor-ed in the hash when white is to move
+        '''
+        if size not in self._zobrist:
+            np_random = np.random.RandomState(size)
+            keys = np_random.randint(0, 2**64, size=(3, size * size + 1), dtype=np.uint64).tolist()
+            self._zobrist[size] = ([None, keys[1][:-1], keys[2][:-1]], keys[0][-1])
+        return self._zobrist[size]
+    
+    def zobrist_hash(self, board_state):
+        ''' Full Zobrist hash of board_state, the side to move is white if the number of stones is odd
+        '''
+        state = np.asarray(board_state)
+        keys, side = self.zobrist_keys(state.shape[0])
+        state = state.ravel().tolist()
+        h = 0
+        num_stones = 0
+        for a, val in enumerate(state):
+            if val != 0:
+                h ^= keys[val][a]
+                num_stones += 1
+        if num_stones % 2 == 1:
+            h ^= side
+        return h
+    
     def iterator(self, board_state):
         ''' Iterator for 2D list board_state
             Return: Row, Column, diagnoal, list of coordinate tuples, [(x1, y1), (x2, y2), ...,()], (6n-2-16) lines
         '''
+        for line in self.line_index(len(board_state)).lines:
+            yield line
+    
+    def build_lines(self, size):
+        ''' Build all the lines of board size, in the order of iterator()
+        '''
         list = []
-        size = len(board_state)
         
         # row
         for i in range(size): # [(i,0), (i,1), ..., (i,n-1)]
@@ -73,8 +175,35 @@ class GomokuUtil(object):
                 if (len(upper_line)>=5):
                     list.append(upper_line)
         
-        for line in list:
-            yield line
+        return list
+    
+    def column_label(self, j):
+        ''' Letters of column j: A..Z, then AA, AB, ... past 26 columns
+        '''
+        label = ''
+        j += 1
+        while j > 0:
+            j, r = divmod(j - 1, 26)
+            label = chr(ord('A') + r) + label
+        return label
+    
+    def format_board(self, value, move, last_coord, rows, cols):
+        ''' Text of the board cells value(i, j) in rows x cols, row numbers and column letters on the sides,
+            the last move marked with ')'. Columns are as wide as their longest label
+        '''
+        letters = [self.column_label(j) for j in cols]
+        w = max(len(l) for l in letters)
+        nw = max(2, len(str(rows[-1] + 1)))
+        label_move = "Move: " + str(move) + "\n"
+        label_letters = " " * (nw + 3) + " ".join(l.ljust(w) for l in letters) + "\n"
+        label_boundry = " " * (nw + 1) + "+-" + "".join(["-"] * ((w + 1) * len(cols))) + "+" + "\n"
+        out = label_move + label_letters + label_boundry
+        for i in reversed(rows):
+            line = "%*d" % (nw, i + 1) + " |" + " "
+            for j in cols:
+                line += self.color_shape[value(i, j)] + (")" if (i, j) == last_coord else " ") + " " * (w - 1)
+            out += line + "|" + "\n"
+        return out + label_boundry + label_letters
     
     def value(self, board_state, coord_list):
         ''' Fetch Value from 2D list with coord_list
@@ -84,18 +213,30 @@ class GomokuUtil(object):
             val.append(board_state[i][j])
         return val
     
-    def check_five_in_row(self, board_state):
-        ''' Args: board_state 2D list
+    def check_five_in_row(self, board_state, rule='freestyle'):
+        ''' Args: board_state 2D list, rule 'freestyle', 'standard' or 'renju', see gym_gomoku.envs.renju
             Return: exist, color
         '''
+        if rule != 'freestyle': # exact five, check the lines through every stone
+            state = np.asarray(board_state)
+            for (x, y) in zip(*np.nonzero(state)):
+                exist, color = self.check_five_at(state, (int(x), int(y)), rule)
+                if exist:
+                    return exist, color
+            return False, "empty"
         size = len(board_state)
         black_pattern = [self.color_dict[self.BLACK] for _ in range(5)] # [1,1,1,1,1]
         white_pattern = [self.color_dict[self.WHITE] for _ in range(5)] # [2,2,2,2,2]
         
         exist_final = False
         color_final = "empty"
-        black_win, _ = self.check_pattern(board_state, black_pattern)
-        white_win, _ = self.check_pattern(board_state, white_pattern)
+        if (self.engine == 'bitboard'):
+            bb = BitBoard.from_state(board_state)
+            black_win = bb.five_in_row(self.color_dict[self.BLACK])
+            white_win = bb.five_in_row(self.color_dict[self.WHITE])
+        else:
+            black_win, _ = self.check_pattern(board_state, black_pattern)
+            white_win, _ = self.check_pattern(board_state, white_pattern)
         
         if (black_win and white_win):
             raise error.Error('Both Black and White has 5-in-row, rules conflicts')
@@ -109,6 +250,30 @@ class GomokuUtil(object):
         if (white_win):
             return exist_final, self.WHITE
     
+    def check_five_at(self, board_state, coord, rule='freestyle'):
+        ''' Check only the four lines passing through coord, used after a stone is placed on coord
+            Args: board_state 2D list, coord (x, y) of the last placed stone, rule as in check_five_in_row
+            Return: exist, color
+        '''
+        size = len(board_state)
+        (x, y) = coord
+        val = board_state[x][y]
+        if (val == 0):
+            return False, "empty"
+        for (dx, dy) in [(0, 1), (1, 0), (1, 1), (-1, 1)]: # row, column, diagonal, anti-diagonal
+            count = 1
+            i, j = x + dx, y + dy
+            while (0 <= i < size and 0 <= j < size and board_state[i][j] == val):
+                count += 1
+                i, j = i + dx, j + dy
+            i, j = x - dx, y - dy
+            while (0 <= i < size and 0 <= j < size and board_state[i][j] == val):
+                count += 1
+                i, j = i - dx, j - dy
+            if (count >= 5) and (rule == 'freestyle' or count == 5 or (rule == 'renju' and val != 1)):
+                return True, self.color_dict_rev[val]
+        return False, "empty"
+    
     def check_board_full(self, board_state):
         is_full = True
         size = len(board_state)
@@ -124,10 +289,15 @@ class GomokuUtil(object):
             Return: exist: boolean
                     line: coordinates that contains the patterns
         '''
+        if (self.engine == 'bitboard'):
+            pattern_found, _ = self.find_pattern_bitboard(board_state, pattern)
+            return (len(pattern_found) > 0), pattern_found
         exist = False
         pattern_found = [] # there maybe multiple patterns found
-        for coord in self.iterator(board_state):
-            line_value = self.value(board_state, coord)
+        state = np.asarray(board_state).ravel()
+        index = self.line_index(len(board_state))
+        for coord, flat in zip(index.lines, index.flat):
+            line_value = state[flat].tolist()
             if (self.is_sublist(line_value, pattern)):
                 exist = True
                 pattern_found.append(coord)
@@ -136,6 +306,11 @@ class GomokuUtil(object):
     def check_pattern_index(self, board_state, pattern):
         '''Return the line contains the pattern, and its start position index of the pattern
         '''
+        if (self.engine == 'bitboard'):
+            lines, startlist = self.find_pattern_bitboard(board_state, pattern)
+            if (len(lines) == 0):
+                return None, startlist
+            return lines, startlist
         start = -1
         startlist = []
         exist_patttern, lines = self.check_pattern(board_state, pattern)
@@ -147,6 +322,25 @@ class GomokuUtil(object):
         else: # pattern not found
             return None, startlist
     
+    def find_pattern_bitboard(self, board_state, pattern):
+        ''' Bitboard version of check_pattern_index, same lines in the same order as iterator()
+            Return: lines: list[list[(x1, y1),...]], startlist: list[int], first start index of pattern in each line
+        '''
+        bb = BitBoard.from_state(board_state)
+        index = self.line_index(bb.size)
+        lines, lookup = index.lines, index.bit_lookup
+        found = {} # line id -> first start position
+        for d, match in enumerate(bb.match_all(pattern)):
+            for bit in iter_bits(match):
+                entry = lookup[d].get(bit)
+                if entry is None: # short diagonal, not yielded by iterator()
+                    continue
+                line_id, pos = entry
+                if (line_id not in found) or (pos < found[line_id]):
+                    found[line_id] = pos
+        line_ids = sorted(found)
+        return [lines[k] for k in line_ids], [found[k] for k in line_ids]
+    
     def is_sublist(self, list, sublist):
         l1 = len(list)
         l2 = len(sublist)
@@ -172,7 +366,126 @@ class GomokuUtil(object):
                 break
         return idx
 
+    ### Batched helpers, boards: np.array [N, board_size, board_size] ###
+    # Line directions (dx, dy), same orientation as the lines yielded by iterator():
+    # row, column, diagonal from lower left to upper right, diagonal from upper left to lower right
+    directions = [(0, 1), (1, 0), (-1, 1), (1, 1)]
+    
+    def match_pattern_batch(self, boards, pattern, direction):
+        ''' Vectorized pattern match along one direction, with shifted AND of the board planes
+            Return: np.array bool [N, board_size, board_size], True at the start cell of each matched pattern
+        '''
+        n, size = boards.shape[0], boards.shape[1]
+        l = len(pattern)
+        (dx, dy) = direction
+        padded = np.full((n, size + 2 * l, size + 2 * l), -1, dtype=np.int8) # padding never matches a pattern
+        padded[:, l:l + size, l:l + size] = boards
+        match = np.ones((n, size, size), dtype=bool)
+        for k, val in enumerate(pattern):
+            x0, y0 = l + k * dx, l + k * dy
+            match &= (padded[:, x0:x0 + size, y0:y0 + size] == val)
+        return match
+    
+    def check_five_in_row_batch(self, boards, color):
+        ''' Args: boards np.array [N, board_size, board_size], color 'black' or 'white'
+            Return: np.array bool [N], if color has 5-in-row on each board
+        '''
+        pattern = [self.color_dict[color]] * 5
+        exist = np.zeros(boards.shape[0], dtype=bool)
+        for d in self.directions:
+            exist |= self.match_pattern_batch(boards, pattern, d).any(axis=(1, 2))
+        return exist
+    
+    def pattern_moves_batch(self, boards, pattern):
+        ''' Empty cells of the pattern on every board where the pattern is found, in any direction
+            Return: np.array bool [N, board_size, board_size]
+        '''
+        n, size = boards.shape[0], boards.shape[1]
+        l = len(pattern)
+        empty_idx = [k for k, val in enumerate(pattern) if val == 0]
+        moves = np.zeros((n, size + 2 * l, size + 2 * l), dtype=bool)
+        for (dx, dy) in self.directions:
+            match = self.match_pattern_batch(boards, pattern, (dx, dy))
+            for k in empty_idx: # shift the start cell to the k-th cell of the pattern
+                x0, y0 = l + k * dx, l + k * dy
+                moves[:, x0:x0 + size, y0:y0 + size] |= match
+        return moves[:, l:l + size, l:l + size]
+
 gomoku_util = GomokuUtil()
+
+class PositionCache(object):
+    '''
+    Bounded cache of values keyed by position hash, e.g. Board.hash
+    replacement:
+        'lru': the least recently used entry is evicted when the cache is full
+        'depth': depth-preferred, among the least recently used entries the one of the lowest depth is evicted,
+            and an entry is not replaced by a value of a lower depth
+    '''
+    def __init__(self, capacity=2**16, replacement='lru', sample=8):
+        assert replacement in ['lru', 'depth'], 'Invalid replacement scheme'
+        self.capacity = capacity
+        self.replacement = replacement
+        self.sample = sample # number of the least recently used entries compared by the depth-preferred eviction
+        self.entries = OrderedDict() # key -> (value, depth)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __contains__(self, key):
+        return key in self.entries
+    
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+    
+    def put(self, key, value, depth=0):
+        entry = self.entries.get(key)
+        if entry is not None:
+            if self.replacement == 'depth' and entry[1] > depth:
+                return
+        elif len(self.entries) >= self.capacity:
+            self.evict()
+        self.entries[key] = (value, depth)
+        self.entries.move_to_end(key)
+    
+    def evict(self):
+        if self.replacement == 'lru':
+            self.entries.popitem(last=False)
+        else:
+            oldest = []
+            for key in self.entries:
+                oldest.append(key)
+                if len(oldest) >= self.sample:
+                    break
+            del self.entries[min(oldest, key=lambda k: self.entries[k][1])]
+        self.evictions += 1
+    
+    def clear(self):
+        self.entries.clear()
+        self.hits, self.misses, self.evictions = 0, 0, 0
+    
+    def stats(self):
+        total = self.hits + self.misses
+        return {'size': len(self.entries), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'hit_rate': (float(self.hits) / total if total > 0 else 0.)}
+
+_shared_caches = {}
+
+def shared_position_cache(name, capacity=2**16, replacement='lru'):
+    ''' Return the PositionCache of the process registered under name, created on first use.
+        Policies use it to share evaluations across episodes and environments
+    '''
+    if name not in _shared_caches:
+        _shared_caches[name] = PositionCache(capacity, replacement)
+    return _shared_caches[name]
 # Rule.other_color('black')
 
 ### Opponent policies ###
@@ -181,16 +494,88 @@ def make_random_policy(np_random):
     '''
     def random_policy(curr_state, prev_state, prev_action):
         b = curr_state.board
-        legal_moves = b.get_legal_move()
-        next_move = legal_moves[np_random.choice(len(legal_moves))]
-        return b.coord_to_action(next_move[0], next_move[1])
+        legal_actions = b.legal_actions()
+        return int(legal_actions[np_random.choice(len(legal_actions))])
     return random_policy
 
+def beginner_patterns(color):
+    ''' Patterns of color, in priority order, used by the beginner policy to strike (own color) and defend (opponent color)
+        Return: list of patterns, the first 5 used by both, the last one [0,1,1,0] only by strike
+    '''
+    c = gomoku_util.color_dict[color]
+    pattern_four_a = [0] + [c] * 4         #[0,1,1,1,1]
+    pattern_four_b = [c] * 4 + [0]         #[1,1,1,1,0]
+    pattern_three_a = [0] + [c] * 3 + [0]  #[0,1,1,1,0]
+    pattern_three_b = [c] * 2 + [0] + [c] * 1  #[1,1,0,1]
+    pattern_three_c = [c] * 1 + [0] + [c] * 2  #[1,0,1,1]
+    pattern_two = [0] + [c] * 2 + [0]      #[0,1,1,0]
+    return [pattern_four_a, pattern_four_b, pattern_three_a, pattern_three_b, pattern_three_c, pattern_two]
+
+class PatternScanner(object):
+    '''
+    Find all the occurrences of several patterns in one pass over the lines of the board.
+    Every window of the lines is encoded as a base-4 code (0 empty, 1 black, 2 white, 3 off the board),
+    and a precomputed table maps each code to the bit mask of the patterns equal to that window.
+    '''
+    def __init__(self, patterns):
+        '''
+        Args:
+            patterns: list of patterns, e.g. [[0,1,1,1,1], [1,1,0,1], ...]
+        '''
+        self.patterns = patterns
+        self.lengths = sorted(set(len(p) for p in patterns))
+        self.tables = {}
+        for l in self.lengths:
+            self.tables[l] = np.zeros(4 ** l, dtype=np.int64)
+        for pid, p in enumerate(patterns):
+            code = sum(val * 4 ** k for k, val in enumerate(p))
+            self.tables[len(p)][code] |= (1 << pid)
+    
+    def scan(self, board_state):
+        ''' Return: list of (lines, startlist) for each pattern, same result as gomoku_util.check_pattern_index,
+            lines is an empty list when the pattern is not found
+        '''
+        state = np.asarray(board_state)
+        index = gomoku_util.line_index(state.shape[0])
+        values = np.append(state.ravel(), 3)[index.matrix].astype(np.int64) # [num_lines, size], 3 off the board
+        found = [({}, []) for _ in self.patterns] # for each pattern: line id -> start, and line ids in order
+        for l in self.lengths:
+            num_windows = values.shape[1] - l + 1
+            codes = np.zeros((values.shape[0], num_windows), dtype=np.int64)
+            for k in range(l):
+                codes += values[:, k:k + num_windows] << (2 * k)
+            masks = self.tables[l][codes] # [num_lines, num_windows], bit mask of the matched patterns
+            line_ids, starts = np.nonzero(masks) # row-major, the first hit of a line is its first start
+            for line_id, start, mask in zip(line_ids.tolist(), starts.tolist(), masks[line_ids, starts].tolist()):
+                pid = 0
+                while mask:
+                    if (mask & 1) and (line_id not in found[pid][0]):
+                        found[pid][0][line_id] = start
+                        found[pid][1].append(line_id)
+                    mask >>= 1
+                    pid += 1
+        
+        result = []
+        for first, line_ids in found:
+            line_ids = sorted(line_ids)
+            result.append(([index.lines[k] for k in line_ids], [first[k] for k in line_ids]))
+        return result
+
 def make_beginner_policy(np_random):
     '''General Rules for playing gomoku
     '''
+    # All the strike and defend patterns of both colors, found in one scan of the board per move
+    patterns = {color: beginner_patterns(color) for color in gomoku_util.color}
+    scanner = PatternScanner(patterns[gomoku_util.BLACK] + patterns[gomoku_util.WHITE])
     
-    def defend_policy(curr_state):
+    def scan_patterns(board):
+        '''Return: dict color -> list of (lines, startlist) of the patterns of that color, in priority order
+        '''
+        found = scanner.scan(board.board_state)
+        n = len(patterns[gomoku_util.BLACK])
+        return {gomoku_util.BLACK: found[:n], gomoku_util.WHITE: found[n:]}
+    
+    def defend_policy(curr_state, found):
         '''Return the action Id, if defend situation is needed
         '''
         b = curr_state.board
@@ -198,16 +583,11 @@ def make_beginner_policy(np_random):
         opponent_color = gomoku_util.other_color(player_color)
         lines, start, next_move = None, None, None # initialization
         
-        # List all the defend patterns
-        pattern_four_a = [0] + [gomoku_util.color_dict[opponent_color]] * 4         #[0,1,1,1,1]
-        pattern_four_b = [gomoku_util.color_dict[opponent_color]] * 4 + [0]         #[1,1,1,1,0]
-        pattern_three_a = [0] + [gomoku_util.color_dict[opponent_color]] * 3 + [0]  #[0,1,1,1,0]
-        pattern_three_b = [gomoku_util.color_dict[opponent_color]] * 2 + [0] + [gomoku_util.color_dict[opponent_color]] * 1  #[1,1,0,1]
-        pattern_three_c = [gomoku_util.color_dict[opponent_color]] * 1 + [0] + [gomoku_util.color_dict[opponent_color]] * 2  #[1,0,1,1]
-        patterns = [pattern_four_a, pattern_four_b, pattern_three_a, pattern_three_b, pattern_three_c]
+        # List all the defend patterns, fours and threes of the opponent
+        defend = zip(patterns[opponent_color][:5], found[opponent_color][:5])
         
-        for p in patterns:
-            action = connect_line(b, p)
+        for p, (lines, starts) in defend:
+            action = connect_line(b, p, lines, starts)
             if (action): # Action is not none, pattern is found, place stone
                 return action
         
@@ -220,26 +600,21 @@ def make_beginner_policy(np_random):
                 action for within the box if there is empty
                 random action if the box if full
         '''
-        all_legal_moves = board.get_legal_move()
         if (coord[0] >=0): # last move coord should be within the board
             box = [(i,j) for i in range(coord[0]-1, coord[0]+ 2) for j in range(coord[1]-1, coord[1] + 2)] # 3x3 box
             legal_moves = []
             for c in box:
-                if (c in all_legal_moves):
+                if (0 <= c[0] < board.size and 0 <= c[1] < board.size and board.is_legal(board.coord_to_action(c[0], c[1]))):
                     legal_moves.append(c)
-            if (len(legal_moves) == 0):
-                # all the box is full
-                next_move = all_legal_moves[np_random.choice(len(all_legal_moves))]
-                return board.coord_to_action(next_move[0], next_move[1])
-            else :
+            if (len(legal_moves) != 0):
                 next_move = legal_moves[np_random.choice(len(legal_moves))]
                 return board.coord_to_action(next_move[0], next_move[1])
-        else:
-            next_move = all_legal_moves[np_random.choice(len(all_legal_moves))]
-            return board.coord_to_action(next_move[0], next_move[1])
+        # all the box is full, or no previous move
+        all_legal_actions = board.legal_actions()
+        return int(all_legal_actions[np_random.choice(len(all_legal_actions))])
     
-    def connect_line(board, pattern):
-        ''' Check if pattern exist in board_state, Fill one empty space to connect the dots to a line
+    def connect_line(board, pattern, lines, starts):
+        ''' Fill one empty space of the pattern found on lines to connect the dots to a line
             Return: Action ID
         '''
         start_idx = 0
@@ -248,7 +623,6 @@ def make_beginner_policy(np_random):
             if (val == 0):
                 empty_idx.append(id)
         
-        lines, starts = gomoku_util.check_pattern_index(board.board_state, pattern)
         if (len(starts)>= 1): # At least 1 found
             line_id = np_random.choice(len(lines)) # randomly choose one line
             line = lines[line_id] # [(x1,y1), (x2,y2), ...]
@@ -260,26 +634,18 @@ def make_beginner_policy(np_random):
         else:
             return None
     
-    def strike_policy(curr_state, prev_state, prev_action):
+    def strike_policy(curr_state, prev_state, prev_action, found):
         b = curr_state.board
-        all_legal_moves = b.get_legal_move()
         
-        # last action taken by the oppenent
-        last_action = prev_state.board.last_action 
-        last_coord = prev_state.board.last_coord
+        # last action taken by the oppenent, none at the first move of the game
+        last_coord = prev_state.board.last_coord if prev_state is not None else (-1, -1)
         player_color = curr_state.color
         
-        # List all the strike patterns
-        pattern_four_a = [0] + [gomoku_util.color_dict[player_color]] * 4         #[0,1,1,1,1]
-        pattern_four_b = [gomoku_util.color_dict[player_color]] * 4 + [0]         #[1,1,1,1,0]
-        pattern_three_a = [0] + [gomoku_util.color_dict[player_color]] * 3 + [0]  #[0,1,1,1,0]
-        pattern_three_b = [gomoku_util.color_dict[player_color]] * 2 + [0] + [gomoku_util.color_dict[player_color]] * 1  #[1,1,0,1]
-        pattern_three_c = [gomoku_util.color_dict[player_color]] * 1 + [0] + [gomoku_util.color_dict[player_color]] * 2  #[1,0,1,1]
-        pattern_two = [0] + [gomoku_util.color_dict[player_color]] * 2 + [0]      #[0,1,1,0]
-        patterns = [pattern_four_a, pattern_four_b, pattern_three_a, pattern_three_b, pattern_three_c, pattern_two]
+        # List all the strike patterns, fours, threes and twos of the player
+        strike = zip(patterns[player_color], found[player_color])
         
-        for p in patterns:
-            action = connect_line(b, p)
+        for p, (lines, starts) in strike:
+            action = connect_line(b, p, lines, starts)
             if (action): # Action is not none, pattern is found
                 return action
         
@@ -293,32 +659,142 @@ def make_beginner_policy(np_random):
         opponent_color = gomoku_util.other_color(player_color)
         next_move = None # initialization, (x1, y1)
         
+        # Defend and strike patterns of both colors
+        found = scan_patterns(b)
+        
         # If defend needed
-        action_defend = defend_policy(curr_state)
+        action_defend = defend_policy(curr_state, found)
         if action_defend is not None:
             return action_defend
         
         # No Defend Strategy Met, Use Strike policy B to connect a line
-        action_strike = strike_policy(curr_state, prev_state, prev_action)
+        action_strike = strike_policy(curr_state, prev_state, prev_action, found)
         if action_strike is not None:
             return action_strike
         
         # random choose legal actions
-        legal_moves = b.get_legal_move()
-        next_move = legal_moves[np_random.choice(len(legal_moves))]
-        return b.coord_to_action(next_move[0], next_move[1])
+        legal_actions = b.legal_actions()
+        return int(legal_actions[np_random.choice(len(legal_actions))])
     
     return beginner_policy
 
-def make_medium_policy():
-    def medium_policy():
-        '''To Do'''
-        return 0
+### Batched opponent policies, used by GomokuVectorEnv ###
+# batch_policy(boards, color, last_actions): boards np.array [M, board_size, board_size] of the games to play,
+# color of the opponent stones, last_actions np.array [M] previous actions of the policy itself (-1 if none),
+# like prev_state.board.last_coord seen by the scalar policies
+# Return: np.array [M] of actions
+
+def choose_batch(np_random, candidates):
+    ''' Uniformly choose one True cell per row of candidates np.array bool [M, n], -1 for rows without candidate
+    '''
+    scores = np_random.random_sample(candidates.shape)
+    scores[~candidates] = -1.
+    actions = np.argmax(scores, axis=1)
+    actions[~candidates.any(axis=1)] = -1
+    return actions
+
+def make_batch_random_policy(np_random):
+    ''' Batched random policy, uniform over the empty cells of each board
+    '''
+    def batch_random_policy(boards, color, last_actions):
+        empty = (boards.reshape(boards.shape[0], -1) == 0)
+        return choose_batch(np_random, empty)
+    return batch_random_policy
+
+def make_batch_beginner_policy(np_random):
+    ''' Batched beginner policy, same priority of defend and strike patterns as make_beginner_policy,
+        the move is chosen uniformly among the empty cells of all the lines matching the first pattern found
+    '''
+    def box_moves(boards, last_actions):
+        ''' Empty cells in the 3x3 box around the previous move of the policy, as fill_box() of make_beginner_policy
+        '''
+        m, size = boards.shape[0], boards.shape[1]
+        box = np.zeros((m, size + 2, size + 2), dtype=bool)
+        idx = np.flatnonzero(last_actions >= 0)
+        x, y = last_actions[idx] // size, last_actions[idx] % size
+        for dx in range(3):
+            for dy in range(3):
+                box[idx, x + dx, y + dy] = True
+        return box[:, 1:size + 1, 1:size + 1] & (boards == 0)
+    
+    def batch_beginner_policy(boards, color, last_actions):
+        m = boards.shape[0]
+        opponent_color = gomoku_util.other_color(color)
+        patterns = beginner_patterns(opponent_color)[:5] + beginner_patterns(color)
+        actions = np.full(m, -1, dtype=np.int64)
+        todo = np.arange(m)
+        for p in patterns:
+            if len(todo) == 0:
+                return actions
+            moves = gomoku_util.pattern_moves_batch(boards[todo], p).reshape(len(todo), -1)
+            chosen = choose_batch(np_random, moves)
+            found = (chosen >= 0)
+            actions[todo[found]] = chosen[found]
+            todo = todo[~found]
+        
+        # no pattern found, place around the box within previous move, random if the box is full
+        if len(todo) > 0:
+            moves = box_moves(boards[todo], last_actions[todo]).reshape(len(todo), -1)
+            chosen = choose_batch(np_random, moves)
+            found = (chosen >= 0)
+            actions[todo[found]] = chosen[found]
+            todo = todo[~found]
+        if len(todo) > 0:
+            empty = (boards[todo].reshape(len(todo), -1) == 0)
+            actions[todo] = choose_batch(np_random, empty)
+        return actions
+    return batch_beginner_policy
+
+def make_medium_policy(np_random, max_depth=4, time_limit=0.005, max_nodes=None, table=None, solver_nodes=100):
+    '''Iterative deepening alpha-beta search over the moves near the stones, with a transposition table
+        kept for the whole episode. The search stops at max_depth or when the time_limit (seconds) or
+        max_nodes budget per move runs out, the first depth is always completed.
+        table: optional PositionCache, e.g. shared_position_cache('medium'), to share the transposition table across episodes
+        solver_nodes: node budget of the threat-space solver consulted before the search for a forced win, 0 to disable,
+            the solver runs within the same time_limit and the search gets the time left
+    '''
+    from gym_gomoku.envs.search import AlphaBetaSearch
+    from gym_gomoku.envs.search import ThreatSolver
+    searcher = {}
+    solver = {}
+    
+    def medium_policy(curr_state, prev_state, prev_action):
+        b = curr_state.board
+        if b.size not in searcher:
+            searcher[b.size] = AlphaBetaSearch(b.size, max_depth=max_depth, time_limit=time_limit,
+                max_nodes=max_nodes, np_random=np_random, table=table)
+            solver[b.size] = ThreatSolver(b.size, max_nodes=solver_nodes)
+        deadline = time.time() + time_limit if time_limit is not None else None
+        if solver_nodes > 0:
+            action = solver[b.size].solve(b.board_state, curr_state.color, deadline=deadline)
+            if action is not None:
+                return action
+        return searcher[b.size].search(b.board_state, curr_state.color, deadline)
     return medium_policy
 
-def make_expert_policy():
-    def expert_policy():
-        '''To Do'''
-        return 0
+def make_expert_policy(np_random, max_simulations=None, time_limit=0.1, solver_nodes=500):
+    '''Monte Carlo tree search with a simulation or wall-clock (seconds) budget per move.
+        The search tree is kept by the closure for the whole episode, each search starts from
+        the subtree of the previous search matching the moves played since.
+        solver_nodes: node budget of the threat-space solver consulted before the search for a forced win, 0 to disable,
+            the solver runs within the same time_limit and the search gets the time left
+    '''
+    from gym_gomoku.envs.search import MCTSSearch
+    from gym_gomoku.envs.search import ThreatSolver
+    searcher = {}
+    solver = {}
+    
+    def expert_policy(curr_state, prev_state, prev_action):
+        b = curr_state.board
+        if b.size not in searcher:
+            searcher[b.size] = MCTSSearch(b.size, max_simulations=max_simulations, time_limit=time_limit,
+                np_random=np_random)
+            solver[b.size] = ThreatSolver(b.size, max_nodes=solver_nodes)
+        deadline = time.time() + time_limit if time_limit is not None else None
+        if solver_nodes > 0:
+            action = solver[b.size].solve(b.board_state, curr_state.color, deadline=deadline)
+            if action is not None:
+                return action
+        return searcher[b.size].search(b.board_state, curr_state.color, deadline)
     return expert_policy
 
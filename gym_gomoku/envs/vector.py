@@ -0,0 +1,148 @@
+import numpy as np
+import gym
+from gym import spaces
+from gym import error
+from gym.utils import seeding
+from six import StringIO
+import sys
+
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.util import make_batch_random_policy
+from gym_gomoku.envs.util import make_batch_beginner_policy
+from gym_gomoku.envs.gomoku import Board
+
+### Vectorized Environment
+class GomokuVectorEnv(gym.Env):
+    '''
+    N Gomoku games against a fixed opponent, stored in one np.array [N, board_size, board_size] and stepped together.
+    Finished games are reset automatically, the final board is returned in info['final_observation'].
+    '''
+    metadata = {"render.modes": ["human", "ansi"]}
+
+    def __init__(self, num_envs, player_color, opponent, board_size):
+        """
+        Args:
+            num_envs: number of games N stepped together
+            player_color: Stone color for the agent. Either 'black' or 'white'
+            opponent: Name of the batched opponent policy, random or beginner
+            board_size: board_size of the board to use
+        """
+        assert player_color in gomoku_util.color, 'Invalid player color'
+        self.num_envs = num_envs
+        self.board_size = board_size
+        self.player_color = player_color
+        self.opponent_color = gomoku_util.other_color(player_color)
+
+        self._seed()
+
+        # opponent
+        self.opponent_policy = None
+        self.opponent = opponent
+
+        # Observation and action space of a single game
+        shape = (self.board_size, self.board_size) # board_size * board_size
+        self.observation_space = spaces.Box(np.zeros(shape), np.ones(shape))
+        self.action_space = spaces.Discrete(self.board_size**2)
+
+        # Boards of all the games, and the last opponent action of each game (-1 if none), seen by the opponent policy
+        self.boards = np.zeros((num_envs, board_size, board_size), dtype=np.int8)
+        self.last_actions = np.full(num_envs, -1, dtype=np.int64)
+
+        self._reset()
+
+    def _seed(self, seed=None):
+        self.np_random, seed1 = seeding.np_random(seed)
+        # Derive a random seed.
+        seed2 = seeding.hash_seed(seed1 + 1) % 2**32
+        return [seed1, seed2]
+
+    def _reset(self):
+        self._reset_opponent()
+        self._reset_games(np.arange(self.num_envs))
+        return self.boards.copy()
+
+    def _reset_games(self, idx):
+        '''Empty the boards of games idx, the opponent plays first if the agent is white
+        '''
+        self.boards[idx] = 0
+        self.last_actions[idx] = -1
+        if self.player_color != gomoku_util.BLACK and len(idx) > 0:
+            self._exec_opponent_play(idx)
+
+    def _close(self):
+        self.opponent_policy = None
+        self.boards = None
+
+    def _render(self, mode="human", close=False):
+        if close:
+            return
+        outfile = StringIO() if mode == 'ansi' else sys.stdout
+        for k in range(self.num_envs):
+            b = Board(self.board_size)
+            b.copy(self.boards[k])
+            outfile.write('Game: {}\n{}\n'.format(k, repr(b)))
+        return outfile
+
+    def legal_mask(self):
+        '''Return: np.array bool [N, board_size**2], True for the empty cells of each game
+        '''
+        return self.boards.reshape(self.num_envs, -1) == 0
+
+    def _place(self, idx, actions, color):
+        '''Place stones of color for games idx, Return: np.array bool [len(idx)], game is terminal
+        '''
+        flat = self.boards.reshape(self.num_envs, -1)
+        if np.any(flat[idx, actions] != 0):
+            raise error.Error("Action is illegal, position on board is not empty")
+        flat[idx, actions] = gomoku_util.color_dict[color]
+        boards = self.boards[idx]
+        win = gomoku_util.check_five_in_row_batch(boards, color)
+        full = ~(boards == 0).any(axis=(1, 2))
+        return win, win | full
+
+    def _step(self, actions):
+        '''
+        Args:
+            actions: np.array int [N], one action per game
+        Return:
+            observation: np.array [N, board_size, board_size], boards after the automatic reset of finished games
+            reward: np.array float [N]
+            done: np.array bool [N]
+            info: dict, 'legal_mask' np.array bool [N, board_size**2], 'final_observation' boards before the reset
+        Raise:
+            Illegal Move action, basically the position on board is not empty
+        '''
+        actions = np.asarray(actions, dtype=np.int64)
+        assert actions.shape == (self.num_envs,), 'One action is needed for each game'
+        all_idx = np.arange(self.num_envs)
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+
+        # Player play
+        player_win, dones = self._place(all_idx, actions, self.player_color)
+        rewards[player_win] = 1.
+
+        # Opponent play for the games not finished yet
+        idx = all_idx[~dones]
+        if len(idx) > 0:
+            opponent_win, opponent_done = self._exec_opponent_play(idx)
+            rewards[idx[opponent_win]] = -1.
+            dones[idx[opponent_done]] = True
+
+        info = {'final_observation': self.boards.copy()}
+        self._reset_games(all_idx[dones])
+        info['legal_mask'] = self.legal_mask()
+        return self.boards.copy(), rewards, dones, info
+
+    def _exec_opponent_play(self, idx):
+        '''Batched opponent move for games idx'''
+        opponent_actions = self.opponent_policy(self.boards[idx], self.opponent_color, self.last_actions[idx])
+        self.last_actions[idx] = opponent_actions
+        return self._place(idx, opponent_actions, self.opponent_color)
+
+    def _reset_opponent(self):
+        if self.opponent == 'random':
+            self.opponent_policy = make_batch_random_policy(self.np_random)
+        elif self.opponent == 'beginner':
+            self.opponent_policy = make_batch_beginner_policy(self.np_random)
+        else:
+            raise error.Error('Unrecognized batched opponent policy {}'.format(self.opponent))
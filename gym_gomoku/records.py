@@ -0,0 +1,223 @@
+'''
+Compact binary game records: a streaming writer for GomokuEnv episodes and a memory-mapped reader.
+
+File layout, little endian:
+    header: 6 bytes magic b'GMKREC', uint16 version
+    one record per game:
+        uint8 board_size, uint8 player_color, uint8 winner, uint8 reserved, uint16 num_moves
+        num_moves x uint16 actions, black plays first and the colors alternate
+Colors follow gomoku_util.color_dict: 0 empty, 1 black, 2 white. player_color is the color of the agent,
+0 if there is none (e.g. self-play), winner is 0 for a draw or an unfinished game.
+
+The json import and export follow the asciinema recordings of the env render, e.g. demo/gym_gomoku_demo.json
+'''
+
+import json
+import os
+import struct
+
+import numpy as np
+from gym import error
+
+from gym_gomoku.envs.gomoku import Board, GomokuState
+from gym_gomoku.envs.util import gomoku_util
+
+MAGIC = b'GMKREC'
+VERSION = 1
+FILE_HEADER = struct.Struct('<6sH')
+GAME_HEADER = struct.Struct('<BBBBH')
+CLEAR_SCREEN = '\x1b[2J\x1b[1;1H'
+
+class GameRecord(object):
+    '''
+    One game: board_size, player_color and winner names ('empty', 'black', 'white'), actions np.array uint16
+    '''
+    __slots__ = ('board_size', 'player_color', 'winner', 'actions')
+
+    def __init__(self, board_size, actions, winner='empty', player_color='empty'):
+        self.board_size = board_size
+        self.actions = np.asarray(actions, dtype=np.uint16)
+        self.winner = winner
+        self.player_color = player_color
+
+    def replay(self):
+        '''Yield the Board after each move'''
+        return replay(self.board_size, self.actions)
+
+    def __eq__(self, other):
+        return (isinstance(other, GameRecord) and self.board_size == other.board_size and self.winner == other.winner
+                and self.player_color == other.player_color and np.array_equal(self.actions, other.actions))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'GameRecord(board_size={}, moves={}, winner={}, player_color={})'.format(
+            self.board_size, len(self.actions), self.winner, self.player_color)
+
+def replay(board_size, actions):
+    '''
+    Args:
+        board_size: board_size of the board
+        actions: actions in play order, black first
+    Return:
+        generator of the Board after each move
+    '''
+    b, color = Board(board_size), gomoku_util.BLACK
+    for action in actions:
+        b = b.play(int(action), color)
+        color = gomoku_util.other_color(color)
+        yield b
+
+def env_record(env):
+    '''Return: GameRecord of the current episode of a GomokuEnv'''
+    board = env.state.board
+    actions = [board.coord_to_action(i, j) for i, j in env.moves]
+    return GameRecord(env.board_size, actions, board.winner, env.player_color)
+
+class GameRecordWriter(object):
+    '''
+    Append games to a record file, the file is created with its header if it does not exist or is empty
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.num_games = 0
+
+    def write(self, record):
+        '''
+        Args:
+            record: GameRecord, e.g. env_record(env) at the end of an episode
+        '''
+        if not 0 < record.board_size < 256:
+            raise error.Error('board_size {} can not be recorded'.format(record.board_size))
+        actions = np.asarray(record.actions, dtype='<u2')
+        self.file.write(GAME_HEADER.pack(record.board_size, gomoku_util.color_dict[record.player_color],
+                                         gomoku_util.color_dict[record.winner], 0, len(actions)))
+        self.file.write(actions.tobytes())
+        self.num_games += 1
+
+    def write_env(self, env):
+        '''Append the current episode of a GomokuEnv'''
+        self.write(env_record(env))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class GameRecordReader(object):
+    '''
+    Memory-mapped record file: iterate the games or index them, the actions are views into the file.
+    Only the game headers are read to build the index, on the first len() or [] access.
+    '''
+    def __init__(self, path):
+        self.path = path
+        if os.path.getsize(path) < FILE_HEADER.size:
+            raise error.Error('{} is not a game record file'.format(path))
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise error.Error('{} is not a game record file of version {}'.format(path, VERSION))
+        self._offsets = None
+
+    def _records(self):
+        '''Yield the offset of every game header'''
+        offset, end = FILE_HEADER.size, len(self.data)
+        while offset < end:
+            num_moves = GAME_HEADER.unpack_from(self.data, offset)[4]
+            yield offset
+            offset += GAME_HEADER.size + 2 * num_moves
+
+    def _read(self, offset):
+        board_size, player_color, winner, _, num_moves = GAME_HEADER.unpack_from(self.data, offset)
+        actions = np.ndarray((num_moves,), dtype='<u2', buffer=self.data, offset=offset + GAME_HEADER.size)
+        return GameRecord(board_size, actions, gomoku_util.color_dict_rev[winner],
+                          gomoku_util.color_dict_rev[player_color])
+
+    def __iter__(self):
+        for offset in self._records():
+            yield self._read(offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, k):
+        return self._read(self.offsets[k])
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            self._offsets = np.fromiter(self._records(), dtype=np.int64)
+        return self._offsets
+
+def _parse_frame(text):
+    '''Return: color to play, np.array board_state and last coord of one rendered frame'''
+    lines = text.replace(CLEAR_SCREEN, '').replace('\r', '').split('\n')
+    to_play = lines[0].split(':')[1].strip()
+    rows = [line for line in lines if '|' in line and line.split('|')[0].strip().isdigit()]
+    size = len(rows)
+    board_state = np.zeros((size, size), dtype=np.int8)
+    shapes = dict((shape, val) for val, shape in gomoku_util.color_shape.items())
+    last_coord = None
+    for line in rows:
+        i = int(line.split('|')[0]) - 1
+        cells = line.split('|')[1][1:]
+        for j in range(size):
+            board_state[i, j] = shapes[cells[2 * j]]
+            if cells[2 * j + 1] == ')':
+                last_coord = (i, j)
+    return to_play, board_state, last_coord
+
+def import_json(path):
+    '''
+    Read a recorded env render (asciinema json) into a GameRecord.
+    The moves between two frames are ordered by color and by the last move marker.
+    '''
+    with open(path) as f:
+        frames = [_parse_frame(text) for _, text in json.load(f)['stdout']]
+    player_color = frames[0][0]
+    size = frames[0][1].shape[0]
+    actions, prev = [], np.zeros((size, size), dtype=np.int8)
+    for _, board_state, last_coord in frames:
+        new = list(zip(*np.nonzero(board_state != prev)))
+        if len(new) > 2:
+            raise error.Error('More than 2 moves between two frames, the move order is unknown')
+        new.sort(key=lambda coord: coord == last_coord) # the last move is played last
+        actions.extend(int(i) * size + int(j) for i, j in new)
+        prev = board_state
+    boards = list(replay(size, actions))
+    winner = boards[-1].winner if boards else 'empty'
+    return GameRecord(size, actions, winner, player_color)
+
+def export_json(record, path, frame_time=0.5):
+    '''
+    Write a GameRecord as an asciinema json recording of the env render, one frame for each turn of the
+    player_color (every move if there is none) and the final board
+    '''
+    frames = []
+    state = GomokuState(Board(record.board_size), gomoku_util.BLACK)
+    states = [state]
+    for action in record.actions:
+        state = state.act(int(action))
+        states.append(state)
+    for k, state in enumerate(states):
+        if k == len(states) - 1 or record.player_color == 'empty' or state.color == record.player_color:
+            text = CLEAR_SCREEN + (repr(state) + '\n').replace('\n', '\r\n')
+            frames.append([frame_time, text])
+    size = record.board_size
+    recording = {
+        'version': 1, 'width': 2 * size + 8, 'height': size + 8, 'duration': frame_time * len(frames),
+        'command': '-', 'title': 'gym VideoRecorder episode', 'env': {}, 'stdout': frames,
+    }
+    with open(path, 'w') as f:
+        json.dump(recording, f)
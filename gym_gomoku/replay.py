@@ -0,0 +1,154 @@
+'''
+Replay buffer of Gomoku positions for value and policy training, packed at 2 bits per cell in ring storage.
+Batches are unpacked into float planes, with the 8 dihedral symmetries of the board applied on the fly.
+'''
+
+import numpy as np
+from gym.utils import seeding
+
+from gym_gomoku.envs.util import gomoku_util
+
+# _unpack_table[byte] is the 4 cells packed in byte, first cell in the lowest bits
+_unpack_table = ((np.arange(256, dtype=np.uint8)[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3).astype(np.int8)
+_pack_weights = np.array([1, 4, 16, 64], dtype=np.uint8)
+
+def pack_boards(boards):
+    '''
+    Args:
+        boards: np.array [N, board_size, board_size] of 0 empty, 1 black, 2 white
+    Return:
+        np.array uint8 [N, ceil(board_size**2 / 4)], 4 cells per byte
+    '''
+    cells = np.asarray(boards, dtype=np.uint8).reshape(len(boards), -1)
+    pad = -cells.shape[1] % 4
+    if pad:
+        cells = np.concatenate([cells, np.zeros((len(cells), pad), dtype=np.uint8)], axis=1)
+    return (cells.reshape(len(cells), -1, 4) * _pack_weights).sum(axis=2, dtype=np.uint8)
+
+def unpack_boards(packed, board_size):
+    '''Return: np.array int8 [N, board_size**2], inverse of pack_boards() with flattened boards
+    '''
+    return _unpack_table[packed].reshape(len(packed), -1)[:, :board_size**2]
+
+def symmetry_permutations(board_size):
+    '''
+    Return:
+        perm: np.array [8, board_size**2], cell p of the board under symmetry k is the cell perm[k, p] of the original
+        inverse: np.array [8, board_size**2], cell a of the original moves to cell inverse[k, a]
+    Symmetry 0 is the identity, 1-3 the rotations, 4-7 the transposed board and its rotations
+    '''
+    cells = np.arange(board_size**2).reshape(board_size, board_size)
+    perm = np.array([np.rot90(cells.T if k >= 4 else cells, k % 4).ravel() for k in range(8)])
+    inverse = np.argsort(perm, axis=1)
+    return perm, inverse
+
+class ReplayBuffer(object):
+    '''
+    Ring buffer of positions: the board packed at 2 bits per cell, the color to move, the last move,
+    the action played from the position (policy target, -1 if none) and the outcome for the color to move
+    (value target, e.g. 1 win, -1 loss, 0 draw). When full, the oldest positions are overwritten.
+    '''
+    def __init__(self, capacity, board_size, np_random=None):
+        '''
+        Args:
+            capacity: maximum number of positions kept
+            board_size: board_size of the boards
+            np_random: random state used by sample(), a new one is seeded if None
+        '''
+        self.capacity = capacity
+        self.board_size = board_size
+        self.np_random = np_random if np_random is not None else seeding.np_random()[0]
+        self.boards = np.zeros((capacity, (board_size**2 + 3) // 4), dtype=np.uint8)
+        self.colors = np.zeros(capacity, dtype=np.int8)
+        self.last_moves = np.full(capacity, -1, dtype=np.int16)
+        self.actions = np.full(capacity, -1, dtype=np.int16)
+        self.outcomes = np.zeros(capacity, dtype=np.float32)
+        self.size = 0   # number of positions stored
+        self.next = 0   # index of the next position written
+        self._perm, self._inverse = symmetry_permutations(board_size)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, board_state, color, last_move=-1, outcome=0., action=-1):
+        '''
+        Args:
+            board_state: np.array [board_size, board_size], e.g. Board.encode()
+            color: color to move, 'black' or 'white'
+            last_move: last action played on the board, -1 if none
+            outcome: result of the game for the color to move
+            action: action played from this position, -1 if none
+        '''
+        self.add_batch(np.asarray(board_state)[None], [color], [last_move], [outcome], [action])
+
+    def add_state(self, state, outcome=0., action=-1):
+        '''Add a GomokuState, e.g. info['state'] of GomokuEnv'''
+        last_move = state.board.last_action
+        self.add(state.board.board_state, state.color, -1 if last_move is None else last_move, outcome, action)
+
+    def add_batch(self, boards, colors, last_moves, outcomes, actions=None):
+        '''
+        Add N positions, same arguments as add() with one item per position
+        '''
+        n = len(boards)
+        if n > self.capacity: # only the newest fit
+            boards, colors, last_moves, outcomes = boards[-self.capacity:], colors[-self.capacity:], \
+                last_moves[-self.capacity:], outcomes[-self.capacity:]
+            actions = None if actions is None else actions[-self.capacity:]
+            n = self.capacity
+        idx = (self.next + np.arange(n)) % self.capacity
+        self.boards[idx] = pack_boards(boards)
+        self.colors[idx] = [c if isinstance(c, (int, np.integer)) else gomoku_util.color_dict[c] for c in colors]
+        self.last_moves[idx] = last_moves
+        self.outcomes[idx] = outcomes
+        self.actions[idx] = -1 if actions is None else actions
+        self.next = (self.next + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def get(self, idx):
+        '''
+        Args:
+            idx: np.array int of stored positions
+        Return:
+            boards np.array int8 [len(idx), board_size, board_size], colors, last_moves, actions, outcomes
+        '''
+        idx = np.asarray(idx)
+        boards = unpack_boards(self.boards[idx], self.board_size).reshape(len(idx), self.board_size, self.board_size)
+        return boards, self.colors[idx], self.last_moves[idx], self.actions[idx], self.outcomes[idx]
+
+    def sample(self, batch_size, augment=True, out=None):
+        '''
+        Sample batch_size positions uniformly, with replacement
+        Args:
+            batch_size: number of positions
+            augment: apply a random symmetry of the board to each position
+            out: optional np.array float32 [batch_size, 4, board_size, board_size] the planes are written into
+        Return:
+            planes: np.array float32 [batch_size, 4, board_size, board_size], stones of the color to move,
+                stones of the other color, 1 if black is to move, last move
+            actions: np.array int [batch_size], actions under the same symmetry, -1 if none
+            outcomes: np.array float32 [batch_size]
+            idx: np.array int [batch_size], indices of the positions, for get()
+        '''
+        assert self.size > 0, 'The replay buffer is empty'
+        size, n = self.board_size, self.board_size**2
+        idx = self.np_random.randint(self.size, size=batch_size)
+        cells = unpack_boards(self.boards[idx], size)
+        colors, last_moves, actions = self.colors[idx], self.last_moves[idx].astype(np.int64), self.actions[idx].astype(np.int64)
+        if augment:
+            sym = self.np_random.randint(8, size=batch_size)
+            cells = cells[np.arange(batch_size)[:, None], self._perm[sym]]
+            inverse = self._inverse[sym]
+            rows = np.arange(batch_size)
+            last_moves = np.where(last_moves >= 0, inverse[rows, np.maximum(last_moves, 0)], -1)
+            actions = np.where(actions >= 0, inverse[rows, np.maximum(actions, 0)], -1)
+
+        planes = out if out is not None else np.empty((batch_size, 4, size, size), dtype=np.float32)
+        flat = planes.reshape(batch_size, 4, n)
+        np.equal(cells, colors[:, None], out=flat[:, 0])
+        np.equal(cells, (3 - colors)[:, None], out=flat[:, 1])
+        flat[:, 2] = (colors == 1)[:, None]
+        flat[:, 3] = 0.
+        has_last = np.flatnonzero(last_moves >= 0)
+        flat[has_last, 3, last_moves[has_last]] = 1.
+        return planes, actions, self.outcomes[idx], idx
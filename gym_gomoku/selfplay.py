@@ -0,0 +1,94 @@
+'''Self-play and data generation: Gomoku games of an agent against a fixed opponent, spread over a multiprocessing pool
+'''
+
+import multiprocessing
+
+from gym.utils import seeding
+
+from gym_gomoku.envs.gomoku import GomokuEnv
+
+def random_agent(env, observation):
+    '''Agent playing a uniformly random valid action, sampled with the env random state
+    '''
+    return env.action_space.sample()
+
+def game_seeds(seed, num_games):
+    '''
+    Derive one seed per game from the master seed, the same way GomokuEnv._seed derives its second seed
+    Args:
+        seed: master seed, a random one is drawn if None
+        num_games: number of games
+    Return:
+        list of int seeds, game i always gets the same seed for a given master seed
+    '''
+    _, seed1 = seeding.np_random(seed)
+    return [seeding.hash_seed(seed1 + 1 + i) % 2**32 for i in range(num_games)]
+
+def play_game(env, agent, seed):
+    '''
+    Play one game in env, seeded with seed
+    Args:
+        env: GomokuEnv, re-seeded and reset
+        agent: callable agent(env, observation) returning the action, random numbers should come from env.np_random
+        seed: game seed
+    Return:
+        dict of the game record: 'seed', 'player_color', 'actions' of both players in play order, 'reward', 'winner'
+    '''
+    env._seed(seed)
+    observation = env._reset()
+    reward, done = 0., env.done
+    while not done:
+        observation, reward, done, _ = env._step(agent(env, observation))
+    board = env.state.board
+    return {
+        'seed': seed,
+        'player_color': env.player_color,
+        'actions': [board.coord_to_action(i, j) for i, j in env.moves],
+        'reward': reward,
+        'winner': board.winner,
+    }
+
+def _play_chunk(job):
+    '''Worker: play the games of one chunk with a single env, Return: list of game records'''
+    agent, opponent, board_size, player_color, seeds = job
+    env = GomokuEnv(player_color, opponent, board_size)
+    try:
+        return [play_game(env, agent, seed) for seed in seeds]
+    finally:
+        env._close()
+
+def generate(agent, opponent='beginner', num_games=100, board_size=15, player_color='black',
+             seed=None, processes=None, chunk_size=16):
+    '''
+    Play num_games games of agent against opponent and stream the finished games in chunks, in game order.
+    Each game is seeded from the master seed and its index only, so the games are the same whatever the number of
+    processes or the scheduling, as long as agent and opponent only use the env random state.
+    The medium and expert opponents search under a time budget and are not reproducible.
+
+    Args:
+        agent: picklable callable agent(env, observation) returning the action, e.g. random_agent
+        opponent: Name of the opponent policy, e.g. random, beginner, medium, expert
+        num_games: number of games to play
+        board_size: board_size of the board to use
+        player_color: Stone color for the agent. Either 'black' or 'white'
+        seed: master seed
+        processes: number of worker processes, None for one per cpu, 0 or 1 to play in this process
+        chunk_size: number of games played by a worker for each job and yielded together
+    Return:
+        generator of lists of game records, see play_game()
+    '''
+    seeds = game_seeds(seed, num_games)
+    jobs = [(agent, opponent, board_size, player_color, seeds[k:k + chunk_size])
+            for k in range(0, num_games, chunk_size)]
+    if processes is not None and processes <= 1:
+        for job in jobs:
+            yield _play_chunk(job)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for games in pool.imap(_play_chunk, jobs): # imap keeps the job order
+            yield games
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,425 @@
+'''
+Asyncio server hosting many GomokuEnv games for remote agents, and the matching gym-like client.
+
+Protocol: every message is a uint32 length followed by the body, little endian.
+    request:  uint8 op, uint32 game_id, then
+        OPEN:  uint8 player_color (1 black, 2 white), uint8 board_size, int64 seed (-1 for none), opponent name ascii
+        RESET, CLOSE: nothing
+        STEP:  uint16 action
+    response: uint8 status (0 ok, 1 error), uint32 game_id, then
+        RESET, STEP: float32 reward, uint8 done, board_size**2 int8 board
+        error: utf-8 message
+The requests waiting in the queue are drained together, one batch per pass of the event loop. The steps of the games
+against the same random or beginner opponent, on the same board size and colors, are played in one pass: one call of
+the batched policy (make_batch_random_policy, make_batch_beginner_policy) chooses all their opponent moves, so these
+games also depend on the others stepped with them, not only on their seed. The other steps and the resets run one
+by one. The passes run in a thread pool, off the event loop: a searching medium or expert opponent does not stall the
+other connections. A reset or step not done within step_timeout seconds gets an error reply and its game is closed.
+One request per game may be in progress, the replies of a connection can come in any order.
+The queue is bounded: when it is full the server stops reading the sockets (backpressure).
+Games not used for game_timeout seconds are closed.
+
+Usage:
+    python -m gym_gomoku.server --port 5555
+'''
+
+import argparse
+import asyncio
+import functools
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import gym
+from gym import spaces
+from gym import error
+from gym.utils import seeding
+
+from gym_gomoku.envs.gomoku import GomokuEnv
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.util import make_batch_random_policy
+from gym_gomoku.envs.util import make_batch_beginner_policy
+
+OPEN, RESET, STEP, CLOSE = 1, 2, 3, 4
+OK, ERROR = 0, 1
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<BI')
+OPEN_ARGS = struct.Struct('<BBq')
+ACTION = struct.Struct('<H')
+RESULT = struct.Struct('<fB')
+BATCHED = {'random': make_batch_random_policy, 'beginner': make_batch_beginner_policy}
+
+def _frame(body):
+    return LENGTH.pack(len(body)) + body
+
+class GomokuServer(object):
+    '''
+    Pool of GomokuEnv games served over asyncio streams, see the module docstring for the protocol
+    '''
+    def __init__(self, host='127.0.0.1', port=0, max_games=10000, max_pending=1024, max_batch=256, game_timeout=300.,
+                 step_timeout=10., workers=4, seed=None):
+        '''
+        Args:
+            host, port: address to listen on, port 0 picks a free port, see self.port after start()
+            max_games: maximum number of open games
+            max_pending: maximum number of requests queued, above it the sockets are not read
+            max_batch: maximum number of requests processed in one pass
+            game_timeout: seconds after which an unused game is closed
+            step_timeout: seconds after which a reset or step gets an error reply, its game is closed
+            workers: number of threads playing the resets and steps
+            seed: seed of the batched random and beginner opponents
+        '''
+        self.host, self.port = host, port
+        self.max_games = max_games
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.game_timeout = game_timeout
+        self.step_timeout = step_timeout
+        self.workers = workers
+        self.np_random, _ = seeding.np_random(seed)
+        self.batch_policies = dict((name, make(self.np_random)) for name, make in BATCHED.items())
+        self.games = {}     # game_id -> [env, writer of the connection that opened it, time of last use]
+        self.busy = set()   # games with a reset or step in progress
+        self.next_id = 1
+        self.num_batches = 0
+        self.num_requests = 0
+        self.largest_batch = 0
+        self.largest_pass = 0 # most steps played by one call of a batched policy
+        self.server = None
+        self.executor = None
+        self._tasks = []
+        self._connections = {} # writer -> task of the connection handler
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.max_pending)
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.ensure_future(self._process()), asyncio.ensure_future(self._reap())]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        if self.server is not None:
+            self.server.close()
+            # wait_closed() also waits for the open connections since python 3.12: close them first,
+            # their handlers read the end of the stream and close their games
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self.server.wait_closed()
+        for game_id in list(self.games):
+            self._close_game(game_id)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False) # a timed out step may still be running
+
+    async def _handle(self, reader, writer):
+        '''Read the requests of one connection into the queue'''
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                length = LENGTH.unpack(await reader.readexactly(LENGTH.size))[0]
+                body = await reader.readexactly(length)
+                await self.queue.put((writer, body)) # waits when the queue is full
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for game_id in [k for k, game in self.games.items() if game[1] is writer]:
+                self._close_game(game_id)
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _process(self):
+        '''Drain the queued requests by batches, group the steps and run the groups in the thread pool'''
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.num_batches += 1
+            self.num_requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            groups = {} # key -> list of (writer, game_id, env, action), see _run()
+            replies = []
+            for writer, body in batch:
+                if writer.is_closing():
+                    continue
+                game_id = 0
+                try:
+                    op, game_id = HEADER.unpack_from(body, 0)
+                    if op not in (RESET, STEP):
+                        replies.append((writer, self._dispatch(writer, body)))
+                        continue
+                    env = self._game(writer, game_id)
+                    self.busy.add(game_id)
+                    if op == RESET:
+                        groups[('reset', game_id)] = [(writer, game_id, env, None)]
+                        continue
+                    action = ACTION.unpack_from(body, HEADER.size)[0]
+                    if env.opponent in self.batch_policies:
+                        key = ('batch', env.opponent, env.board_size, env.player_color)
+                    else:
+                        key = ('step', game_id)
+                    groups.setdefault(key, []).append((writer, game_id, env, action))
+                except Exception as e:
+                    replies.append((writer, self._error(game_id, e)))
+            for key, requests in groups.items():
+                asyncio.ensure_future(self._run(key, requests))
+            await self._reply(replies)
+
+    async def _run(self, key, requests):
+        '''Play one group of requests in the thread pool and reply, or reply with an error after step_timeout'''
+        if key[0] == 'batch':
+            func = functools.partial(self._step_batched, self.batch_policies[key[1]], requests)
+        elif key[0] == 'reset':
+            func = functools.partial(self._reset_game, requests[0][1], requests[0][2])
+        else:
+            func = functools.partial(self._step_game, requests[0][1], requests[0][2], requests[0][3])
+        try:
+            loop = asyncio.get_running_loop()
+            bodies = await asyncio.wait_for(loop.run_in_executor(self.executor, func), self.step_timeout)
+            if key[0] != 'batch':
+                bodies = [bodies]
+        except asyncio.TimeoutError:
+            bodies = []
+            for _, game_id, _, _ in requests:
+                self.games.pop(game_id, None) # the step may still be running, the game is dropped without closing it
+                message = 'Game {} did not answer within {} seconds, it is closed'.format(game_id, self.step_timeout)
+                bodies.append(self._error(game_id, error.Error(message)))
+        finally:
+            for _, game_id, _, _ in requests:
+                self.busy.discard(game_id)
+        await self._reply([(writer, body) for (writer, _, _, _), body in zip(requests, bodies)])
+
+    async def _reply(self, replies):
+        '''Write the replies, list of (writer, body), then wait for the sockets to drain'''
+        writers = []
+        for writer, body in replies:
+            if writer.is_closing():
+                continue
+            writer.write(_frame(body))
+            if writer not in writers:
+                writers.append(writer)
+        for writer in writers:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _reap(self):
+        '''Close the games not used for game_timeout seconds'''
+        while True:
+            await asyncio.sleep(min(self.game_timeout / 4., 1.))
+            now = time.monotonic()
+            for game_id in [k for k, game in self.games.items() if now - game[2] > self.game_timeout and k not in self.busy]:
+                self._close_game(game_id)
+
+    def _close_game(self, game_id):
+        env = self.games.pop(game_id)[0]
+        env._close()
+
+    def _game(self, writer, game_id):
+        '''Return: env of game_id, opened by the connection of writer and without request in progress'''
+        game = self.games.get(game_id)
+        if game is None:
+            raise error.Error('Unknown game {}, it is closed or timed out'.format(game_id))
+        if game[1] is not writer:
+            raise error.Error('Game {} belongs to another connection'.format(game_id))
+        if game_id in self.busy:
+            raise error.Error('Game {} already has a request in progress'.format(game_id))
+        game[2] = time.monotonic()
+        return game[0]
+
+    def _reset_game(self, game_id, env):
+        '''Thread pool: Return: response body of a reset'''
+        try:
+            return self._result(game_id, env._reset(), 0., False)
+        except Exception as e:
+            return self._error(game_id, e)
+
+    def _step_game(self, game_id, env, action, opponent_policy=None):
+        '''Thread pool: Return: response body of a step'''
+        try:
+            observation, reward, done, _ = env._step(action, opponent_policy)
+            return self._result(game_id, observation, reward, done)
+        except Exception as e:
+            return self._error(game_id, e)
+
+    def _step_batched(self, policy, requests):
+        '''
+        Thread pool: steps of games against the same batched opponent, on the same board size and colors,
+        the opponent moves of all the games are chosen by one call of policy on the boards after the agent moves
+        Return: list of response bodies
+        '''
+        env = requests[0][2]
+        size, val = env.board_size, gomoku_util.color_dict[env.player_color]
+        boards = np.zeros((len(requests), size, size), dtype=np.int8)
+        last_actions = np.full(len(requests), -1, dtype=np.int64)
+        for k, (_, _, env, action) in enumerate(requests):
+            board = env.state.board
+            boards[k] = board.board_state
+            if board.last_action is not None: # the previous move of the opponent
+                last_actions[k] = board.last_action
+            if 0 <= action < size * size and boards[k].flat[action] == 0: # illegal moves are refused by env._step
+                boards[k].flat[action] = val
+        opponent_actions = policy(boards, gomoku_util.other_color(env.player_color), last_actions).tolist()
+        self.largest_pass = max(self.largest_pass, len(requests))
+        bodies = []
+        for (_, game_id, env, action), opponent_action in zip(requests, opponent_actions):
+            bodies.append(self._step_game(game_id, env, action, lambda curr_state, prev_state, prev_action,
+                                          opponent_action=opponent_action: opponent_action))
+        return bodies
+
+    def _dispatch(self, writer, body):
+        '''Return: response body of an OPEN or CLOSE request'''
+        game_id = 0
+        try:
+            op, game_id = HEADER.unpack_from(body, 0)
+            if op == OPEN:
+                if len(self.games) >= self.max_games:
+                    raise error.Error('Too many games, the limit is {}'.format(self.max_games))
+                color, board_size, seed = OPEN_ARGS.unpack_from(body, HEADER.size)
+                opponent = body[HEADER.size + OPEN_ARGS.size:].decode('ascii')
+                env = GomokuEnv(gomoku_util.color_dict_rev[color], opponent, board_size)
+                if seed >= 0:
+                    env._seed(seed) # the client resets the game before its first step
+                game_id, self.next_id = self.next_id, self.next_id + 1
+                self.games[game_id] = [env, writer, time.monotonic()]
+                return HEADER.pack(OK, game_id)
+            if op == CLOSE:
+                self._game(writer, game_id)
+                self._close_game(game_id)
+                return HEADER.pack(OK, game_id)
+            raise error.Error('Unrecognized op {}'.format(op))
+        except Exception as e:
+            return self._error(game_id, e)
+
+    def _error(self, game_id, e):
+        return HEADER.pack(ERROR, game_id) + '{}: {}'.format(type(e).__name__, e).encode('utf-8')
+
+    def _result(self, game_id, observation, reward, done):
+        return HEADER.pack(OK, game_id) + RESULT.pack(reward, done) + np.ascontiguousarray(observation, dtype=np.int8).tobytes()
+
+class GomokuClient(object):
+    '''
+    Blocking client of a GomokuServer, one socket shared by all the games it opens
+    '''
+    def __init__(self, host='127.0.0.1', port=5555, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.closed = False
+
+    def make(self, player_color='black', opponent='beginner', board_size=15, seed=None):
+        '''Open a game on the server, Return: RemoteGomokuEnv'''
+        args = OPEN_ARGS.pack(gomoku_util.color_dict[player_color], board_size, -1 if seed is None else seed)
+        self._send(OPEN, 0, args + opponent.encode('ascii'))
+        game_id, _ = self._recv()
+        return RemoteGomokuEnv(self, game_id, player_color, board_size)
+
+    def step_batch(self, envs, actions):
+        '''
+        Send the steps of several games at once, and wait for all the results: the server processes them together
+        Return: list of (observation, reward, done, info), one for each game
+        Raise: error.Error of the first game whose step failed, after all the replies are read
+        '''
+        self.sock.sendall(b''.join(_frame(HEADER.pack(STEP, env.game_id) + ACTION.pack(int(action)))
+                                   for env, action in zip(envs, actions)))
+        replies = {} # game_id -> (status, payload), the replies come in any order
+        for _ in envs:
+            status, game_id, payload = self._recv_reply()
+            replies[game_id] = (status, payload)
+        results = []
+        for env in envs:
+            status, payload = replies[env.game_id]
+            if status != OK:
+                raise error.Error(payload.decode('utf-8'))
+            results.append(env._parse(payload))
+        return results
+
+    def close(self):
+        self.sock.close()
+        self.closed = True
+
+    def _send(self, op, game_id, payload=b''):
+        self.sock.sendall(_frame(HEADER.pack(op, game_id) + payload))
+
+    def _recv_exactly(self, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise error.Error('Connection closed by the server')
+            data.extend(chunk)
+        return bytes(data)
+
+    def _recv_reply(self):
+        '''Return: status, game_id and payload of the next response'''
+        body = self._recv_exactly(LENGTH.unpack(self._recv_exactly(LENGTH.size))[0])
+        status, game_id = HEADER.unpack_from(body, 0)
+        return status, game_id, body[HEADER.size:]
+
+    def _recv(self):
+        '''Return: game_id and payload of the response, Raise: error.Error if the request failed'''
+        status, game_id, payload = self._recv_reply()
+        if status != OK:
+            raise error.Error(payload.decode('utf-8'))
+        return game_id, payload
+
+class RemoteGomokuEnv(gym.Env):
+    '''
+    GomokuEnv game hosted by a GomokuServer, info only carries the 'legal_mask'
+    '''
+    metadata = {"render.modes": []}
+
+    def __init__(self, client, game_id, player_color, board_size):
+        self.client = client
+        self.game_id = game_id
+        self.player_color = player_color
+        self.board_size = board_size
+        shape = (self.board_size, self.board_size) # board_size * board_size
+        self.observation_space = spaces.Box(np.zeros(shape), np.ones(shape))
+        self.action_space = spaces.Discrete(self.board_size**2)
+
+    def _parse(self, payload):
+        reward, done = RESULT.unpack_from(payload, 0)
+        board = np.frombuffer(payload, dtype=np.int8, offset=RESULT.size).reshape(self.board_size, self.board_size)
+        return board, float(reward), bool(done), {'legal_mask': board.ravel() == 0}
+
+    def _reset(self):
+        self.client._send(RESET, self.game_id)
+        return self._parse(self.client._recv()[1])[0]
+
+    def _step(self, action):
+        self.client._send(STEP, self.game_id, ACTION.pack(int(action)))
+        return self._parse(self.client._recv()[1])
+
+    def _close(self):
+        if self.game_id is not None and not self.client.closed:
+            game_id, self.game_id = self.game_id, None
+            self.client._send(CLOSE, game_id)
+            self.client._recv()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve GomokuEnv games over tcp')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--max-games', type=int, default=10000)
+    parser.add_argument('--max-pending', type=int, default=1024)
+    parser.add_argument('--game-timeout', type=float, default=300.)
+    parser.add_argument('--step-timeout', type=float, default=10.)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    server = GomokuServer(args.host, args.port, args.max_games, args.max_pending, game_timeout=args.game_timeout,
+                          step_timeout=args.step_timeout, workers=args.workers, seed=args.seed)
+    asyncio.run(server.serve_forever())
+
+if __name__ == '__main__':
+    main()
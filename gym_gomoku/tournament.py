@@ -0,0 +1,213 @@
+'''
+Tournaments between built-in opponents and user agents: round-robin or gauntlet pairings played over a process pool,
+colors alternated with player_color, each pairing stopped early by a sequential probability ratio test (SPRT),
+and Elo ratings of the players fitted on all the games.
+
+Players are given by name: a built-in opponent ('random', 'beginner', 'medium', 'expert') or a picklable callable
+player(np_random) returning a policy(curr_state, prev_state, prev_action), the signature of the built-in opponents.
+'''
+
+import math
+import multiprocessing
+
+from gym import error
+from gym.utils import seeding
+
+from gym_gomoku.envs.gomoku import GomokuEnv
+from gym_gomoku.envs.util import make_random_policy
+from gym_gomoku.envs.util import make_beginner_policy
+from gym_gomoku.envs.util import make_medium_policy
+from gym_gomoku.envs.util import make_expert_policy
+
+BUILTIN = {
+    'random': make_random_policy,
+    'beginner': make_beginner_policy,
+    'medium': make_medium_policy,
+    'expert': make_expert_policy,
+}
+
+def expected_score(elo):
+    '''Expected score of a player rated elo points above its opponent'''
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    '''
+    Log likelihood ratio of H1 (elo difference elo1) against H0 (elo difference elo0), normal approximation of the
+    game scores (generalized SPRT). One virtual win and one virtual loss keep the variance positive on short runs.
+    '''
+    wins, losses = wins + 1, losses + 1
+    n = float(wins + draws + losses)
+    score = (wins + 0.5 * draws) / n
+    var = (wins * (1. - score)**2 + draws * (0.5 - score)**2 + losses * score**2) / n
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return n * (s1 - s0) * (2. * score - s0 - s1) / (2. * var)
+
+def sprt_bounds(alpha, beta):
+    '''Return: lower and upper bound of the llr, accept H0 below the lower, H1 above the upper'''
+    return math.log(beta / (1. - alpha)), math.log((1. - beta) / alpha)
+
+def elo_ratings(games, players, prior=2., iterations=1000):
+    '''
+    Bradley-Terry ratings on the Elo scale, maximum a posteriori like BayesElo: prior virtual draws are added to
+    every pairing played, which keeps the ratings finite when a player wins all its games.
+    Args:
+        games: list of (player_a, player_b, score of a) with score 1 win, 0.5 draw, 0 loss
+        players: list of player names
+    Return:
+        dict name -> rating, the mean rating is 0
+    '''
+    k = dict((name, i) for i, name in enumerate(players))
+    n = len(players)
+    wins = [[0.] * n for _ in range(n)] # wins[i][j] points of i against j
+    for a, b, score in games:
+        i, j = k[a], k[b]
+        if wins[i][j] == 0. and wins[j][i] == 0.: # first game of the pairing
+            wins[i][j] += prior / 2.
+            wins[j][i] += prior / 2.
+        wins[i][j] += score
+        wins[j][i] += 1. - score
+    gamma = [1.] * n
+    for _ in range(iterations): # minorization-maximization updates
+        for i in range(n):
+            total = sum(wins[i])
+            denominator = sum((wins[i][j] + wins[j][i]) / (gamma[i] + gamma[j]) for j in range(n) if j != i)
+            if total > 0 and denominator > 0:
+                gamma[i] = total / denominator
+    ratings = [400. * math.log10(g) for g in gamma]
+    mean = sum(ratings) / n
+    return dict((name, ratings[k[name]] - mean) for name in players)
+
+def _policy(player, np_random):
+    if player in BUILTIN:
+        return BUILTIN[player](np_random)
+    return player(np_random)
+
+def play_game(player_a, player_b, board_size, color_a, seed):
+    '''
+    Play one game of player_a with color_a against player_b in a GomokuEnv, player_b is the env opponent
+    Return: score of player_a, 1 win, 0.5 draw, 0 loss
+    '''
+    env = GomokuEnv(color_a, player_b, board_size)
+    env._seed(seed)
+    env._reset()
+    policy = _policy(player_a, seeding.np_random(seeding.hash_seed(seed + 1) % 2**32)[0])
+    prev_state, prev_action = None, None
+    if env.state.board.last_action is not None: # the opponent played first
+        prev_action = env.state.board.last_action
+    reward, done = 0., env.done
+    while not done:
+        action = policy(env.state, prev_state, prev_action)
+        prev_state = env.state.act(action) # the state the opponent played from
+        _, reward, done, _ = env._step(action)
+        prev_action = env.state.board.last_action
+    env._close()
+    return (reward + 1.) / 2.
+
+def _play_game(game):
+    '''Worker: play one game, Return: score of player_a'''
+    return play_game(*game)
+
+class Tournament(object):
+    '''
+    Matches between named players, see the module docstring for the players.
+    Every pairing plays pairs of games with the colors swapped, until its SPRT is decided or max_games.
+    '''
+    def __init__(self, players, mode='round_robin', board_size=15, max_games=200, games_per_round=4,
+                 elo0=-30., elo1=30., alpha=0.05, beta=0.05, seed=None, processes=None):
+        '''
+        Args:
+            players: dict name -> built-in opponent name or player callable, or list of built-in names, in order
+            mode: 'round_robin' every pair of players, or 'gauntlet' the first player against each of the others
+            board_size: board_size of the board to use
+            max_games: maximum number of games of a pairing
+            games_per_round: games of each undecided pairing played between two SPRT checks, rounded up to even
+            elo0, elo1: elo difference of the SPRT hypotheses H0 and H1, H1 means the first player is stronger
+            alpha, beta: error probabilities of the SPRT
+            seed: master seed, the games only depend on it, not on the number of processes
+            processes: number of worker processes, None for one per cpu, 0 or 1 to play in this process
+        '''
+        if not isinstance(players, dict):
+            players = dict((name, name) for name in players)
+        self.players = players
+        self.names = list(players)
+        if mode == 'round_robin':
+            self.pairings = [(a, b) for i, a in enumerate(self.names) for b in self.names[i + 1:]]
+        elif mode == 'gauntlet':
+            self.pairings = [(self.names[0], b) for b in self.names[1:]]
+        else:
+            raise error.Error('Unrecognized tournament mode {}'.format(mode))
+        self.board_size = board_size
+        self.max_games = max_games
+        self.games_per_round = games_per_round + games_per_round % 2
+        self.elo0, self.elo1 = elo0, elo1
+        self.bounds = sprt_bounds(alpha, beta)
+        self.seed = seeding.np_random(seed)[1]
+        self.processes = processes
+
+    def _game_seed(self, pairing, game):
+        return seeding.hash_seed(self.seed + 1 + (pairing << 24) + game) % 2**32
+
+    def run(self):
+        '''
+        Return:
+            dict 'pairings': list of dict with 'players', 'wins', 'draws', 'losses' of the first player, 'games',
+                'llr' and 'result': 'H1' first player stronger, 'H0' second player stronger or 'max_games',
+            'ratings': dict name -> elo, 'games': list of (player_a, player_b, score of a)
+        '''
+        stats = [{'players': pairing, 'wins': 0, 'draws': 0, 'losses': 0, 'games': 0, 'llr': 0., 'result': None}
+                 for pairing in self.pairings]
+        games = []
+        processes = self.processes if self.processes is not None else multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes) if processes > 1 else None
+        try:
+            while True:
+                # one job per game, so that a few pairings still keep all the workers busy
+                jobs, owners = [], []
+                for p, stat in enumerate(stats):
+                    if stat['result'] is not None:
+                        continue
+                    a, b = stat['players']
+                    for g in range(stat['games'], min(stat['games'] + self.games_per_round, self.max_games)):
+                        color_a = 'black' if g % 2 == 0 else 'white'
+                        jobs.append((self.players[a], self.players[b], self.board_size, color_a, self._game_seed(p, g)))
+                        owners.append(p)
+                if not jobs:
+                    break
+                if pool is not None:
+                    scores = list(pool.imap(_play_game, jobs, chunksize=max(1, len(jobs) // (4 * processes))))
+                else:
+                    scores = [_play_game(job) for job in jobs]
+                for p, score in zip(owners, scores): # sum the games of each pairing before its SPRT update
+                    stat = stats[p]
+                    key = 'wins' if score == 1. else 'losses' if score == 0. else 'draws'
+                    stat[key] += 1
+                    stat['games'] += 1
+                    games.append(stat['players'] + (score,))
+                for p in sorted(set(owners)):
+                    stat = stats[p]
+                    stat['llr'] = sprt_llr(stat['wins'], stat['draws'], stat['losses'], self.elo0, self.elo1)
+                    if stat['llr'] >= self.bounds[1]:
+                        stat['result'] = 'H1'
+                    elif stat['llr'] <= self.bounds[0]:
+                        stat['result'] = 'H0'
+                    elif stat['games'] >= self.max_games:
+                        stat['result'] = 'max_games'
+            if pool is not None:
+                pool.close()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        return {'pairings': stats, 'ratings': elo_ratings(games, self.names), 'games': games}
+
+def format_results(results):
+    '''Return: text table of the ratings and the pairings'''
+    lines = ['{:<20s} {:>8s}'.format('player', 'elo')]
+    for name, elo in sorted(results['ratings'].items(), key=lambda item: -item[1]):
+        lines.append('{:<20s} {:>8.1f}'.format(name, elo))
+    lines.append('')
+    lines.append('{:<42s} {:>5s} {:>5s} {:>5s} {:>7s} {}'.format('pairing', 'W', 'D', 'L', 'llr', 'result'))
+    for stat in results['pairings']:
+        lines.append('{:<42s} {:>5d} {:>5d} {:>5d} {:>7.2f} {}'.format(
+            ' - '.join(stat['players']), stat['wins'], stat['draws'], stat['losses'], stat['llr'], stat['result']))
+    return '\n'.join(lines)
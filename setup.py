@@ -21,11 +21,12 @@ setup(
     },
     classifiers=[
         'Development Status :: 4 - Beta',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Scientific/Engineering',
         'Topic :: Software Development',
         'Topic :: Scientific/Engineering :: Artificial Intelligence',
     ],
+    python_requires='>=3.8', # multiprocessing.shared_memory, int.from_bytes, OrderedDict.move_to_end
     install_requires=['gym'],
 )
@@ -0,0 +1,63 @@
+import numpy as np
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku.envs.gomoku import DiscreteWrapper
+
+def test_remove_and_sample_without_replacement():
+    space = DiscreteWrapper(25, np.random.RandomState(0))
+    removed = set()
+    for _ in range(25):
+        a = space.sample()
+        assert a not in removed
+        space.remove(a)
+        removed.add(a)
+        assert sorted(space.valid_spaces) == sorted(set(range(25)) - removed)
+        assert np.array_equal(np.flatnonzero(space.mask), sorted(space.valid_spaces))
+    assert space.sample() is None
+
+def test_env_mask_and_seeded_sampling():
+    games = []
+    for _ in range(2):
+        env = GomokuEnv('white', 'random', 9)
+        env.seed(3)
+        env.reset()
+        actions = []
+        done = False
+        while not done:
+            assert np.array_equal(env.action_space.mask, env.state.board.encode().ravel() == 0)
+            action = env.action_space.sample()
+            _, _, done, info = env.step(action)
+            actions.append(action)
+            if not done:
+                assert np.array_equal(info['legal_mask'], env.state.board.encode().ravel() == 0)
+                assert info['legal_mask'] is not env.action_space.mask
+                if len(actions) > 1:
+                    assert previous[actions[-1]] # not changed by the step that played it
+                previous = info['legal_mask']
+        games.append(actions)
+    assert games[0] == games[1] # sample() follows the env seed
+
+def test_restore_state_replays_deterministically():
+    env = GomokuEnv('black', 'beginner', 9)
+    env.seed(5)
+    env.reset()
+    for _ in range(3):
+        env.step(env.action_space.sample())
+    snapshot = env.clone_state()
+    replays = []
+    for _ in range(3):
+        env.restore_state(snapshot)
+        assert env.state is snapshot.state and len(env.moves) == 6
+        assert np.array_equal(env.action_space.mask, env.state.board.encode().ravel() == 0)
+        game = []
+        done = False
+        while not done:
+            action = env.action_space.sample()
+            _, reward, done, _ = env.step(action)
+            game.append((action, env.state.board.last_action, reward))
+        replays.append(game)
+    assert replays[0] == replays[1] == replays[2]
+
+if __name__ == '__main__':
+    test_remove_and_sample_without_replacement()
+    test_env_mask_and_seeded_sampling()
+    test_restore_state_replays_deterministically()
@@ -0,0 +1,108 @@
+import numpy as np
+from gym_gomoku.envs.gomoku import Board
+from gym_gomoku.envs.util import gomoku_util
+
+def play_random_game(size, seed):
+    ''' Play random moves until terminal, yield every intermediate board
+    '''
+    np_random = np.random.RandomState(seed)
+    b = Board(size)
+    color = 'black'
+    while not b.is_terminal():
+        legal_moves = b.get_legal_move()
+        move = legal_moves[np_random.choice(len(legal_moves))]
+        b = b.play(b.coord_to_action(move[0], move[1]), color)
+        color = gomoku_util.other_color(color)
+        yield b
+
+def test_incremental_win_matches_full_scan():
+    for seed in range(20):
+        for b in play_random_game(9, seed):
+            exist, color = gomoku_util.check_five_in_row(b.board_state)
+            is_full = gomoku_util.check_board_full(b.board_state)
+            assert b.winner == color
+            assert b.is_terminal() == (exist or is_full)
+
+def test_copy_recomputes_win_state():
+    b = Board(9)
+    state = [[0] * 9 for _ in range(9)]
+    for j in range(5):
+        state[3][j] = 2
+    b.copy(state)
+    assert b.is_terminal() and b.winner == 'white'
+    assert b.num_stones == 5
+
+def test_encode_is_readonly_view():
+    b = Board(9).play(40, 'black')
+    obs = b.encode()
+    assert obs.dtype == np.int8 and obs[4, 4] == 1
+    assert not obs.flags.writeable
+    out = np.zeros((9, 9), dtype=np.float32)
+    assert b.encode(out=out) is out and out[4, 4] == 1.
+
+def test_play_does_not_modify_parent():
+    b1 = Board(9).play(0, 'black')
+    b2 = b1.play(1, 'white')
+    assert b1.board_state[0, 1] == 0 and b2.board_state[0, 1] == 2
+    assert b1.num_stones == 1 and b2.num_stones == 2
+
+def test_legal_and_candidate_moves_follow_play():
+    np_random = np.random.RandomState(7)
+    b = Board(9)
+    b.candidate_mask(1), b.candidate_mask(2)
+    color = 'black'
+    for _ in range(30):
+        action = b.get_legal_action()[np_random.choice(len(b.get_legal_action()))]
+        b = b.play(action, color)
+        color = gomoku_util.other_color(color)
+        assert np.array_equal(b.legal_mask(), b.board_state.ravel() == 0)
+        assert b.get_legal_action() == np.flatnonzero(b.board_state.ravel() == 0).tolist()
+        for radius in [1, 2]:
+            fresh = Board(9)
+            fresh.copy(b.board_state)
+            assert np.array_equal(b.candidate_mask(radius), fresh.candidate_mask(radius))
+
+def test_zobrist_hash_is_incremental_and_order_free():
+    b1 = Board(9).play(10, 'black').play(20, 'white').play(30, 'black')
+    b2 = Board(9).play(30, 'black').play(20, 'white').play(10, 'black')
+    assert b1 == b2 and hash(b1) == hash(b2)
+    assert b1.hash == gomoku_util.zobrist_hash(b1.board_state)
+    b3 = b1.play(40, 'white')
+    assert b3 != b1 and b3.hash == gomoku_util.zobrist_hash(b3.board_state)
+    fresh = Board(9)
+    fresh.copy(b3.board_state)
+    assert fresh == b3
+
+def test_push_pop_restores_state_exactly():
+    from gym_gomoku.envs.gomoku import GomokuState
+    np_random = np.random.RandomState(3)
+    root = GomokuState(Board(9), 'black').act(40)
+    root.board.candidate_mask(2)
+    state = root.copy()
+    snapshots, actions = [], []
+    while not state.board.is_terminal():
+        b = state.board
+        snapshots.append((b.board_state.copy(), b.hash, b.winner, b.terminal, b.legal_actions().copy(), b.candidate_mask(2).copy(), state.color))
+        action = b.legal_actions()[np_random.choice(len(b.legal_actions()))]
+        expected = GomokuState(b._clone(), state.color).act(action)
+        state.push(action)
+        actions.append(action)
+        assert state == expected and state.board.winner == expected.board.winner
+        assert np.array_equal(state.board.candidate_mask(2), expected.board.candidate_mask(2))
+    while actions:
+        assert state.pop() == actions.pop()
+        board_state, h, winner, terminal, legal, candidates, color = snapshots.pop()
+        b = state.board
+        assert np.array_equal(b.board_state, board_state) and b.hash == h and state.color == color
+        assert b.winner == winner and b.terminal == terminal
+        assert np.array_equal(b.legal_actions(), legal) and np.array_equal(b.candidate_mask(2), candidates)
+    assert state == root and root.board.num_stones == 1
+
+if __name__ == '__main__':
+    test_incremental_win_matches_full_scan()
+    test_copy_recomputes_win_state()
+    test_encode_is_readonly_view()
+    test_play_does_not_modify_parent()
+    test_legal_and_candidate_moves_follow_play()
+    test_zobrist_hash_is_incremental_and_order_free()
+    test_push_pop_restores_state_exactly()
@@ -0,0 +1,61 @@
+import numpy as np
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku.envs.features import FeaturePlanes
+from gym_gomoku.envs.util import gomoku_util
+
+def threat_counts(board_state, val):
+    ''' Brute force open threes and fours of each empty cell for stone val
+    '''
+    size = len(board_state)
+    threes, fours = np.zeros((size, size)), np.zeros((size, size))
+    def cell(i, j):
+        return board_state[i][j] if 0 <= i < size and 0 <= j < size else 3
+    for i in range(size):
+        for j in range(size):
+            if board_state[i][j] != 0:
+                continue
+            for di, dj in gomoku_util.directions:
+                line = [val if k == 0 else cell(i + k * di, j + k * dj) for k in range(-5, 6)]
+                fours[i, j] += any(line[s:s + 5].count(val) >= 4 and line[s:s + 5].count(val) + line[s:s + 5].count(0) == 5
+                                   for s in range(1, 6))
+                threes[i, j] += any(line[s] == 0 and line[s + 5] == 0 and line[s + 1:s + 5].count(val) == 3
+                                    and line[s + 1:s + 5].count(0) == 1 for s in range(1, 5))
+    return threes, fours
+
+def test_feature_planes_follow_the_game():
+    for player_color in ['black', 'white']:
+        env = GomokuEnv(player_color, 'beginner', 9, observation='features')
+        env.seed(6)
+        obs = env.reset()
+        assert obs.shape == (8, 9, 9) and obs.dtype == np.float32
+        done = False
+        while not done:
+            obs, _, done, _ = env.step(env.action_space.sample())
+            assert obs is env.features.planes # reused buffer
+            board = env.state.board
+            own, opp = gomoku_util.color_dict[player_color], 3 - gomoku_util.color_dict[player_color]
+            assert np.array_equal(obs[0], board.board_state == own) and np.array_equal(obs[1], board.board_state == opp)
+            assert np.all(obs[2] == (env.state.color == 'black'))
+            assert obs[3].sum() == 1 and obs[3].ravel()[board.last_action] == 1
+            state = board.board_state.tolist()
+            for k, val in enumerate([own, opp]):
+                threes, fours = threat_counts(state, val)
+                assert np.array_equal(obs[4 + 2 * k], threes) and np.array_equal(obs[5 + 2 * k], fours)
+            fresh = FeaturePlanes(9, player_color)
+            fresh.reset(board.board_state, board.last_action, env.state.color)
+            assert np.array_equal(fresh.planes, obs)
+
+def test_restore_state_recomputes_features():
+    env = GomokuEnv('black', 'random', 9, observation='features')
+    env.seed(1)
+    env.reset()
+    for _ in range(4):
+        obs, _, _, _ = env.step(env.action_space.sample())
+    snapshot, saved = env.clone_state(), obs.copy()
+    env.step(env.action_space.sample())
+    env.restore_state(snapshot)
+    assert np.array_equal(env.features.planes, saved)
+
+if __name__ == '__main__':
+    test_feature_planes_follow_the_game()
+    test_restore_state_recomputes_features()
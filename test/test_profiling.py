@@ -0,0 +1,28 @@
+from gym_gomoku.envs import GomokuEnv
+
+def test_profile_counts_phases_per_episode():
+    env = GomokuEnv('white', 'beginner', 9)
+    env.seed(0)
+    measures = []
+    profiler = env.enable_profiling(hooks=[lambda phase, seconds: measures.append((phase, seconds))])
+    env.reset()
+    assert env.profile_stats()['opponent_play']['count'] == 1
+    done, steps = False, 0
+    while not done:
+        _, _, done, info = env.step(env.action_space.sample())
+        steps += 1
+        assert ('profile' in info) == done
+    stats = info['profile']
+    assert stats['agent_move']['count'] == steps
+    assert stats['encode']['count'] == steps + 1
+    assert stats['opponent_play']['count'] in (steps, steps + 1)
+    assert sum(s['count'] for s in stats.values()) == len(measures)
+    assert abs(sum(s['total'] for s in stats.values()) - sum(t for _, t in measures)) < 1e-9
+    env.reset() # a new episode
+    assert env.profile_stats()['reset']['count'] == 1
+    env.disable_profiling()
+    _, _, _, info = env.step(env.action_space.sample())
+    assert env.profile_stats() is None and 'profile' not in info
+
+if __name__ == '__main__':
+    test_profile_counts_phases_per_episode()
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import numpy as np
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku import records
+
+DEMO = os.path.join(os.path.dirname(__file__), '..', 'demo', 'gym_gomoku_demo.json')
+
+def test_write_and_read_env_episodes():
+    path = os.path.join(tempfile.mkdtemp(), 'games.gmk')
+    expected = []
+    env = GomokuEnv('white', 'beginner', 9)
+    env.seed(4)
+    with records.GameRecordWriter(path) as writer:
+        for _ in range(5):
+            env.reset()
+            done = False
+            while not done:
+                _, _, done, _ = env.step(env.action_space.sample())
+            writer.write_env(env)
+            expected.append(records.env_record(env))
+    with records.GameRecordWriter(path) as writer: # append to the existing file
+        writer.write(records.GameRecord(15, [112, 113], 'empty', 'empty'))
+    reader = records.GameRecordReader(path)
+    games = list(reader)
+    assert games[:5] == expected and len(reader) == 6
+    assert reader[5].board_size == 15 and reader[5].actions.tolist() == [112, 113]
+    assert os.path.getsize(path) == 8 + 6 * 6 + 2 * sum(len(game.actions) for game in games)
+    for game in games[:5]:
+        boards = list(game.replay())
+        assert boards[-1].is_terminal() and boards[-1].winner == game.winner
+        assert game.player_color == 'white'
+
+def test_import_and_export_demo_json():
+    game = records.import_json(DEMO)
+    assert game.board_size == 9 and len(game.actions) == 10
+    assert game.winner == 'white' and game.player_color == 'black'
+    path = os.path.join(tempfile.mkdtemp(), 'demo.json')
+    records.export_json(game, path)
+    assert records.import_json(path) == game
+    with open(DEMO) as f:
+        demo = json.load(f)['stdout']
+    with open(path) as f:
+        exported = json.load(f)['stdout']
+    assert [text for _, text in exported] == [text for _, text in demo]
+
+if __name__ == '__main__':
+    test_write_and_read_env_episodes()
+    test_import_and_export_demo_json()
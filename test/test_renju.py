@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from gym import error
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku.envs.gomoku import Board
+from gym_gomoku.envs import renju
+from gym_gomoku.envs.util import gomoku_util
+
+WHITE_FAR = [(0, 0), (0, 2), (0, 4), (14, 14), (14, 12), (14, 10), (0, 14), (14, 0)]
+
+def renju_board(black, white=None):
+    ''' Board with the black stones and as many white stones far away, black to move
+    '''
+    white = WHITE_FAR[:len(black) - len(white or [])] + (white or [])
+    state = np.zeros((15, 15), dtype=np.int8)
+    for (i, j) in black:
+        state[i, j] = 1
+    for (i, j) in white:
+        state[i, j] = 2
+    b = Board(15, 'renju')
+    b.copy(state)
+    return b
+
+def test_forbidden_patterns():
+    cases = [
+        ([(7, 6), (7, 8), (6, 7), (8, 7)], [], (7, 7), True),                             # double three
+        ([(7, 3), (7, 4), (7, 5), (3, 6), (4, 6), (5, 6)], [(7, 2), (2, 6)], (7, 6), True), # double four
+        ([(7, 3), (7, 5), (7, 7), (7, 9)], [], (7, 6), True),                             # double four in one line
+        ([(7, 3), (7, 4), (7, 5), (5, 6), (6, 6)], [(7, 2)], (7, 6), False),              # four three
+        ([(7, 1), (7, 2), (7, 3), (7, 5), (7, 6)], [], (7, 4), True),                     # overline
+        ([(7, 1), (7, 2), (7, 3), (7, 5), (5, 4), (6, 4)], [], (7, 4), False),            # five wins
+    ]
+    for black, white, (i, j), forbidden in cases:
+        b = renju_board(black, white)
+        action = b.coord_to_action(i, j)
+        assert (action in b.forbidden_actions()) == forbidden, (black, (i, j))
+        assert b.is_legal(action) != forbidden and b.legal_mask()[action] != forbidden
+        if forbidden:
+            with pytest.raises(error.Error):
+                b.play(action, 'black')
+            b.play(action, 'white') # white has no forbidden move
+        else:
+            b.play(action, 'black')
+
+def test_candidate_cells_cover_forbidden_moves():
+    np_random = np.random.RandomState(0)
+    index = renju.line_index(15)
+    for _ in range(30):
+        state = np.zeros(225, dtype=np.int8)
+        cells = np_random.choice(np.arange(4 * 15 + 4, 11 * 15), 30, replace=False) # crowded center
+        state[cells[:15]], state[cells[15:]] = 1, 2
+        values = state.tolist() + [3]
+        brute = [a for a in range(225) if renju.is_forbidden(values, index, a)]
+        assert renju.forbidden_actions(state.reshape(15, 15)).tolist() == brute
+
+def test_rule_win_conditions():
+    line = [(7, j) for j in [1, 2, 3, 5, 6]]
+    for rule, color, wins in [('freestyle', 'black', True), ('standard', 'black', False), ('standard', 'white', False),
+                              ('renju', 'white', True)]:
+        b = Board(15, rule)
+        for (i, j) in line:
+            b = b.play(b.coord_to_action(i, j), color)
+        b = b.play(b.coord_to_action(7, 4), color) # overline of 6
+        assert b.is_terminal() == wins and b.winner == (color if wins else 'empty')
+        exist, winner = gomoku_util.check_five_in_row(b.board_state, rule)
+        assert (exist, winner) == (b.is_terminal(), b.winner)
+
+def test_env_masks_forbidden_moves():
+    white_moves = iter([0, 2, 14 * 15 + 14, 14 * 15 + 12])
+    env = GomokuEnv('black', lambda np_random: (lambda curr_state, prev_state, prev_action: next(white_moves)), 15, rule='renju')
+    env.seed(0)
+    env.reset()
+    for (i, j) in [(7, 6), (7, 8), (6, 7), (8, 7)]:
+        _, _, done, info = env.step(i * 15 + j)
+    forbidden = 7 * 15 + 7
+    assert not done and not info['legal_mask'][forbidden] and forbidden not in env.action_space.valid_spaces
+    assert env.action_space.num_valid == 225 - 9
+    assert all(env.action_space.sample() != forbidden for _ in range(200))
+    snapshot = env.clone_state()
+    with pytest.raises(error.Error):
+        env.step(forbidden)
+    env.restore_state(snapshot)
+    assert not env.action_space.mask[forbidden]
+    with pytest.raises(error.Error):
+        GomokuEnv('black', 'random', 15, rule='gomoku')
+
+if __name__ == '__main__':
+    test_forbidden_patterns()
+    test_candidate_cells_cover_forbidden_moves()
+    test_rule_win_conditions()
+    test_env_masks_forbidden_moves()
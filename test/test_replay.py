@@ -0,0 +1,43 @@
+import numpy as np
+from gym_gomoku.envs.gomoku import Board, GomokuState
+from gym_gomoku import replay
+
+def test_pack_unpack_round_trip():
+    np_random = np.random.RandomState(0)
+    for size in [9, 15, 19]:
+        boards = np_random.randint(3, size=(10, size, size)).astype(np.int8)
+        packed = replay.pack_boards(boards)
+        assert packed.shape == (10, (size * size + 3) // 4)
+        assert np.array_equal(replay.unpack_boards(packed, size).reshape(boards.shape), boards)
+
+def test_sample_applies_board_symmetries():
+    size = 9
+    buf = replay.ReplayBuffer(16, size, np.random.RandomState(1))
+    np_random = np.random.RandomState(2)
+    for k in range(20): # the first 4 are overwritten
+        state = GomokuState(Board(size), 'black')
+        for action in np_random.choice(size * size, 7, replace=False):
+            state = state.act(action)
+        empty = np.flatnonzero(state.board.board_state.ravel() == 0)
+        buf.add_state(state, outcome=float(k), action=np_random.choice(empty))
+    assert len(buf) == 16 and sorted(buf.outcomes) == list(range(4, 20))
+    planes, actions, outcomes, idx = buf.sample(64)
+    boards, colors, last_moves, stored_actions, _ = buf.get(idx)
+    assert np.array_equal(outcomes, buf.outcomes[idx])
+    for k in range(64):
+        own, opp, black, last = planes[k]
+        assert np.all(black == (colors[k] == 1))
+        sample = own * colors[k] + opp * (3 - colors[k])
+        matches = []
+        for t in range(8):
+            board, marks = boards[k], np.zeros((2, size * size))
+            marks[0, last_moves[k]], marks[1, stored_actions[k]] = 1, 1
+            transform = lambda x: np.rot90(x.T if t >= 4 else x, t % 4)
+            if (np.array_equal(transform(board), sample) and np.array_equal(transform(marks[0].reshape(size, size)), last)
+                    and transform(marks[1].reshape(size, size)).ravel()[actions[k]] == 1):
+                matches.append(t)
+        assert matches
+
+if __name__ == '__main__':
+    test_pack_unpack_round_trip()
+    test_sample_applies_board_symmetries()
@@ -0,0 +1,56 @@
+import numpy as np
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku.envs.search import AlphaBetaSearch
+from gym_gomoku.envs.search import MCTSSearch
+
+def test_alphabeta_wins_and_blocks():
+    board_state = np.zeros((15, 15), dtype=np.int8)
+    board_state[7, 3:7] = 1   # black four, open at (7, 2) and (7, 7)
+    board_state[9, 4:7] = 2   # white three
+    searcher = AlphaBetaSearch(15, time_limit=None, max_depth=2)
+    assert searcher.search(board_state, 'black') in [7 * 15 + 2, 7 * 15 + 7]
+    board_state[7, 7] = 2     # white blocks one end, black still threatens the other
+    board_state[8, 8] = 1
+    assert searcher.search(board_state, 'white') == 7 * 15 + 2
+
+def test_make_unmake_restores_state():
+    searcher = AlphaBetaSearch(9)
+    board_state = np.random.RandomState(0).choice(3, size=(9, 9), p=[0.8, 0.1, 0.1])
+    searcher.set_position(board_state)
+    score, key, count = searcher.score, searcher.hash, searcher.count.copy()
+    for cell in np.flatnonzero(board_state.ravel() == 0)[:10]:
+        searcher.make(cell, 1)
+        searcher.unmake(cell, 1)
+    assert searcher.score == score and searcher.hash == key and np.array_equal(searcher.count, count)
+
+def test_medium_opponent_plays_full_game():
+    env = GomokuEnv('white', 'medium', 9)
+    env.seed(0)
+    env.reset()
+    done = False
+    while not done:
+        _, reward, done, _ = env.step(env.action_space.sample())
+    assert reward in [-1., 0., 1.]
+
+def test_mcts_wins_and_reuses_tree():
+    board_state = np.zeros((9, 9), dtype=np.int8)
+    board_state[4, 2:6] = 2
+    board_state[2, 2:5] = 1
+    searcher = MCTSSearch(9, max_simulations=50, time_limit=None, np_random=np.random.RandomState(0))
+    assert searcher.search(board_state, 'white') in [4 * 9 + 1, 4 * 9 + 6]
+
+    board_state = np.zeros((9, 9), dtype=np.int8)
+    board_state[4, 4] = 1
+    move = searcher.search(board_state, 'white')
+    board_state.flat[move] = 2
+    # black replies with a move explored by the previous search, its subtree is kept
+    reply = searcher.root.children[0].move
+    board_state.flat[reply] = 1
+    searcher.search(board_state, 'white')
+    assert searcher.reused_visits > 0
+
+if __name__ == '__main__':
+    test_alphabeta_wins_and_blocks()
+    test_make_unmake_restores_state()
+    test_medium_opponent_plays_full_game()
+    test_mcts_wins_and_reuses_tree()
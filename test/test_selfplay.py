@@ -0,0 +1,27 @@
+from gym_gomoku.envs.gomoku import Board
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku import selfplay
+
+def test_games_do_not_depend_on_processes():
+    runs = []
+    for processes, chunk_size in [(1, 3), (2, 2), (3, 5)]:
+        chunks = list(selfplay.generate(selfplay.random_agent, 'beginner', num_games=7, board_size=9,
+                                        player_color='white', seed=11, processes=processes, chunk_size=chunk_size))
+        assert [len(games) for games in chunks][0] == chunk_size
+        runs.append([game for games in chunks for game in games])
+    assert len(runs[0]) == 7
+    assert runs[0] == runs[1] == runs[2]
+    assert len(set(game['seed'] for game in runs[0])) == 7
+
+def test_game_record_replays():
+    game = next(selfplay.generate(selfplay.random_agent, 'random', num_games=1, board_size=9, seed=0, processes=1))[0]
+    b, color = Board(9), 'black'
+    for action in game['actions']:
+        b = b.play(action, color)
+        color = gomoku_util.other_color(color)
+    assert b.is_terminal() and b.winner == game['winner']
+    assert game['reward'] == {'empty': 0., 'black': 1., 'white': -1.}[game['winner']]
+
+if __name__ == '__main__':
+    test_games_do_not_depend_on_processes()
+    test_game_record_replays()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from gym import error
+from gym_gomoku.envs.gomoku import Board
+from gym_gomoku.server import GomokuServer, GomokuClient, STEP, ACTION
+
+class ServerThread(object):
+    ''' Run a GomokuServer on localhost in a background event loop
+    '''
+    def __init__(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.server = GomokuServer(**kwargs)
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+def replay_local(results, actions):
+    ''' Replay a remote game of white against black on a local Board: each step adds the agent stone and at most one
+        opponent stone, the rewards and done flags follow the board
+    '''
+    obs = results[0][0]
+    assert np.count_nonzero(obs) == 1 and obs.sum() == 1 # the opponent plays first
+    board = Board(9).play(int(np.flatnonzero(obs.ravel())[0]), 'black')
+    for action, (obs, reward, done) in zip(actions, results[1:]):
+        board = board.play(int(action), 'white')
+        new = np.flatnonzero(obs.ravel() != board.board_state.ravel())
+        assert len(new) == (0 if board.is_terminal() else 1)
+        if len(new) == 1:
+            assert obs.ravel()[new[0]] == 1
+            board = board.play(int(new[0]), 'black')
+        assert np.array_equal(obs, board.board_state) and done == board.is_terminal()
+        assert reward == {'white': 1., 'black': -1., 'empty': 0.}[board.winner]
+
+def test_remote_games_follow_the_rules():
+    thread = ServerThread(seed=0)
+    try:
+        def agent(k, out):
+            client = GomokuClient('127.0.0.1', thread.server.port)
+            env = client.make('white', 'beginner', 9, seed=k)
+            np_random = np.random.RandomState(k)
+            obs = env.reset()
+            results, actions, done = [(obs, 0., False)], [], False
+            while not done:
+                action = np_random.choice(np.flatnonzero(obs.ravel() == 0))
+                obs, reward, done, info = env.step(action)
+                assert np.array_equal(info['legal_mask'], obs.ravel() == 0)
+                actions.append(action)
+                results.append((obs, reward, done))
+            env.close()
+            client.close()
+            out[k] = (actions, results)
+        out = {}
+        agents = [threading.Thread(target=agent, args=(k, out)) for k in range(6)]
+        [a.start() for a in agents]
+        [a.join() for a in agents]
+        assert len(out) == 6
+        for k, (actions, results) in out.items():
+            replay_local(results, actions)
+        assert len(thread.server.games) == 0
+    finally:
+        thread.stop()
+
+def test_batched_steps_and_errors():
+    thread = ServerThread(game_timeout=0.3)
+    client = GomokuClient('127.0.0.1', thread.server.port)
+    try:
+        envs = [client.make('black', 'random', 9, seed=k) for k in range(8)]
+        for env in envs:
+            env.reset()
+        results = client.step_batch(envs, [40] * 8)
+        assert all(obs[4, 4] == 1 and np.count_nonzero(obs) == 2 for obs, _, _, _ in results)
+        assert thread.server.largest_batch > 1 and thread.server.largest_pass > 1 # opponent moves chosen together
+        with pytest.raises(error.Error):
+            envs[0].step(40) # occupied
+        with pytest.raises(error.Error):
+            client.make('black', 'grandmaster', 9)
+        time.sleep(1.5)
+        with pytest.raises(error.Error): # closed by the timeout
+            envs[1].step(0)
+        assert len(thread.server.games) == 0
+    finally:
+        client.close()
+        thread.stop()
+
+def test_search_runs_off_the_loop_with_step_timeout():
+    thread = ServerThread(step_timeout=0.05)
+    searching, client = GomokuClient('127.0.0.1', thread.server.port), GomokuClient('127.0.0.1', thread.server.port)
+    try:
+        expert, fast = searching.make('black', 'expert', 9, seed=0), client.make('black', 'random', 9, seed=0)
+        expert.reset(), fast.reset()
+        searching._send(STEP, expert.game_id, ACTION.pack(40)) # the expert searches for 0.1 seconds
+        start = time.time()
+        fast.step(40)
+        assert time.time() - start < 0.05 # not stalled by the search
+        with pytest.raises(error.Error, match='did not answer'):
+            searching._recv()
+        with pytest.raises(error.Error, match='Unknown game'): # closed by the timeout
+            expert.step(0)
+    finally:
+        searching.close()
+        client.close()
+        thread.stop()
+
+def test_close_with_open_connections():
+    thread = ServerThread()
+    client = GomokuClient('127.0.0.1', thread.server.port, timeout=5.)
+    try:
+        env = client.make('black', 'random', 9, seed=0)
+        env.reset()
+        thread.stop() # does not wait for the client to disconnect
+        assert len(thread.server.games) == 0
+        with pytest.raises(error.Error):
+            env.step(0)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    test_remote_games_follow_the_rules()
+    test_batched_steps_and_errors()
+    test_search_runs_off_the_loop_with_step_timeout()
+    test_close_with_open_connections()
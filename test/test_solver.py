@@ -0,0 +1,55 @@
+import numpy as np
+from gym_gomoku.envs.gomoku import Board
+from gym_gomoku.envs.search import ThreatSolver, AlphaBetaSearch, solve
+from gym_gomoku.envs.util import gomoku_util
+
+def position(black, white, size=15):
+    board_state = np.zeros((size, size), dtype=np.int8)
+    for (i, j) in black:
+        board_state[i, j] = 1
+    for (i, j) in white:
+        board_state[i, j] = 2
+    return board_state
+
+def test_vcf_double_four():
+    # blocked threes on row 7 and column 6, (7, 6) makes two fours
+    board_state = position([(7, 3), (7, 4), (7, 5), (3, 6), (4, 6), (5, 6)], [(7, 2), (2, 6), (0, 0), (14, 14), (0, 14), (14, 0)])
+    assert solve(board_state, 'black', vct=False) == 7 * 15 + 6
+    assert solve(board_state, 'white') is None
+    board = Board(15)
+    for action in np.flatnonzero(board_state.ravel()):
+        board.place(action, gomoku_util.color_dict_rev[board_state.flat[action]])
+    assert solve(board, 'black', vct=False) == 7 * 15 + 6
+
+def test_vct_wins_against_search():
+    # crossing twos: no VCF, but a double three, searched once black has a threat shape (the closed three on row 2)
+    black, white = [(7, 5), (7, 6), (5, 8), (6, 8)], [(0, 0), (14, 14), (0, 14), (14, 0)]
+    solver = ThreatSolver(15)
+    assert solver.solve(position(black, white), 'black') is None and solver.nodes == 0 # quiet
+    board_state = position(black + [(2, 1), (2, 2), (2, 3)], white + [(2, 0)])
+    assert solver.solve(board_state, 'black', vct=False) is None
+    defender = AlphaBetaSearch(15, max_depth=2, time_limit=None, max_nodes=2000, np_random=np.random.RandomState(0))
+    for _ in range(10):
+        action = solver.solve(board_state, 'black')
+        assert action is not None
+        board_state.flat[action] = 1
+        exist, color = gomoku_util.check_five_in_row(board_state.tolist())
+        if exist:
+            break
+        board_state.flat[defender.search(board_state, 'white')] = 2
+    assert (exist, color) == (True, 'black')
+
+def test_quiet_position_and_budget():
+    solver = ThreatSolver(15, max_nodes=1)
+    assert solver.solve(position([(7, 7)], [(8, 8)]), 'black') is None and solver.nodes == 0
+    # no forced win, proven in about 17000 nodes
+    board_state = position([(8, 8), (5, 8), (4, 14), (4, 13), (9, 0), (6, 7), (4, 8), (7, 2)],
+                           [(5, 5), (10, 14), (4, 12), (6, 5), (7, 1), (4, 10), (5, 10), (9, 8)])
+    assert solver.solve(board_state, 'black') is None and solver.nodes == 1 # budget exhausted
+    solver = ThreatSolver(15, max_nodes=10 ** 6)
+    assert solver.solve(board_state, 'black', deadline=0.) is None and solver.nodes == 16 # deadline passed
+
+if __name__ == '__main__':
+    test_vcf_double_four()
+    test_vct_wins_against_search()
+    test_quiet_position_and_budget()
@@ -0,0 +1,93 @@
+import numpy as np
+import gym
+import gym_gomoku
+from gym_gomoku.envs import GomokuEnv
+from gym_gomoku.envs.gomoku import Board, GomokuState
+from gym_gomoku.envs.sparse import SparseBoard, SparseDiscrete
+from gym_gomoku.envs.util import gomoku_util
+
+def test_sparse_board_matches_dense_board():
+    for seed in range(10):
+        np_random = np.random.RandomState(seed)
+        dense, sparse = Board(9), SparseBoard(9)
+        sparse.get_candidate_action(1), sparse.get_candidate_action(2)
+        color = 'black'
+        while not dense.is_terminal():
+            action = dense.get_legal_action()[np_random.choice(len(dense.get_legal_action()))]
+            dense, sparse = dense.play(action, color), sparse.play(action, color)
+            color = gomoku_util.other_color(color)
+            assert np.array_equal(sparse.board_state, dense.board_state)
+            assert (sparse.winner, sparse.terminal, sparse.last_coord) == (dense.winner, dense.terminal, dense.last_coord)
+            for radius in [1, 2]:
+                assert sparse.get_candidate_action(radius) == dense.get_candidate_action(radius)
+            copy = SparseBoard(9)
+            copy.copy(sparse.board_state)
+            assert copy == sparse
+
+def test_sparse_place_unplace_round_trip():
+    np_random = np.random.RandomState(3)
+    state = GomokuState(SparseBoard(50), 'black')
+    state.board.get_candidate_action(2)
+    records = []
+    for _ in range(40):
+        before = (dict(state.board.stones), state.board.hash, state.board.get_candidate_action(2), state.board.winner)
+        action = int(np_random.randint(20, 30)) * 50 + int(np_random.randint(20, 30))
+        if not state.board.is_legal(action) or state.board.is_terminal():
+            continue
+        state.push(action)
+        records.append(before)
+    while records:
+        state.pop()
+        board = state.board
+        assert (board.stones, board.hash, board.get_candidate_action(2), board.winner) == records.pop()
+    assert board.num_stones == 0 and board.hash == 0
+
+def test_sparse_env_steps():
+    env = gym.make('Gomoku100x100-v0')
+    assert env.spec.id == 'Gomoku100x100-v0'
+    env = GomokuEnv('white', 'beginner', 100, backend='sparse')
+    env.seed(5)
+    obs = env.reset()
+    assert obs.shape == (100, 100) and not obs.flags.writeable and np.count_nonzero(obs) == 1
+    done, steps = False, 0
+    while not done and steps < 60:
+        board = env.state.board
+        candidates = board.get_candidate_action(1)
+        obs, reward, done, info = env.step(candidates[env.np_random.randint(len(candidates))])
+        steps += 1
+        assert np.array_equal(obs, env.state.board.board_state)
+        assert np.array_equal(info['legal_mask'], obs.ravel() == 0)
+        if steps == 3:
+            snapshot, saved = env.clone_state(), obs.copy()
+    env.restore_state(snapshot)
+    assert np.array_equal(env._observation(), saved)
+    assert 'Move: 7' in repr(env.state.board)
+
+def test_sparse_discrete_state_only_holds_removed_actions():
+    space = SparseDiscrete(10**6, np.random.RandomState(0))
+    for s in [5, 17, 999999]:
+        space.remove(s)
+    state = space.get_state()
+    assert state == frozenset([5, 17, 999999])
+    space.remove(42)
+    space.set_state(state)
+    assert space.num_valid == 10**6 - 3 and space.mask[42] and not space.mask[17]
+    empty = SparseDiscrete(10**6, np.random.RandomState(0))
+    empty.set_state(state)
+    assert np.array_equal(empty.mask, space.mask)
+    space.set_state(frozenset())
+    assert space.num_valid == 10**6 and space.mask.all()
+
+def test_board_repr_past_26_columns():
+    b = Board(30).play(29 * 30 + 28, 'black')
+    lines = repr(b).splitlines()
+    assert lines[1].split()[-4:] == ['AA', 'AB', 'AC', 'AD']
+    assert lines[3].startswith('30 |') and 'X)' in lines[3]
+    assert gomoku_util.column_label(701) == 'ZZ' and gomoku_util.column_label(702) == 'AAA'
+
+if __name__ == '__main__':
+    test_sparse_board_matches_dense_board()
+    test_sparse_place_unplace_round_trip()
+    test_sparse_env_steps()
+    test_sparse_discrete_state_only_holds_removed_actions()
+    test_board_repr_past_26_columns()
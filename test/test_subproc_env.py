@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from gym import error
+from gym_gomoku.envs import SubprocGomokuEnv
+
+def play(num_workers, info_state=False):
+    env = SubprocGomokuEnv(5, 'white', 'beginner', 9, num_workers=num_workers, info_state=info_state)
+    try:
+        env.seed(2)
+        obs = env.reset()
+        np_random = np.random.RandomState(0)
+        history = []
+        for _ in range(40):
+            mask = env.legal_mask()
+            assert np.array_equal(mask, obs.reshape(5, -1) == 0)
+            actions = np.array([np_random.choice(np.flatnonzero(m)) for m in mask])
+            env.step_async(actions)
+            obs, rewards, dones, info = env.step_wait()
+            assert ('state' in info) == info_state
+            if info_state:
+                for k in np.flatnonzero(~dones):
+                    assert np.array_equal(info['state'][k].board.encode(), obs[k])
+            for k in np.flatnonzero(dones):
+                assert info['final_observation'][k].any() and np.count_nonzero(obs[k]) == 1 # reset, opponent played
+            history.append((obs, rewards, dones))
+        return history
+    finally:
+        env.close()
+
+def test_subproc_env_does_not_depend_on_workers():
+    runs = [play(1), play(2, info_state=True)]
+    assert any(dones.any() for _, _, dones in runs[0])
+    for a, b in zip(*runs):
+        for x, y in zip(a, b):
+            assert np.array_equal(x, y)
+
+def test_subproc_env_illegal_action():
+    env = SubprocGomokuEnv(2, 'white', 'random', 9, num_workers=2)
+    try:
+        occupied = np.argmax(env.legal_mask() == 0, axis=1)
+        with pytest.raises(error.Error):
+            env.step(occupied)
+    finally:
+        env.close()
+
+if __name__ == '__main__':
+    test_subproc_env_does_not_depend_on_workers()
+    test_subproc_env_illegal_action()
@@ -0,0 +1,42 @@
+from gym_gomoku.envs.util import make_beginner_policy
+from gym_gomoku import tournament
+
+def center_first_beginner(np_random):
+    ''' A user player: the beginner policy, opening on the center
+    '''
+    policy = make_beginner_policy(np_random)
+    def center_policy(curr_state, prev_state, prev_action):
+        center = curr_state.board.size**2 // 2
+        if curr_state.board.is_legal(center):
+            return center
+        return policy(curr_state, prev_state, prev_action)
+    return center_policy
+
+def test_sprt_stops_decided_pairings():
+    lo, hi = tournament.sprt_bounds(0.05, 0.05)
+    assert tournament.sprt_llr(30, 0, 0, -30, 30) > hi
+    assert tournament.sprt_llr(0, 0, 30, -30, 30) < lo
+    assert lo < tournament.sprt_llr(10, 0, 10, -30, 30) < hi
+
+def test_elo_ratings_order_players():
+    games = [('a', 'b', 1.)] * 8 + [('a', 'b', 0.)] * 2 + [('b', 'c', 1.)] * 8 + [('b', 'c', 0.5)] * 2
+    ratings = tournament.elo_ratings(games, ['a', 'b', 'c'])
+    assert ratings['a'] > ratings['b'] > ratings['c'] and abs(sum(ratings.values())) < 1e-6
+
+def test_gauntlet_is_reproducible_and_stops_early():
+    players = {'user': center_first_beginner, 'random': 'random', 'beginner': 'beginner'}
+    runs = []
+    for processes in [1, 2]:
+        t = tournament.Tournament(players, mode='gauntlet', board_size=9, max_games=40, seed=3, processes=processes)
+        runs.append(t.run())
+    assert runs[0]['games'] == runs[1]['games']
+    against_random = runs[0]['pairings'][0]
+    assert against_random['players'] == ('user', 'random')
+    assert against_random['result'] == 'H1' and against_random['games'] < 40
+    assert runs[0]['ratings']['user'] > runs[0]['ratings']['random']
+    assert 'user' in tournament.format_results(runs[0])
+
+if __name__ == '__main__':
+    test_sprt_stops_decided_pairings()
+    test_elo_ratings_order_players()
+    test_gauntlet_is_reproducible_and_stops_early()
@@ -0,0 +1,77 @@
+import numpy as np
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.util import beginner_patterns
+from gym_gomoku.envs.util import PatternScanner
+from gym_gomoku.envs.util import PositionCache
+
+def random_boards(size, count, seed):
+    np_random = np.random.RandomState(seed)
+    for _ in range(count):
+        yield np_random.choice(3, size=(size, size), p=[0.5, 0.25, 0.25]).astype(np.int8)
+
+def with_engine(engine, fn, *args):
+    previous = gomoku_util.engine
+    gomoku_util.set_engine(engine)
+    try:
+        return fn(*args)
+    finally:
+        gomoku_util.set_engine(previous)
+
+def test_bitboard_engine_matches_list_engine():
+    patterns = beginner_patterns('black') + beginner_patterns('white') + [[1] * 5, [2] * 5]
+    for size in [5, 9, 15]:
+        for board_state in random_boards(size, 30, size):
+            for p in patterns:
+                expected = with_engine('list', gomoku_util.check_pattern_index, board_state, p)
+                found = with_engine('bitboard', gomoku_util.check_pattern_index, board_state, p)
+                assert found == expected
+            try:
+                expected = with_engine('list', gomoku_util.check_five_in_row, board_state)
+            except Exception:
+                continue # both colors have 5-in-row
+            assert with_engine('bitboard', gomoku_util.check_five_in_row, board_state) == expected
+
+def test_line_index_is_cached_and_consistent():
+    index = gomoku_util.line_index(15)
+    assert gomoku_util.line_index(15) is index
+    assert list(gomoku_util.iterator(np.zeros((15, 15)))) == index.lines
+    for line_id, line in enumerate(index.lines):
+        assert [i * 15 + j for (i, j) in line] == index.flat[line_id].tolist()
+        assert index.matrix[line_id, :len(line)].tolist() == index.flat[line_id].tolist()
+    segments = index.segments(5)
+    assert index.segments(5) is segments and segments.shape == (4, 225, 11)
+    # centered on each cell, row segment of (7, 0) reaches (7, 5), off the board to the left
+    assert segments[0, 7 * 15, 5:].tolist() == list(range(7 * 15, 7 * 15 + 6)) and (segments[0, 7 * 15, :5] == 225).all()
+
+def test_pattern_scanner_matches_check_pattern_index():
+    patterns = beginner_patterns('black') + beginner_patterns('white')
+    scanner = PatternScanner(patterns)
+    for size in [9, 15, 19]:
+        for board_state in random_boards(size, 20, size + 1):
+            for p, (lines, starts) in zip(patterns, scanner.scan(board_state)):
+                expected_lines, expected_starts = gomoku_util.check_pattern_index(board_state, p)
+                assert lines == (expected_lines or []) and starts == expected_starts
+
+def test_position_cache_replacement():
+    cache = PositionCache(3, 'lru')
+    for key in [1, 2, 3]:
+        cache.put(key, key * 10)
+    assert cache.get(1) == 10   # 1 becomes the most recently used
+    cache.put(4, 40)            # evicts 2
+    assert cache.get(2) is None and cache.get(3) == 30
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1 and cache.evictions == 1
+
+    cache = PositionCache(3, 'depth')
+    cache.put(1, 'deep', depth=5)
+    cache.put(2, 'a', depth=1)
+    cache.put(3, 'b', depth=2)
+    cache.put(4, 'c', depth=0)  # evicts 2, the shallowest of the oldest entries
+    assert 1 in cache and 2 not in cache
+    cache.put(1, 'shallow', depth=1)
+    assert cache.get(1) == 'deep'
+
+if __name__ == '__main__':
+    test_bitboard_engine_matches_list_engine()
+    test_line_index_is_cached_and_consistent()
+    test_pattern_scanner_matches_check_pattern_index()
+    test_position_cache_replacement()
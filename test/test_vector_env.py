@@ -0,0 +1,52 @@
+import numpy as np
+from gym_gomoku.envs import GomokuVectorEnv
+from gym_gomoku.envs.gomoku import Board, GomokuState
+from gym_gomoku.envs.util import gomoku_util
+from gym_gomoku.envs.util import make_beginner_policy, make_batch_beginner_policy
+
+def test_batch_five_in_row_matches_scalar():
+    np_random = np.random.RandomState(0)
+    boards = np_random.choice(3, size=(64, 9, 9), p=[0.4, 0.3, 0.3]).astype(np.int8)
+    for color in ['black', 'white']:
+        exist = gomoku_util.check_five_in_row_batch(boards, color)
+        for k in range(len(boards)):
+            pattern = [gomoku_util.color_dict[color]] * 5
+            assert exist[k] == gomoku_util.check_pattern(boards[k].tolist(), pattern)[0]
+
+def test_vector_env_step_and_autoreset():
+    np_random = np.random.RandomState(0)
+    for opponent in ['random', 'beginner']:
+        for player_color in ['black', 'white']:
+            env = GomokuVectorEnv(8, player_color, opponent, 9)
+            env.seed(1)
+            obs = env.reset()
+            assert obs.shape == (8, 9, 9)
+            mask = env.legal_mask()
+            finished = 0
+            for _ in range(60):
+                actions = np.array([np_random.choice(np.flatnonzero(m)) for m in mask])
+                obs, rewards, dones, info = env.step(actions)
+                mask = info['legal_mask']
+                assert np.array_equal(mask, obs.reshape(8, -1) == 0)
+                assert np.all(rewards[~dones] == 0)
+                # finished games are reset
+                first_moves = 0 if player_color == 'black' else 1
+                assert np.all(np.count_nonzero(obs[dones].reshape(-1, 81), axis=1) == first_moves)
+                finished += dones.sum()
+            assert finished > 0
+
+def test_beginner_fills_the_box_of_its_own_move():
+    # no pattern: both beginner policies play around their own previous stone (1, 1), not the agent's (7, 7)
+    prev_board = Board(9).play(1 * 9 + 1, 'white')
+    board = prev_board.play(7 * 9 + 7, 'black')
+    box = [i * 9 + j for i in range(3) for j in range(3)]
+    for seed in range(10):
+        policy = make_beginner_policy(np.random.RandomState(seed))
+        assert policy(GomokuState(board, 'white'), GomokuState(prev_board, 'black'), 7 * 9 + 7) in box
+        batch_policy = make_batch_beginner_policy(np.random.RandomState(seed))
+        assert batch_policy(board.board_state[None], 'white', np.array([1 * 9 + 1]))[0] in box
+
+if __name__ == '__main__':
+    test_batch_five_in_row_matches_scalar()
+    test_vector_env_step_and_autoreset()
+    test_beginner_fills_the_box_of_its_own_move()